@@ -0,0 +1,333 @@
+"""
+Offline batch extraction.
+
+Reads documentation URLs (one per line) from a file or stdin, crawls and
+extracts each one with bounded crawl and LLM concurrency, and streams results
+as JSONL. Progress is checkpointed so an interrupted run can be resumed:
+
+    python batch.py urls.txt -o results.jsonl
+    cat urls.txt | python batch.py - -o results.jsonl --crawl-concurrency 8
+
+With --snapshot-dir every crawl is also archived as a WARC file. --replay
+re-extracts from those snapshots instead of crawling (no requests to the docs
+sites), parsing archives in parallel worker processes; e.g. after changing the
+prompt or OPENAI_MODEL:
+
+    python batch.py urls.txt -o results.jsonl --snapshot-dir snapshots/
+    python batch.py -o results-v2.jsonl --replay snapshots/
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO
+
+from services.config import load_env
+from services.crawler import DocumentationCrawler, replay_snapshot
+from services.extractor import ModuleExtractor
+from services.search_index import get_search_index
+from services.snapshot import latest_snapshots
+
+
+def read_urls(source: TextIO) -> List[str]:
+    """Read unique URLs, skipping blank lines and # comments."""
+    urls = []
+    seen = set()
+    for line in source:
+        url = line.strip()
+        if not url or url.startswith('#') or url in seen:
+            continue
+        seen.add(url)
+        urls.append(url)
+    return urls
+
+
+class Checkpoint:
+    """
+    Append-only JSONL log of per-URL progress.
+    A "crawled" entry points to the crawled content, spooled to a file per URL
+    in <checkpoint>.content/, so a resumed run skips the crawl without loading
+    every crawl into memory; a "done" entry means the result was already
+    written to the output (the spooled content of a successful URL is removed).
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.content_dir = path.with_name(path.name + ".content")
+        self.crawled: Dict[str, Path] = {}
+        self.done: Dict[str, str] = {}
+        if path.exists():
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by an interrupted write
+                        continue
+                    if entry['stage'] == 'crawled':
+                        self.crawled[entry['url']] = self.content_dir / self._content_name(entry['url'])
+                    elif entry['stage'] == 'done':
+                        self.done[entry['url']] = entry['status']
+        for url in [url for url in self.crawled if self.done.get(url) == 'ok']:
+            self.crawled.pop(url).unlink(missing_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _content_name(url: str) -> str:
+        return hashlib.sha1(url.encode()).hexdigest() + ".txt"
+
+    def _spool(self, url: str, content: str) -> Path:
+        self.content_dir.mkdir(parents=True, exist_ok=True)
+        path = self.content_dir / self._content_name(url)
+        # Written whole before the log points to it, so a crash never leaves a truncated crawl
+        partial = path.with_suffix(".tmp")
+        partial.write_text(content, encoding='utf-8')
+        os.replace(partial, path)
+        return path
+
+    def record(self, **entry):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def record_crawled(self, url: str, content: str):
+        self.crawled[url] = self._spool(url, content)
+        self.record(stage='crawled', url=url, content_file=self.crawled[url].name)
+
+    def crawled_content(self, url: str) -> Optional[str]:
+        """Content of an earlier crawl of `url`, or None if there is none (or its file is gone)."""
+        path = self.crawled.get(url)
+        if path is None:
+            return None
+        try:
+            return path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+    def record_done(self, url: str, status: str):
+        self.done[url] = status
+        self.record(stage='done', url=url, status=status)
+        if status == 'ok':
+            # Never needed again: --retry-failed only re-runs failures
+            path = self.crawled.pop(url, None)
+            if path is not None:
+                path.unlink(missing_ok=True)
+
+    def close(self):
+        self._file.close()
+
+
+class BatchRunner:
+    """
+    Runs crawl and extraction for many URLs with separate concurrency limits.
+    Given `snapshots` (start URL -> WARC file), pages come from the snapshots
+    instead, replayed in `replay_workers` processes.
+    """
+
+    def __init__(
+        self,
+        output: TextIO,
+        checkpoint: Checkpoint,
+        crawl_concurrency: int = 4,
+        llm_concurrency: int = 2,
+        crawler_options: Dict = None,
+        snapshots: Optional[Dict[str, str]] = None,
+        replay_workers: Optional[int] = None
+    ):
+        self.output = output
+        self.checkpoint = checkpoint
+        self.crawl_semaphore = asyncio.Semaphore(crawl_concurrency)
+        self.llm_semaphore = asyncio.Semaphore(llm_concurrency)
+        # URLs in flight at once: enough to keep every crawl and LLM slot busy, but no
+        # more, so crawled content never piles up waiting for the LLM
+        crawl_slots = (replay_workers or os.cpu_count() or 1) if snapshots is not None else crawl_concurrency
+        self.workers = crawl_slots + llm_concurrency
+        self.crawler_options = crawler_options or {}
+        self.snapshots = snapshots
+        self.replay_workers = replay_workers
+        self.pool: Optional[ProcessPoolExecutor] = None
+        # Crawler of each URL until its modules are known, to update the domain's crawl profile
+        self.crawlers: Dict[str, DocumentationCrawler] = {}
+        self.extractor = ModuleExtractor()
+        self.stats = {
+            "succeeded": 0,
+            "failed": 0,
+            "crawl_seconds": 0.0,
+            "llm_seconds": 0.0,
+            "chars": 0,
+            "modules": 0,
+        }
+
+    def _emit(self, result: Dict):
+        self.output.write(json.dumps(result) + "\n")
+        self.output.flush()
+        self.checkpoint.record_done(result['url'], result['status'])
+
+    async def _replay(self, url: str) -> str:
+        if url not in self.snapshots:
+            raise Exception("No snapshot for this URL")
+        started = time.time()
+        # Parsing is CPU-bound; each snapshot is replayed in a worker process
+        replayed = await asyncio.get_running_loop().run_in_executor(
+            self.pool, replay_snapshot, self.snapshots[url]
+        )
+        self.stats["crawl_seconds"] += time.time() - started
+        return replayed["content"]
+
+    async def _crawl(self, url: str) -> str:
+        if self.snapshots is not None:
+            return await self._replay(url)
+        content = self.checkpoint.crawled_content(url)
+        if content is not None:
+            return content
+        async with self.crawl_semaphore:
+            started = time.time()
+            # One crawler per URL: crawl state (visited set, timers) is per instance
+            crawler = DocumentationCrawler(**self.crawler_options)
+            content = await crawler.crawl_documentation(url)
+            self.crawlers[url] = crawler
+            self.stats["crawl_seconds"] += time.time() - started
+        if content:
+            self.checkpoint.record_crawled(url, content)
+        return content
+
+    async def process(self, url: str):
+        try:
+            content = await self._crawl(url)
+            crawler = self.crawlers.pop(url, None)
+            if not content:
+                self.stats["failed"] += 1
+                self._emit({"url": url, "status": "failed", "error": "No content extracted", "modules": []})
+                return
+
+            async with self.llm_semaphore:
+                started = time.time()
+                modules = await self.extractor.extract_modules([{"url": url, "content": content}])
+                self.stats["llm_seconds"] += time.time() - started
+
+            if crawler is not None:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, crawler.record_yield, url, crawler.page_log, content, modules
+                )
+            self.stats["succeeded"] += 1
+            self.stats["chars"] += len(content)
+            self.stats["modules"] += len(modules)
+            self._emit({"url": url, "status": "ok", "modules": modules})
+            if modules:
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, get_search_index().index_url, url, modules)
+                except Exception as e:
+                    print(f"Search indexing failed for {url}: {str(e)}", file=sys.stderr)
+            print(f"✓ {url}: {len(modules)} module(s)", file=sys.stderr)
+        except Exception as e:
+            self.stats["failed"] += 1
+            self._emit({"url": url, "status": "failed", "error": str(e), "modules": []})
+            print(f"✗ {url}: {str(e)}", file=sys.stderr)
+
+    async def _work(self, urls: Iterator[str]):
+        for url in urls:
+            await self.process(url)
+
+    async def _process_all(self, urls: List[str]):
+        # A fixed set of workers sharing one iterator, rather than a task per URL up front
+        remaining = iter(urls)
+        await asyncio.gather(*(self._work(remaining) for _ in range(min(self.workers, len(urls)))))
+
+    async def run(self, urls: List[str]):
+        if self.snapshots is None:
+            await self._process_all(urls)
+            return
+        with ProcessPoolExecutor(self.replay_workers) as self.pool:
+            await self._process_all(urls)
+
+
+def print_summary(stats: Dict, skipped: int, elapsed: float):
+    processed = stats["succeeded"] + stats["failed"]
+    rate = processed / elapsed * 60 if elapsed > 0 else 0.0
+    print("\n=== Batch Summary ===", file=sys.stderr)
+    print(f"Processed: {processed} URL(s) ({stats['succeeded']} ok, {stats['failed']} failed)", file=sys.stderr)
+    print(f"Skipped (already done): {skipped}", file=sys.stderr)
+    print(f"Modules extracted: {stats['modules']}", file=sys.stderr)
+    print(f"Content crawled: {stats['chars']} characters", file=sys.stderr)
+    print(f"Wall time: {elapsed:.1f}s ({rate:.1f} URLs/min)", file=sys.stderr)
+    if processed:
+        print(f"Avg crawl time: {stats['crawl_seconds'] / processed:.1f}s per URL", file=sys.stderr)
+    if stats["succeeded"]:
+        print(f"Avg LLM time: {stats['llm_seconds'] / stats['succeeded']:.1f}s per URL", file=sys.stderr)
+    print("=====================", file=sys.stderr)
+
+
+def main(argv: List[str] = None):
+    load_env()
+    parser = argparse.ArgumentParser(description="Batch-extract product modules from documentation URLs")
+    parser.add_argument("input", nargs="?", help="File with one URL per line, or - for stdin (default; "
+                        "with --replay, every snapshotted URL)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file results are appended to")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--crawl-concurrency", type=int, default=4)
+    parser.add_argument("--llm-concurrency", type=int, default=2)
+    parser.add_argument("--retry-failed", action="store_true", help="Re-run URLs that failed in a previous run")
+    parser.add_argument("--max-pages", type=int, default=20)
+    parser.add_argument("--max-depth", type=int, default=2)
+    parser.add_argument("--page-timeout", type=int, default=8)
+    parser.add_argument("--outline", action="store_true",
+                        help="Outline-first extraction: page heading outlines, full text only for sparse pages")
+    parser.add_argument("--large-site", action="store_true",
+                        help="Disk-backed frontier and spooled page text, for sites with thousands of pages")
+    parser.add_argument("--snapshot-dir", help="Archive every crawl as a WARC file in this directory")
+    parser.add_argument("--replay", nargs="+", metavar="SNAPSHOT",
+                        help="Extract from snapshot files or directories (newest per URL) instead of crawling")
+    parser.add_argument("--replay-workers", type=int, help="Processes replaying snapshots (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    snapshots = latest_snapshots(args.replay) if args.replay else None
+    if snapshots is not None and args.input is None:
+        urls = list(snapshots)
+    elif args.input in (None, "-"):
+        urls = read_urls(sys.stdin)
+    else:
+        with open(args.input, encoding='utf-8') as f:
+            urls = read_urls(f)
+
+    checkpoint = Checkpoint(Path(args.checkpoint or f"{args.output}.checkpoint"))
+    pending = [
+        url for url in urls
+        if url not in checkpoint.done
+        or (args.retry_failed and checkpoint.done[url] != 'ok')
+    ]
+    skipped = len(urls) - len(pending)
+    print(f"{len(urls)} URL(s) in input, {skipped} already done, {len(pending)} to process", file=sys.stderr)
+
+    started = time.time()
+    with open(args.output, 'a', encoding='utf-8') as output:
+        runner = BatchRunner(
+            output,
+            checkpoint,
+            crawl_concurrency=args.crawl_concurrency,
+            llm_concurrency=args.llm_concurrency,
+            crawler_options={
+                "max_pages": args.max_pages,
+                "max_depth": args.max_depth,
+                "page_timeout": args.page_timeout,
+                "outline_mode": args.outline,
+                "large_site": args.large_site,
+                "snapshot_dir": args.snapshot_dir,
+            },
+            snapshots=snapshots,
+            replay_workers=args.replay_workers
+        )
+        try:
+            asyncio.run(runner.run(pending))
+        except KeyboardInterrupt:
+            print("\nInterrupted; rerun the same command to resume.", file=sys.stderr)
+        finally:
+            checkpoint.close()
+            print_summary(runner.stats, skipped, time.time() - started)
+
+
+if __name__ == "__main__":
+    main()
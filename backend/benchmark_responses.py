@@ -0,0 +1,134 @@
+"""
+Benchmark /extract response encoding on large synthetic results.
+
+Compares the old path (response_model validation of plain dicts, then the
+standard json encoder) with the current one (modules validated once by the
+extractor, encoded with services.responses.dumps), and reports compressed
+sizes and timings for each available Content-Encoding.
+
+Usage:
+    python benchmark_responses.py --urls 20 --modules 100 --submodules 15
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from services.responses import brotli, compress, compute_etag, dumps, orjson
+from services.schema import normalize_modules
+
+
+WORDS = (
+    "account billing report dashboard user role permission workflow automation "
+    "integration export import schedule alert notification audit security policy "
+    "team project task invoice payment analytics metric chart filter search"
+).split()
+
+
+class LegacyExtractResponse(BaseModel):
+    """The response model as it was before the typed schema."""
+    modules: List[dict]
+    job_id: Optional[str] = None
+    merged: Optional[List[dict]] = None
+    partial: bool = False
+
+
+def synthetic_result(urls: int, modules: int, submodules: int, seed: int = 0) -> Dict:
+    rng = random.Random(seed)
+
+    def phrase(n: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(n))
+
+    return {
+        "modules": [
+            {
+                "url": f"https://docs.example.com/product-{u}/",
+                "modules": [
+                    {
+                        "module": phrase(2).title(),
+                        "description": phrase(25),
+                        "submodules": {phrase(3).title(): phrase(15) for _ in range(submodules)},
+                    }
+                    for _ in range(modules)
+                ],
+                "prompt": {"version": "2", "prompt_chars": 60000, "approx_tokens": 15000},
+                "partial": False,
+            }
+            for u in range(urls)
+        ],
+        "job_id": "0" * 32,
+        "merged": None,
+        "partial": False,
+    }
+
+
+def legacy_encode(result: Dict) -> bytes:
+    # What FastAPI did for response_model=ExtractResponse with List[dict]
+    validated = LegacyExtractResponse.model_validate(result)
+    content = validated.model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def encode_response(result: Dict, encoding: str) -> bytes:
+    body = dumps(result)
+    compute_etag(body)
+    return compress(body, encoding)
+
+
+def timed(fn: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark extraction response encoding")
+    parser.add_argument("--urls", type=int, default=20)
+    parser.add_argument("--modules", type=int, default=100, help="Modules per URL")
+    parser.add_argument("--submodules", type=int, default=15, help="Submodules per module")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    result = synthetic_result(args.urls, args.modules, args.submodules)
+    total_modules = args.urls * args.modules
+    print(f"Synthetic result: {args.urls} URLs, {total_modules} modules, "
+          f"{total_modules * args.submodules} submodules")
+    print(f"Encoder: {'orjson ' + orjson.__version__ if orjson else 'json (orjson not installed)'}")
+
+    # One-time validation cost paid by the extractor, not per response
+    validate_ms = timed(lambda: [normalize_modules(entry["modules"]) for entry in result["modules"]], args.repeat)
+
+    legacy_body = legacy_encode(result)
+    body = dumps(result)
+    rows = [
+        ("legacy (validate + json)", timed(lambda: legacy_encode(result), args.repeat), len(legacy_body)),
+        ("fast (dumps)", timed(lambda: dumps(result), args.repeat), len(body)),
+        ("fast + etag", timed(lambda: compute_etag(dumps(result)), args.repeat), len(body)),
+    ]
+    for encoding in ["gzip"] + (["br"] if brotli is not None else []):
+        compressed = compress(body, encoding)
+        rows.append((
+            f"fast + etag + {encoding}",
+            timed(lambda: encode_response(result, encoding), args.repeat),
+            len(compressed),
+        ))
+    if brotli is None:
+        print("brotli not installed; br encoding skipped")
+
+    print(f"\n{'path':<28}{'ms':>10}{'bytes':>14}{'ratio':>8}")
+    for name, ms, size in rows:
+        print(f"{name:<28}{ms:>10.1f}{size:>14,}{size / len(body):>8.2f}")
+    print(f"\nSchema validation (once per extraction): {validate_ms:.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
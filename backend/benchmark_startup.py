@@ -0,0 +1,199 @@
+"""
+Benchmark backend cold start: time from launching uvicorn until the first
+successful responses.
+
+Each trial starts a fresh server process against a local documentation page
+and a local OpenAI-compatible endpoint, then measures:
+
+- ready: time until GET / answers 200
+- first extract: time until the first POST /extract returns modules
+- next extract: latency of a second, uncached extraction from the same host
+
+Both local servers add --connect-latency seconds to every new connection to
+stand in for DNS/TCP/TLS setup, so reused or pre-warmed connections show up
+in the numbers as they would against real hosts.
+
+Usage:
+    python benchmark_startup.py --trials 5 --connect-latency 0.15
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+
+DOC_PAGE = """<html><head><title>Acme Docs</title></head><body><main>
+<h1>Acme Platform Documentation</h1>
+<p>Billing lets admins manage invoices, payment methods and subscription plans.</p>
+<p>Reporting provides dashboards, scheduled exports and custom report builders.</p>
+<p>Access Control covers single sign-on, roles and audit logs.</p>
+</main></body></html>"""
+
+LLM_ANSWER = json.dumps({"modules": [
+    {"module": "Billing", "description": "Invoices and payments",
+     "submodules": {"Invoices": "Manage invoices", "Payment Methods": "Cards and bank accounts"}},
+    {"module": "Reporting", "description": "Dashboards and exports",
+     "submodules": {"Dashboards": "Visual reports", "Scheduled Exports": "Recurring exports"}},
+]})
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_handler(connect_latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            # Paid once per connection, like a handshake
+            time.sleep(connect_latency)
+            super().setup()
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, body: bytes, content_type: str):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith("/v1/models"):
+                self._send(json.dumps({"object": "list", "data": []}).encode(), "application/json")
+            else:
+                self._send(DOC_PAGE.encode(), "text/html")
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            events = []
+            for i in range(0, len(LLM_ANSWER), 40):
+                chunk = {
+                    "id": "bench", "object": "chat.completion.chunk", "created": 0, "model": "bench",
+                    "choices": [{"index": 0, "delta": {"content": LLM_ANSWER[i:i + 40]}, "finish_reason": None}],
+                }
+                events.append(f"data: {json.dumps(chunk)}\n\n")
+            done = {
+                "id": "bench", "object": "chat.completion.chunk", "created": 0, "model": "bench",
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            events.append(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n")
+            self._send("".join(events).encode(), "text/event-stream")
+
+    return Handler
+
+
+def start_server(connect_latency: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), make_handler(connect_latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def request(url: str, payload: Dict = None, timeout: float = 60):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return response.status, json.loads(response.read() or b"null")
+
+
+def extract(base: str, url: str):
+    status, body = request(f"{base}/extract", {"urls": [url]})
+    modules = sum(len(entry["modules"]) for entry in body["modules"]) if status == 200 else 0
+    if not modules:
+        raise RuntimeError(f"extract failed: {status} {body}")
+
+
+def run_trial(docs_url: str, llm_base: str, tmp: str) -> Dict[str, float]:
+    port = free_port()
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="bench",
+        OPENAI_API_BASE=llm_base,
+        OPENAI_MODEL="bench",
+        OPENAI_CASCADE_MODELS="",
+        STORAGE_BACKEND="memory",
+        SEARCH_INDEX_PATH=os.path.join(tmp, f"search-{port}.db"),
+        WARM_UP_URLS=docs_url,
+    )
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=str(Path(__file__).parent), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            try:
+                if request(f"{base}/", timeout=1)[0] == 200:
+                    break
+            except OSError:
+                time.sleep(0.01)
+            if process.poll() is not None or time.perf_counter() - started > 60:
+                raise RuntimeError("server did not start")
+        ready = time.perf_counter() - started
+
+        extract(base, docs_url)
+        first_extract = time.perf_counter() - started
+
+        # Different page, so neither the page nor the LLM cache can answer it
+        next_started = time.perf_counter()
+        extract(base, docs_url + "next")
+        return {
+            "ready": ready,
+            "first_extract": first_extract,
+            "next_extract": time.perf_counter() - next_started,
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark backend cold start")
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--connect-latency", type=float, default=0.15,
+                        help="Seconds added to every new connection to the local servers")
+    args = parser.parse_args(argv)
+
+    docs = start_server(args.connect_latency)
+    llm = start_server(args.connect_latency)
+    docs_url = f"http://127.0.0.1:{docs.server_address[1]}/docs/"
+    llm_base = f"http://127.0.0.1:{llm.server_address[1]}/v1"
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for trial in range(args.trials):
+            result = run_trial(docs_url, llm_base, tmp)
+            results.append(result)
+            print(f"trial {trial + 1}: ready {result['ready']:.2f}s, first extract {result['first_extract']:.2f}s, "
+                  f"next extract {result['next_extract']:.2f}s")
+
+    print(f"\nmedian ready: {statistics.median(r['ready'] for r in results):.2f}s")
+    print(f"median time to first successful extract: "
+          f"{statistics.median(r['first_extract'] for r in results):.2f}s")
+    print(f"median next extract: {statistics.median(r['next_extract'] for r in results):.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""
+Offline quality-versus-cost evaluation of the crawl and prompt settings.
+
+Replays archived fixture docs sites through DocumentationCrawler and
+ModuleExtractor for every combination of the swept settings, and reports
+module and submodule recall against each site's reference module tree next
+to what the settings cost: latency, pages and bytes fetched, and prompt tokens.
+
+    python evaluate.py
+    python evaluate.py --page-chars 3000,5000 --max-depth 2,3 --json results.json
+
+Swept settings (comma-separated values; the first defaults are today's):
+
+- --page-chars: text kept per page (DocumentationCrawler max_page_chars)
+- --crawl-chars: text kept per crawl (max_content_length)
+- --prompt-chars: documentation kept in the prompt (PromptTemplate max_content_chars)
+- --max-pages, --max-depth: crawl budget
+- --models: LLM model
+- --modes: "full" page text, or "outline"-first (DocumentationCrawler outline_mode)
+
+Sites come from the built-in synthetic fixtures (see evaluation/fixtures.py)
+and from --fixtures directories of archived crawls: WARC snapshots recorded
+with batch.py --snapshot-dir, each with a <name>.reference.json listing the
+modules the site really documents.
+
+By default the LLM is evaluation.llm.FakeLLMClient, which returns exactly the
+reference modules named in the prompt. Its latency is modelled from prompt
+and output size, so results are reproducible and free. Because it does not
+depend on the model, comparing models needs recorded completions:
+`--llm live --recording rec.json` calls OPENAI_API_BASE for prompts not yet
+recorded and saves them, and `--llm recorded --recording rec.json` replays
+them without network access.
+
+Crawls run from the archive, so fetch time is modelled as --page-latency
+seconds per page (the crawler fetches one page at a time).
+"""
+
+import io
+import os
+import sys
+import json
+import asyncio
+import argparse
+import itertools
+import tempfile
+import time
+import re
+from contextlib import redirect_stdout
+from typing import Dict, List, Optional
+
+from services.config import load_env
+from services.crawler import DocumentationCrawler
+from services.extractor import ModuleExtractor
+from services.prompts import PromptTemplate
+from services.storage import MemoryStorage
+from evaluation.fixtures import Fixture, builtin_sites, load_fixtures
+from evaluation.llm import FakeLLMClient, RecordedLLMClient
+
+
+# Today's defaults: DocumentationCrawler, PromptTemplate and OPENAI_MODEL
+BASELINE = {
+    "page_chars": 5000,
+    "crawl_chars": 40000,
+    "prompt_chars": 60000,
+    "max_pages": 20,
+    "max_depth": 2,
+    "mode": "full",
+}
+SWEEP = {
+    "page_chars": [5000, 2000, 10000],
+    "crawl_chars": [40000, 20000, 80000],
+    "prompt_chars": [60000, 30000, 120000],
+    "max_pages": [20, 10, 40],
+    "max_depth": [2, 1, 3],
+}
+
+
+class MeteredReplay:
+    """A snapshot as the crawler's replay source, counting the pages and bytes served."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.pages = 0
+        self.bytes = 0
+
+    def get(self, url: str):
+        response = self.reader.get(url)
+        if response is not None:
+            self.pages += 1
+            self.bytes += len(response.body)
+        return response
+
+
+def _tokens(name: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def _matches(name: str, reference: str) -> bool:
+    """Same name, ignoring case and punctuation, or mostly the same words (for real model output)."""
+    a, b = _tokens(name), _tokens(reference)
+    return bool(a and b) and (a == b or len(a & b) / len(a | b) >= 0.6)
+
+
+def score(modules: List[Dict], reference: List[Dict]) -> Dict:
+    """
+    Recall of reference module names among extracted modules, and of reference
+    submodule names among all extracted submodules (a model may file a
+    submodule under a different module).
+    """
+    names = [module.get("module", "") for module in modules]
+    subnames = [name for module in modules for name in (module.get("submodules") or {})]
+    ref_subs = [name for module in reference for name in (module.get("submodules") or {})]
+    found_modules = sum(1 for ref in reference if any(_matches(name, ref["module"]) for name in names))
+    found_subs = sum(1 for ref in ref_subs if any(_matches(name, ref) for name in subnames))
+    return {
+        "module_recall": found_modules / len(reference) if reference else 1.0,
+        "submodule_recall": found_subs / len(ref_subs) if ref_subs else 1.0,
+    }
+
+
+async def run_one(fixture: Fixture, config: Dict, client, page_latency: float) -> Dict:
+    """Crawl one fixture from its archive and extract, with one combination of settings."""
+    replay = MeteredReplay(fixture.reader())
+    crawler = DocumentationCrawler(
+        max_pages=config["max_pages"],
+        max_depth=config["max_depth"],
+        max_content_length=config["crawl_chars"],
+        max_page_chars=config["page_chars"],
+        storage=MemoryStorage(),
+        replay=replay,
+        outline_mode=config["mode"] == "outline",
+        use_profiles=False,
+    )
+    started = time.perf_counter()
+    content = await crawler.crawl_documentation(fixture.start_url)
+    crawl_cpu = time.perf_counter() - started
+
+    # Fresh cache per run; no cascade or hedging, so each run is exactly one completion
+    extractor = ModuleExtractor(storage=MemoryStorage(), client=client)
+    extractor.model = config["model"]
+    extractor.cascade_models = []
+    extractor.hedge_percentile = 0
+    extractor.template = PromptTemplate(max_content_chars=config["prompt_chars"])
+    calls_before = len(client.calls)
+    report: Dict = {}
+    modules = []
+    if content:
+        modules = await extractor.extract_modules([{"url": fixture.start_url, "content": content}], report=report)
+    calls = client.calls[calls_before:]
+
+    llm_latency = sum(call["latency"] for call in calls)
+    crawl_latency = crawl_cpu + replay.pages * page_latency
+    return {
+        "site": fixture.name,
+        **config,
+        **score(modules, fixture.reference),
+        "latency": crawl_latency + llm_latency,
+        "crawl_latency": crawl_latency,
+        "llm_latency": llm_latency,
+        "pages": replay.pages,
+        "bytes": replay.bytes,
+        "content_chars": len(content),
+        "prompt_tokens": sum(call["prompt_tokens"] for call in calls),
+        "output_tokens": sum(call["output_tokens"] for call in calls),
+        "prompt_truncated": bool(report.get("prompt", {}).get("truncated")),
+    }
+
+
+def summarize(runs: List[Dict], keys: List[str]) -> List[Dict]:
+    """One row per combination of settings: mean recall and latency per site, total cost."""
+    rows: Dict[tuple, Dict] = {}
+    for run in runs:
+        config = tuple(run[key] for key in keys)
+        row = rows.setdefault(config, {**{key: run[key] for key in keys}, "runs": []})
+        row["runs"].append(run)
+    summary = []
+    for row in rows.values():
+        runs_ = row.pop("runs")
+        n = len(runs_)
+        summary.append({
+            **row,
+            "module_recall": sum(r["module_recall"] for r in runs_) / n,
+            "submodule_recall": sum(r["submodule_recall"] for r in runs_) / n,
+            "latency": sum(r["latency"] for r in runs_) / n,
+            "pages": sum(r["pages"] for r in runs_),
+            "bytes": sum(r["bytes"] for r in runs_),
+            "prompt_tokens": sum(r["prompt_tokens"] for r in runs_),
+        })
+    return sorted(summary, key=lambda row: row["latency"])
+
+
+def pareto(rows: List[Dict]) -> List[Dict]:
+    """Rows no other row beats on both latency and submodule recall (rows sorted by latency)."""
+    frontier, best = [], -1.0
+    for row in rows:
+        if row["submodule_recall"] > best:
+            frontier.append(row)
+            best = row["submodule_recall"]
+    return frontier
+
+
+def print_table(rows: List[Dict], keys: List[str], baseline: Optional[Dict], frontier: List[Dict]):
+    header = [key.replace("_", " ") for key in keys] + [
+        "mod rec", "sub rec", "latency", "pages", "KB", "prompt tok"
+    ]
+    lines = [header]
+    for row in rows:
+        mark = ("*" if row is baseline else "") + ("+" if row in frontier else "")
+        lines.append([str(row[key]) for key in keys] + [
+            f"{row['module_recall']:.2f}",
+            f"{row['submodule_recall']:.2f}",
+            f"{row['latency']:.2f}s",
+            str(row["pages"]),
+            f"{row['bytes'] / 1024:.0f}",
+            str(row["prompt_tokens"]),
+            mark,
+        ])
+    widths = [max(len(line[i]) for line in lines if i < len(line)) for i in range(len(lines[1]))]
+    for line in lines:
+        print("  ".join(cell.rjust(width) for cell, width in zip(line, widths)))
+    print("\n* today's defaults   + best recall for its latency (Pareto frontier)")
+
+
+def parse_values(value: str, cast=int) -> List:
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+async def evaluate(
+    fixtures: List[Fixture], configs: List[Dict], clients: Dict, page_latency: float, verbose: bool
+) -> List[Dict]:
+    runs = []
+    for i, config in enumerate(configs, 1):
+        for fixture in fixtures:
+            # The crawler and extractor log to stdout; keep the report readable
+            client = clients[fixture.name]
+            if verbose:
+                run = await run_one(fixture, config, client, page_latency)
+            else:
+                with redirect_stdout(io.StringIO()):
+                    run = await run_one(fixture, config, client, page_latency)
+            runs.append(run)
+        if sys.stderr.isatty():
+            print(f"\r{i}/{len(configs)} settings evaluated", end="", file=sys.stderr, flush=True)
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    return runs
+
+
+def main(argv: List[str] = None):
+    load_env()
+    parser = argparse.ArgumentParser(description="Evaluate extraction quality against crawl and prompt cost")
+    for name, values in SWEEP.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", default=",".join(map(str, values)),
+                            help=f"Values to sweep (default {','.join(map(str, values))})")
+    default_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    parser.add_argument("--models", default=default_model, help=f"Models to sweep (default {default_model})")
+    parser.add_argument("--modes", default="full,outline", help="Extraction modes to sweep (default full,outline)")
+    parser.add_argument("--fixtures", action="append", default=[],
+                        help="Directory of archived fixtures (*.reference.json + snapshots); repeatable")
+    parser.add_argument("--no-builtin", action="store_true", help="Skip the built-in synthetic sites")
+    parser.add_argument("--write-fixtures", metavar="DIR",
+                        help="Archive the built-in sites and their reference trees to DIR and exit")
+    parser.add_argument("--llm", choices=["fake", "recorded", "live"], default="fake")
+    parser.add_argument("--recording", default="evaluation/recordings.json",
+                        help="Recorded completions for --llm recorded / live")
+    parser.add_argument("--page-latency", type=float, default=0.3,
+                        help="Modelled seconds to fetch one page (default 0.3)")
+    parser.add_argument("--min-recall-drop", type=float, default=0.0,
+                        help="Recall below today's defaults still accepted when recommending settings")
+    parser.add_argument("--all", action="store_true",
+                        help="List every combination, not just the Pareto frontier and today's defaults")
+    parser.add_argument("--json", metavar="FILE", help="Write every run to FILE")
+    parser.add_argument("--verbose", action="store_true", help="Show crawler and extractor logs")
+    args = parser.parse_args(argv)
+
+    if args.write_fixtures:
+        for site in builtin_sites():
+            fixture = site.archive(args.write_fixtures)
+            print(f"{site.name}: {len(site.pages)} pages -> {fixture.snapshot}")
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = [] if args.no_builtin else [site.archive(tmp) for site in builtin_sites()]
+        for directory in args.fixtures:
+            fixtures.extend(load_fixtures(directory))
+        if not fixtures:
+            parser.error("no fixtures to evaluate")
+
+        sweep = {name: parse_values(getattr(args, name)) for name in SWEEP}
+        sweep["mode"] = parse_values(args.modes, str)
+        sweep["model"] = parse_values(args.models, str)
+        keys = list(sweep)
+        configs = [dict(zip(keys, values)) for values in itertools.product(*sweep.values())]
+
+        if args.llm == "fake":
+            client = None
+            clients = {fixture.name: FakeLLMClient(fixture.reference) for fixture in fixtures}
+        else:
+            live = None
+            if args.llm == "live":
+                from services.clients import create_llm_client
+                live = create_llm_client()
+            client = RecordedLLMClient(args.recording, live=live)
+            clients = {fixture.name: client for fixture in fixtures}
+
+        print(f"Evaluating {len(configs)} settings on {len(fixtures)} site(s): "
+              f"{', '.join(fixture.name for fixture in fixtures)}", file=sys.stderr)
+        started = time.perf_counter()
+        try:
+            runs = asyncio.run(evaluate(fixtures, configs, clients, args.page_latency, args.verbose))
+        finally:
+            if isinstance(client, RecordedLLMClient):
+                client.save()
+        print(f"Done in {time.perf_counter() - started:.1f}s\n", file=sys.stderr)
+
+    rows = summarize(runs, keys)
+    # Only show swept settings that vary
+    shown = [key for key in keys if len(sweep[key]) > 1] or keys
+    baseline = next((
+        row for row in rows
+        if all(row[key] == BASELINE[key] for key in BASELINE) and row["model"] == default_model
+    ), None)
+    frontier = pareto(rows)
+    listed = rows if args.all else [row for row in rows if row in frontier or row is baseline]
+    print_table(listed, shown, baseline, frontier)
+
+    if baseline is not None:
+        floor_modules = baseline["module_recall"] - args.min_recall_drop
+        floor_subs = baseline["submodule_recall"] - args.min_recall_drop
+        best = next(
+            row for row in rows
+            if row["module_recall"] >= floor_modules and row["submodule_recall"] >= floor_subs
+        )
+        print(f"\nToday's defaults: submodule recall {baseline['submodule_recall']:.2f}, "
+              f"{baseline['latency']:.2f}s per site, {baseline['prompt_tokens']} prompt tokens")
+        print(f"Fastest at least as good: " + ", ".join(f"{key}={best[key]}" for key in keys)
+              + f" (submodule recall {best['submodule_recall']:.2f}, {best['latency']:.2f}s per site, "
+              f"{best['prompt_tokens']} prompt tokens)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": runs, "summary": rows}, f, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Offline evaluation: fixture docs sites, reference module trees and stand-in LLM clients
@@ -0,0 +1,238 @@
+import json
+import random
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from services.snapshot import RawResponse, SnapshotReader, SnapshotWriter, snapshot_path
+
+
+# Filler vocabulary; never contains a module or submodule name, so only real mentions count
+FILLER_WORDS = (
+    "the a each every team member can quickly set review update open close track share keep "
+    "record item entry detail value field option list view page screen panel step rule limit "
+    "default custom daily weekly monthly new existing selected current previous related simple "
+    "clear flexible secure reliable consistent available required optional internal external"
+).split()
+
+
+class Fixture:
+    """One evaluation site: an archived crawl (WARC snapshot) and the modules it documents."""
+
+    def __init__(self, name: str, snapshot: str, reference: List[Dict]):
+        self.name = name
+        self.snapshot = str(snapshot)
+        self.reference = reference
+        self._reader: Optional[SnapshotReader] = None
+
+    def reader(self) -> SnapshotReader:
+        """The snapshot, parsed once and shared by every run against this fixture."""
+        if self._reader is None:
+            self._reader = SnapshotReader(self.snapshot)
+        return self._reader
+
+    @property
+    def start_url(self) -> str:
+        return self.reader().start_url
+
+
+class FixtureSite:
+    """A synthetic docs site: HTML pages by URL plus its reference module tree."""
+
+    def __init__(self, name: str, start_url: str, pages: Dict[str, str], reference: List[Dict]):
+        self.name = name
+        self.start_url = start_url
+        self.pages = pages
+        self.reference = reference
+
+    def archive(self, directory: str) -> Fixture:
+        """Write the site as a snapshot, as if every page had been crawled, plus its reference tree."""
+        path = snapshot_path(directory, self.start_url)
+        writer = SnapshotWriter(path, self.start_url, {})
+        try:
+            for url, html in self.pages.items():
+                body = html.encode("utf-8")
+                headers = {"Content-Type": "text/html; charset=utf-8"}
+                writer.write_response(RawResponse(url, 200, "OK", headers, body))
+        finally:
+            writer.close()
+        reference_path = Path(directory) / f"{self.name}.reference.json"
+        reference_path.write_text(json.dumps({"start_url": self.start_url, "snapshot": path.name,
+                                              "modules": self.reference}, indent=2))
+        return Fixture(self.name, str(path), self.reference)
+
+
+def load_fixtures(directory: str) -> List[Fixture]:
+    """
+    Archived fixtures in a directory: each <name>.reference.json names its
+    snapshot ("snapshot", relative to the directory) and lists the modules the
+    site documents in the extraction output format.
+    """
+    fixtures = []
+    for reference_path in sorted(Path(directory).glob("*.reference.json")):
+        data = json.loads(reference_path.read_text())
+        name = reference_path.name[:-len(".reference.json")]
+        fixtures.append(Fixture(name, str(Path(directory) / data["snapshot"]), data["modules"]))
+    return fixtures
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def _prose(rng: random.Random, words: int) -> str:
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 16))
+        sentence = " ".join(rng.choice(FILLER_WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+def _page(title: str, body: str) -> str:
+    return (
+        f"<html><head><title>{title}</title></head><body>"
+        f"<nav><a href=\"/\">Home</a></nav>"
+        f"<main><h1>{title}</h1>{body}</main>"
+        f"<footer>Copyright</footer></body></html>"
+    )
+
+
+def _links(links: List[tuple]) -> str:
+    return "<ul>" + "".join(f"<li><a href=\"{href}\">{text}</a></li>" for href, text in links) + "</ul>"
+
+
+def _reference(tree: Dict[str, List[str]]) -> List[Dict]:
+    return [
+        {
+            "module": module,
+            "description": f"{module} features",
+            "submodules": {sub: f"{sub} in {module}" for sub in subs},
+        }
+        for module, subs in tree.items()
+    ]
+
+
+def acme_site() -> FixtureSite:
+    """Small, flat site: every module on one page linked from the start page, plus a few noise pages."""
+    rng = random.Random(1)
+    base = "https://acme.test"
+    tree = {
+        "Billing": ["Invoices", "Payment Methods", "Subscriptions"],
+        "Reporting": ["Dashboards", "Scheduled Exports", "Report Builder"],
+        "Access Control": ["Single Sign-On", "Roles", "Audit Log"],
+        "Notifications": ["Email Alerts", "Webhooks"],
+        "Inventory": ["Stock Levels", "Purchase Orders", "Suppliers"],
+    }
+    pages = {}
+    noise = [("/docs/community/", "Community forum"), ("/docs/changelog/", "Changelog"), ("/blog/", "Blog")]
+    links = [(f"/docs/{_slug(module)}/", f"{module} guide") for module in tree] + noise
+    pages[f"{base}/docs/"] = _page("Acme Documentation", f"<p>{_prose(rng, 60)}</p>" + _links(links))
+    for module, subs in tree.items():
+        body = f"<p>{module} overview. {_prose(rng, 50)}</p>"
+        for sub in subs:
+            body += f"<h2 id=\"{_slug(sub)}\">{sub}</h2><p>Use {sub} to get started. {_prose(rng, 70)}</p>"
+        pages[f"{base}/docs/{_slug(module)}/"] = _page(module, body)
+    for href, title in noise:
+        pages[f"{base}{href}"] = _page(title, f"<p>{_prose(rng, 600)}</p>")
+    return FixtureSite("acme", f"{base}/docs/", pages, _reference(tree))
+
+
+def globex_site() -> FixtureSite:
+    """
+    Large, deep site. The start page links three product areas, each area
+    links its module overviews, and each overview has one long section per
+    submodule and links a detail page per submodule. Late sections fall past
+    the per-page cap, the overviews together exceed the crawl budget, and the
+    detail pages are one level deeper than the default max_depth.
+    """
+    rng = random.Random(2)
+    base = "https://globex.test"
+    areas = {
+        "Operations": {
+            "Fleet Management": ["Vehicle Tracking", "Maintenance Plans", "Fuel Cards", "Driver Logs", "Route Planner"],
+            "Warehouse": ["Bin Locations", "Cycle Counts", "Pick Lists", "Cross Docking", "Returns Desk"],
+            "Procurement": ["Requisitions", "Vendor Scorecards", "Contract Library", "Spend Analysis", "Approvals Matrix"],
+        },
+        "Finance": {
+            "General Ledger": ["Journal Entries", "Period Close", "Chart Of Accounts", "Intercompany", "Currency Revaluation"],
+            "Payables": ["Bill Capture", "Payment Runs", "Expense Claims", "Vendor Portal", "Tax Withholding"],
+            "Receivables": ["Dunning", "Cash Application", "Credit Limits", "Customer Statements", "Collections Queue"],
+            "Treasury": ["Bank Feeds", "Cash Forecasting", "Hedging Desk", "Loan Register", "Liquidity Reports"],
+        },
+        "People": {
+            "Payroll": ["Pay Calendars", "Deductions", "Payslips", "Overtime Rules", "Year End Filing"],
+            "Recruiting": ["Job Requisitions", "Candidate Pipeline", "Interview Kits", "Offer Letters", "Referral Program"],
+            "Learning": ["Course Catalog", "Learning Paths", "Certifications", "Skill Matrix", "Compliance Training"],
+        },
+    }
+    pages = {}
+    tree = {}
+    area_links = [(f"/help/areas/{_slug(area)}/", f"{area} product guides") for area in areas]
+    noise = [(f"/help/release-notes/{i}/", f"Release notes {i}") for i in range(1, 4)]
+    pages[f"{base}/help/"] = _page("Globex Help Center", f"<p>{_prose(rng, 80)}</p>" + _links(area_links + noise))
+    for href, title in noise:
+        pages[f"{base}{href}"] = _page(title, f"<p>{_prose(rng, 900)}</p>")
+    for area, modules in areas.items():
+        links = [(f"/help/{_slug(module)}/", f"{module} overview") for module in modules]
+        pages[f"{base}/help/areas/{_slug(area)}/"] = _page(
+            f"{area} guides", f"<p>{_prose(rng, 120)}</p>" + _links(links)
+        )
+        for module, subs in modules.items():
+            tree[module] = subs
+            body = f"<p>{module} overview. {_prose(rng, 80)}</p>"
+            for sub in subs:
+                body += f"<h2 id=\"{_slug(sub)}\">{sub}</h2><p>With {sub} you can plan ahead. {_prose(rng, 190)}</p>"
+            body += _links([(f"/help/{_slug(module)}/{_slug(sub)}/", f"{sub} guide") for sub in subs])
+            pages[f"{base}/help/{_slug(module)}/"] = _page(module, body)
+            for sub in subs:
+                pages[f"{base}/help/{_slug(module)}/{_slug(sub)}/"] = _page(
+                    f"{sub} guide", f"<p>{sub} is part of {module}. {_prose(rng, 450)}</p>"
+                )
+    return FixtureSite("globex", f"{base}/help/", pages, _reference(tree))
+
+
+def initech_site() -> FixtureSite:
+    """
+    Localized and versioned site: every page exists in three languages and
+    two versions, linked from a switcher on each page. Version 2 lacks the
+    newest module.
+    """
+    rng = random.Random(3)
+    base = "https://initech.test"
+    tree = {
+        "Projects": ["Milestones", "Gantt Charts", "Templates"],
+        "Timesheets": ["Time Entries", "Approvals", "Rates"],
+        "Resourcing": ["Capacity Planning", "Skills Search", "Bookings"],
+        "Portfolio": ["Scorecards", "Roadmaps", "Funding Rounds"],
+        "Client Portal": ["Shared Files", "Status Updates", "Sign Offs"],
+        "Automation Studio": ["Triggers", "Scripted Actions", "Run History"],
+    }
+    pages = {}
+    variants = [(locale, version) for locale in ("en", "de", "fr") for version in ("v3", "v2")]
+    for locale, version in variants:
+        modules = [m for m in tree if not (version == "v2" and m == "Automation Studio")]
+        prefix = f"/docs/{locale}/{version}"
+
+        def switcher(path: str) -> str:
+            return "<div class=\"switcher\">" + _links([
+                (f"/docs/{other_locale}/{other_version}{path}", f"{other_locale} {other_version}")
+                for other_locale, other_version in variants if (other_locale, other_version) != (locale, version)
+            ]) + "</div>"
+
+        links = [(f"{prefix}/{_slug(module)}/", f"{module} guide") for module in modules]
+        pages[f"{base}{prefix}/"] = _page(
+            "Initech Docs", f"<p>{_prose(rng, 70)}</p>" + _links(links) + switcher("/")
+        )
+        for module in modules:
+            body = f"<p>{module} overview. {_prose(rng, 60)}</p>"
+            for sub in tree[module]:
+                body += f"<h2>{sub}</h2><p>Open {sub} from the menu. {_prose(rng, 80)}</p>"
+            path = f"/{_slug(module)}/"
+            pages[f"{base}{prefix}{path}"] = _page(module, body + switcher(path))
+    return FixtureSite("initech", f"{base}/docs/en/v3/", pages, _reference(tree))
+
+
+def builtin_sites() -> List[FixtureSite]:
+    return [acme_site(), globex_site(), initech_site()]
@@ -0,0 +1,157 @@
+import json
+import re
+import time
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterator, List
+
+
+_PAGE_MARKER = re.compile(r"--- (?:Content from|Outline of) \S+ ---")
+
+
+def _chunks(text: str, finish_reason: str, size: int = 40) -> Iterator[SimpleNamespace]:
+    """The text as OpenAI-style streaming chunks, the last one carrying finish_reason."""
+    for i in range(0, len(text), size):
+        delta = SimpleNamespace(content=text[i:i + size])
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)])
+    yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason=finish_reason)])
+
+
+class _Client(ABC):
+    """Just enough of the OpenAI client for ModuleExtractor: chat.completions.create(stream=True)."""
+
+    base_url = "http://evaluation.invalid/v1"
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        # One entry per completion: model, prompt_tokens, output_tokens, latency (seconds)
+        self.calls: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def _record(self, **call):
+        with self._lock:
+            self.calls.append(call)
+
+    @abstractmethod
+    def _create(self, model: str, messages: List[Dict], **kwargs):
+        """Answer one chat completion request as a stream of chunks (see _chunks)."""
+
+
+class FakeLLMClient(_Client):
+    """
+    A deterministic stand-in for the LLM that knows the fixture's reference
+    tree. It answers with exactly the reference modules and submodules whose
+    names appear in the documentation part of the prompt, so recall measures
+    what the crawl and prompt settings let through rather than model quality.
+
+    Nothing is slept. Each call's latency is modelled from its size as
+    `ttft + prompt_tokens / prefill_tps + output_tokens / decode_tps`, and
+    output over max_tokens is cut off with finish_reason "length", as a real
+    model's would be.
+    """
+
+    def __init__(self, reference: List[Dict], ttft: float = 0.4, prefill_tps: float = 5000, decode_tps: float = 80):
+        super().__init__()
+        self.reference = reference
+        self.ttft = ttft
+        self.prefill_tps = prefill_tps
+        self.decode_tps = decode_tps
+
+    @staticmethod
+    def _mentioned(name: str, text: str) -> bool:
+        return re.search(r"\b" + re.escape(name.lower()) + r"\b", text) is not None
+
+    def answer(self, prompt: str) -> str:
+        # Only the documentation counts: not the instructions, source list or page URLs
+        docs = _PAGE_MARKER.sub(" ", prompt.split("=" * 80, 1)[-1]).lower()
+        modules = []
+        for module in self.reference:
+            submodules = {
+                name: description for name, description in (module.get("submodules") or {}).items()
+                if self._mentioned(name, docs)
+            }
+            if submodules or self._mentioned(module["module"], docs):
+                modules.append({
+                    "module": module["module"],
+                    "description": module.get("description", ""),
+                    "submodules": submodules,
+                })
+        return json.dumps({"modules": modules})
+
+    def _create(self, model: str, messages: List[Dict], max_tokens: int = 2000, **kwargs):
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        text = self.answer(messages[-1]["content"])
+        finish_reason = "stop"
+        if len(text) // 4 > max_tokens:
+            text, finish_reason = text[:max_tokens * 4], "length"
+        output_tokens = len(text) // 4
+        latency = self.ttft + prompt_tokens / self.prefill_tps + output_tokens / self.decode_tps
+        self._record(model=model, prompt_tokens=prompt_tokens, output_tokens=output_tokens, latency=latency)
+        return _chunks(text, finish_reason)
+
+
+class RecordedLLMClient(_Client):
+    """
+    Replays completions recorded in a JSON file, keyed by model, messages,
+    temperature and max_tokens, with the latency measured when they were recorded.
+
+    With `live` (a real OpenAI-compatible client), prompts missing from the
+    recording are sent to it and added; save() writes the file back. Without
+    it, a missing prompt raises LookupError, so a replayed evaluation never
+    quietly calls the API.
+    """
+
+    def __init__(self, path: str, live=None):
+        super().__init__()
+        self.path = Path(path)
+        self.live = live
+        self.recordings: Dict[str, Dict] = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.added = 0
+
+    @staticmethod
+    def key(model: str, messages: List[Dict], temperature, max_tokens) -> str:
+        payload = json.dumps([model, messages, temperature, max_tokens], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _create(self, model: str, messages: List[Dict], temperature=None, max_tokens=None, **kwargs):
+        key = self.key(model, messages, temperature, max_tokens)
+        recording = self.recordings.get(key)
+        if recording is None:
+            if self.live is None:
+                raise LookupError(f"no recorded {model} completion for this prompt; record it with --llm live")
+            recording = self._call_live(model, messages, temperature, max_tokens, **kwargs)
+            with self._lock:
+                self.recordings[key] = recording
+                self.added += 1
+        self._record(
+            model=model,
+            prompt_tokens=sum(len(message["content"]) for message in messages) // 4,
+            output_tokens=len(recording["text"]) // 4,
+            latency=recording["latency"],
+        )
+        return _chunks(recording["text"], recording["finish_reason"])
+
+    def _call_live(self, model: str, messages: List[Dict], temperature, max_tokens, **kwargs) -> Dict:
+        started = time.monotonic()
+        parts, finish_reason = [], "stop"
+        response = self.live.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, max_tokens=max_tokens, **kwargs
+        )
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta and choice.delta.content:
+                parts.append(choice.delta.content)
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+        return {"model": model, "text": "".join(parts), "finish_reason": finish_reason,
+                "latency": time.monotonic() - started}
+
+    def save(self):
+        if self.added:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self.recordings, indent=1, sort_keys=True))
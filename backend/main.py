@@ -1,20 +1,59 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, HttpUrl
-from typing import List
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, HttpUrl
+from typing import Dict, List, Literal, Optional
 import os
+import time
+import hmac
+import uuid
 import asyncio
-from pathlib import Path
-from dotenv import load_dotenv
+from contextlib import asynccontextmanager
+
+from services.config import load_env
+
+# Load .env from project root before any service reads its configuration
+load_env()
 
 from services.crawler import DocumentationCrawler
 from services.extractor import ModuleExtractor
+from services.storage import get_storage
+from services.cascade import cascade_stats
+from services.merger import ModuleMerger
+from services.deadline import Deadline
+from services.schema import MergedModule, UrlModules
+from services.responses import dumps, json_response
+from services.scheduler import BATCH, INTERACTIVE, QueueTimeout, get_scheduler
+from services.search_index import get_search_index
+from services.clients import close_clients, warm_up
+from services.resilience import get_resilience
+from services.admission import Overloaded, get_admission
+from services.crawl_profile import get_crawl_profiles
+from services.memory import get_memory_profiler
+from services.progressive import ProgressiveExtraction
+
+
+def _warm_up():
+    """Create shared clients, open connections and load the search index."""
+    started = time.time()
+    urls = [url.strip() for url in os.getenv("WARM_UP_URLS", "").split(",") if url.strip()]
+    warm_up(urls)
+    get_search_index()
+    print(f"Warm-up finished in {time.time() - started:.2f}s")
 
-# Load .env from project root (parent directory)
-env_path = Path(__file__).parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
 
-app = FastAPI(title="Module Extraction API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start serving right away; warm-up runs on a worker thread and the first
+    # requests pick up the same shared clients (their creation is locked)
+    warming = asyncio.get_running_loop().run_in_executor(None, _warm_up)
+    yield
+    await asyncio.wait([warming], timeout=5)
+    close_clients()
+
+
+app = FastAPI(title="Module Extraction API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware for frontend
 app.add_middleware(
@@ -28,10 +67,97 @@ app.add_middleware(
 
 class ExtractRequest(BaseModel):
     urls: List[str]
+    # Also return one unified module tree merged locally across all URLs
+    merge: bool = False
+    # Overall time budget for the request (crawl + LLM); defaults to EXTRACT_DEADLINE_SECONDS
+    deadline_seconds: Optional[float] = None
+    # "batch" yields to interactive requests; requests with many URLs are always batch
+    priority: Optional[Literal["interactive", "batch"]] = None
+    # "outline" builds the prompt from page heading outlines over more pages; defaults to EXTRACT_MODE
+    mode: Optional[Literal["full", "outline"]] = None
+    # Start extracting each URL while it is still being crawled and report preliminary
+    # module trees; defaults to EXTRACT_PROGRESSIVE
+    progressive: Optional[bool] = None
+    # Disk-backed frontier and spooled page text for very large sites (see DocumentationCrawler)
+    large_site: bool = False
+    # Pages to crawl per URL in large-site mode; defaults to and is capped at LARGE_SITE_MAX_PAGES
+    max_pages: Optional[int] = Field(None, ge=1)
 
 
 class ExtractResponse(BaseModel):
-    modules: List[dict]
+    modules: List[UrlModules]
+    job_id: Optional[str] = None
+    merged: Optional[List[MergedModule]] = None
+    # True if the deadline cut any crawl or extraction short
+    partial: bool = False
+    # Seconds spent waiting for crawl and LLM capacity
+    queue_wait: Dict[str, float] = {}
+
+
+JOB_TTL = 86400
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("EXTRACT_DEADLINE_SECONDS", "240"))
+# Fraction of the request deadline given to crawling; the LLM stage gets the rest
+CRAWL_DEADLINE_SHARE = float(os.getenv("CRAWL_DEADLINE_SHARE", "0.6"))
+# Requests with more URLs than this are scheduled as batch work
+INTERACTIVE_MAX_URLS = int(os.getenv("SCHEDULER_INTERACTIVE_MAX_URLS", "2"))
+# Archive every crawl as a WARC snapshot here, for offline re-extraction with batch.py --replay
+CRAWL_SNAPSHOT_DIR = os.getenv("CRAWL_SNAPSHOT_DIR") or None
+# "full" page text, or "outline"-first; outline crawls can afford more pages for the same budget
+EXTRACT_MODE = os.getenv("EXTRACT_MODE", "full")
+OUTLINE_MAX_PAGES = int(os.getenv("OUTLINE_MAX_PAGES", "60"))
+# Page budget of a large_site request; the request deadline still bounds the crawl
+LARGE_SITE_MAX_PAGES = int(os.getenv("LARGE_SITE_MAX_PAGES", "1000"))
+# With MEMORY_PROFILING=1, /debug/memory requires this in X-Debug-Token (unset = no token)
+MEMORY_DEBUG_TOKEN = os.getenv("MEMORY_DEBUG_TOKEN") or None
+# Header a trusted reverse proxy puts the client address in, e.g. X-Forwarded-For (unset = peer address)
+CLIENT_ADDRESS_HEADER = os.getenv("CLIENT_ADDRESS_HEADER", "").strip()
+# Overlap each URL's LLM calls with its crawl (see ProgressiveExtraction)
+EXTRACT_PROGRESSIVE = os.getenv("EXTRACT_PROGRESSIVE", "false").lower() in ("1", "true", "yes")
+
+
+def _crawler(request: ExtractRequest) -> DocumentationCrawler:
+    """A crawler for the request's extraction mode."""
+    outline = (request.mode or EXTRACT_MODE) == "outline"
+    if request.large_site:
+        max_pages = min(request.max_pages or LARGE_SITE_MAX_PAGES, LARGE_SITE_MAX_PAGES)
+        # Bounded by its share of the request deadline rather than the crawler's usual minute
+        return DocumentationCrawler(
+            snapshot_dir=CRAWL_SNAPSHOT_DIR, max_pages=max_pages, outline_mode=outline, large_site=True,
+            max_total_time=int(request.deadline_seconds or DEFAULT_DEADLINE_SECONDS)
+        )
+    if outline:
+        return DocumentationCrawler(snapshot_dir=CRAWL_SNAPSHOT_DIR, max_pages=OUTLINE_MAX_PAGES, outline_mode=True)
+    return DocumentationCrawler(snapshot_dir=CRAWL_SNAPSHOT_DIR)
+
+
+def _progressive(request: ExtractRequest) -> bool:
+    return EXTRACT_PROGRESSIVE if request.progressive is None else request.progressive
+
+
+def _client_address(http_request: Request) -> str:
+    if CLIENT_ADDRESS_HEADER:
+        forwarded = http_request.headers.get(CLIENT_ADDRESS_HEADER)
+        if forwarded:
+            # The last entry is the one our own proxy added; earlier ones came from the client
+            return forwarded.split(",")[-1].strip()
+    return http_request.client.host if http_request.client else "anonymous"
+
+
+def _ticket(request: ExtractRequest, http_request: Request):
+    """Scheduling ticket for a request: client from X-Client-ID (or address), and its priority class."""
+    client_id = http_request.headers.get("x-client-id") or _client_address(http_request)
+    batch = request.priority == BATCH or len(request.urls) > INTERACTIVE_MAX_URLS
+    return get_scheduler().ticket(client_id, BATCH if batch else INTERACTIVE)
+
+
+async def _update_job(job_id: str, **fields):
+    """Merge fields into the shared job record so any worker can report progress."""
+    def merge(job: Optional[Dict]) -> Dict:
+        job = job or {}
+        job.update(fields, updated_at=time.time())
+        return job
+    
+    await get_storage().aupdate(f"job:{job_id}", merge, ttl=JOB_TTL)
 
 
 @app.get("/")
@@ -39,20 +165,171 @@ async def root():
     return {"message": "Module Extraction API", "status": "running"}
 
 
+@app.get("/ready")
+async def readiness():
+    """
+    Readiness for load balancers and autoscalers: 503 while new extractions
+    would be shed. Reports admission queue depth, in-flight crawls and LLM
+    calls, and recent extraction latency percentiles.
+    """
+    admission = get_admission()
+    scheduler = get_scheduler().summary()
+    ready = not admission.saturated()
+    body = {
+        "ready": ready,
+        "extractions": admission.summary(),
+        "crawls": {
+            "in_flight": scheduler["crawl"]["in_use"],
+            "queued": sum(scheduler["crawl"]["queued"].values()),
+            "capacity": scheduler["crawl"]["capacity"],
+        },
+        "llm_calls": {
+            "in_flight": scheduler["llm"]["in_use"],
+            "queued": sum(scheduler["llm"]["queued"].values()),
+            "capacity": scheduler["llm"]["capacity"],
+        },
+        "open_circuits": sorted(
+            key for key, stats in get_resilience().summary()["keys"].items()
+            if stats["circuit"]["state"] != "closed"
+        ),
+    }
+    headers = {} if ready else {"Retry-After": str(admission.retry_after())}
+    return JSONResponse(body, status_code=200 if ready else 503, headers=headers)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, http_request: Request):
+    """
+    Return the state of an extraction job, whichever worker ran it. Completed
+    jobs include the result; pollers can revalidate with If-None-Match.
+    """
+    job = await get_storage().aget(f"job:{job_id}")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return await json_response(http_request, job)
+
+
+@app.get("/search")
+def search_modules(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=100)):
+    """
+    Ranked search over every module extracted so far (names, submodules, descriptions, URLs).
+    A plain def: FastAPI runs it in its threadpool, since syncing the index reads SQLite.
+    """
+    started = time.perf_counter()
+    index = get_search_index()
+    hits = index.search(q, limit)
+    return {
+        "query": q,
+        "hits": hits,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        "indexed_modules": index.num_docs,
+    }
+
+
+@app.get("/stats/scheduler")
+async def get_scheduler_stats():
+    """Slots in use and queued requests per resource and priority class in this worker."""
+    return get_scheduler().summary()
+
+
+@app.get("/stats/resilience")
+async def get_resilience_stats():
+    """Circuit state, recent latency and hedging per docs host and LLM endpoint in this worker."""
+    return get_resilience().summary()
+
+
+@app.get("/stats/crawl-profile")
+async def get_crawl_profile(host: str = Query(..., min_length=1)):
+    """Learned crawl history of one docs host and the settings its next crawl will use."""
+    profiles = get_crawl_profiles()
+    _, path_bias, tuning = profiles.tune(host, DocumentationCrawler(use_profiles=False).base_settings)
+    return {**profiles.summary(host), "tuning": tuning, "path_bias": path_bias}
+
+
+@app.get("/stats/cascade")
+async def get_cascade_stats():
+    """Per-tier hit rates and latency of the model cascade in this worker."""
+    return cascade_stats.summary()
+
+
+def _check_debug_token(http_request: Request):
+    if MEMORY_DEBUG_TOKEN and not hmac.compare_digest(
+        http_request.headers.get("x-debug-token", "").encode(), MEMORY_DEBUG_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Missing or wrong X-Debug-Token")
+
+
+async def get_memory_debug(http_request: Request, top: int = Query(10, ge=1, le=100)):
+    """
+    Memory use per pipeline stage (fetch, parse, clean, prompt, llm) with its
+    top allocation sites, and per request peak RSS and bytes allocated by
+    stage.
+    """
+    _check_debug_token(http_request)
+    return get_memory_profiler().summary(top)
+
+
+async def reset_memory_debug(http_request: Request):
+    """Clear the stage totals, allocation sites and finished requests collected so far."""
+    _check_debug_token(http_request)
+    get_memory_profiler().reset()
+    return {"reset": True}
+
+
+if get_memory_profiler().enabled:
+    # Only served while profiling: request labels are other clients' URLs
+    app.add_api_route("/debug/memory", get_memory_debug, methods=["GET"])
+    app.add_api_route("/debug/memory/reset", reset_memory_debug, methods=["POST"])
+
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    print(f"Shedding request: {str(e)}")
+    return HTTPException(status_code=503, detail=f"Server is at capacity: {str(e)}",
+                         headers={"Retry-After": str(e.retry_after)})
+
+
 @app.post("/extract", response_model=ExtractResponse)
-async def extract_modules(request: ExtractRequest):
+async def extract_modules(request: ExtractRequest, http_request: Request):
     """
     Extract product modules from documentation URLs.
     
     Accepts a list of documentation URLs, crawls the content,
-    and returns structured module information.
+    and returns structured module information. Answers 503 with Retry-After
+    when the worker already has as many extractions running and queued as
+    admission control allows.
     """
     if not request.urls:
         raise HTTPException(status_code=400, detail="At least one URL is required")
+    if request.max_pages is not None and not request.large_site:
+        raise HTTPException(status_code=400, detail="max_pages is only accepted with large_site")
+    try:
+        release = await get_admission().acquire()
+    except Overloaded as e:
+        raise _overloaded(e)
+    job_id = uuid.uuid4().hex
+    memory = None
+    try:
+        with get_memory_profiler().request(job_id, " ".join(request.urls)) as memory:
+            return await _extract(request, http_request, job_id)
+    finally:
+        release()
+        if memory is not None:
+            await _update_job(job_id, memory=memory.summary())
+
+
+async def _extract(request: ExtractRequest, http_request: Request, job_id: str):
+    await _update_job(job_id, status="running", stage="crawl", urls=request.urls, created_at=time.time())
+    deadline = Deadline(request.deadline_seconds or DEFAULT_DEADLINE_SECONDS)
+    crawl_deadline = deadline.share(CRAWL_DEADLINE_SHARE)
+    partial_urls = set()
+    skipped_variants = {}
+    crawl_pages = {}
+    scheduler = get_scheduler()
+    ticket = _ticket(request, http_request)
     
     try:
         # Initialize services
-        crawler = DocumentationCrawler()
+        crawler = _crawler(request)
         try:
             extractor = ModuleExtractor()
         except ValueError as e:
@@ -67,30 +344,104 @@ async def extract_modules(request: ExtractRequest):
         all_content = []
         processed_urls = []
         failed_urls = []
+        all_modules_by_url = []
+        progressive = _progressive(request)
+        preliminary = {}
         
-        for url in request.urls:
-            try:
-                print(f"Processing URL: {url}")
-                # Add timeout for each URL crawl
-                content = await asyncio.wait_for(
-                    crawler.crawl_documentation(url),
-                    timeout=90  # 90 seconds per URL
+        async def add_result(item: Dict, modules_for_url: List[Dict], report: Dict):
+            url = item['url']
+            if report.get("partial"):
+                partial_urls.add(url)
+            else:
+                # Which pages the modules came from tunes the next crawl of this domain
+                await asyncio.get_running_loop().run_in_executor(
+                    None, crawler.record_yield, url, crawl_pages.get(url, []), item['content'], modules_for_url
                 )
+            
+            prompt_stats = report.get("prompt", {})
+            if report.get("batched"):
+                prompt_stats = {**prompt_stats, "batched": report["batched"], "batch": report["batch_prompt"]}
+            print(f"  Prompt v{prompt_stats.get('version')}: {prompt_stats.get('prompt_chars')} chars "
+                  f"(~{prompt_stats.get('approx_tokens')} tokens, static prefix {prompt_stats.get('prefix_chars')})")
+            
+            if modules_for_url:
+                print(f"  ✓ Extracted {len(modules_for_url)} module(s) from {url} "
+                      f"(model: {report.get('model', 'cached')}, tier: {report.get('tier', '-')})")
+            else:
+                print(f"  ⚠ No modules extracted from {url}")
+            all_modules_by_url.append({
+                "url": url,
+                "modules": modules_for_url,
+                "prompt": prompt_stats,
+                "partial": url in partial_urls
+            })
+        
+        async def crawl_url(url: str, share: float) -> str:
+            # Waiting for a crawl slot counts against the crawl budget
+            async with scheduler.slot("crawl", ticket, timeout=crawl_deadline.remaining()):
+                # Each remaining URL gets an equal share of what is left of the crawl budget
+                url_deadline = crawl_deadline.share(share)
+                print(f"Processing URL: {url} ({url_deadline.remaining():.0f}s budget)")
+                try:
+                    # The crawler stops itself at the deadline; this is only a safety net
+                    return await asyncio.wait_for(
+                        crawler.crawl_documentation(url, url_deadline),
+                        timeout=url_deadline.remaining() + 5
+                    )
+                except asyncio.TimeoutError:
+                    # Keep whatever pages were gathered before the cancellation
+                    crawler.partial = True
+                    print(f"Crawl of {url} cancelled at deadline")
+                    return crawler.collected_content()
+        
+        async def extract_progressively(url: str, share: float) -> str:
+            # The URL's LLM calls run alongside its crawl, within its share of the whole deadline
+            url_deadline = deadline.share(share)
+            run = ProgressiveExtraction(crawler, extractor, llm_slot=lambda cost: scheduler.slot(
+                "llm", ticket, cost=cost, timeout=url_deadline.remaining()
+            ))
+            async for update in run.run(url, crawl_url(url, share), url_deadline):
+                if update["final"]:
+                    continue
+                preliminary[url] = update["modules"]
+                # Pollers of /jobs/{job_id} see the tree grow while the crawl goes on
+                await _update_job(job_id, preliminary=[{"url": u, "modules": m} for u, m in preliminary.items()])
+                print(f"  Preliminary tree for {url}: {len(update['modules'])} module(s) "
+                      f"from {update['pages']} page(s) after {update['elapsed']:.1f}s")
+            if run.content:
+                if crawler.partial or run.partial:
+                    partial_urls.add(url)
+                crawl_pages[url] = crawler.page_log
+                report = {**(run.reports[0] if run.reports else {}), "partial": run.partial}
+                report["prompt"] = {**report.get("prompt", {}), "progressive": run.summary()}
+                await add_result({"url": url, "content": run.content}, run.modules, report)
+            return run.content
+        
+        for idx, url in enumerate(request.urls):
+            try:
+                if progressive:
+                    content = await extract_progressively(url, 1 / (len(request.urls) - idx))
+                else:
+                    content = await crawl_url(url, 1 / (len(request.urls) - idx))
+                if crawler.partial:
+                    partial_urls.add(url)
+                skipped_variants[url] = crawler.skipped_variants()
+                crawl_pages[url] = crawler.page_log
                 if content:  # Only add if we got content
-                    all_content.append({
-                        "url": url,
-                        "content": content
-                    })
+                    if not progressive:
+                        all_content.append({
+                            "url": url,
+                            "content": content
+                        })
                     processed_urls.append(url)
                     print(f"Successfully processed {url} ({len(content)} chars)")
                 else:
                     print(f"Warning: No content extracted from {url}")
                     failed_urls.append(url)
-            except asyncio.TimeoutError:
-                print(f"Timeout crawling {url} (exceeded 90s)")
+            except QueueTimeout as e:
+                print(f"Skipping {url}: {str(e)}")
+                partial_urls.add(url)
                 failed_urls.append(url)
-                # Try to continue with other URLs
-                continue
             except Exception as e:
                 # Log error but continue with other URLs
                 print(f"Error crawling {url}: {str(e)}")
@@ -98,48 +449,57 @@ async def extract_modules(request: ExtractRequest):
                 continue
         
         print(f"Processed {len(processed_urls)} URL(s) successfully, {len(failed_urls)} failed")
+        await _update_job(job_id, stage="extract", processed_urls=processed_urls, failed_urls=failed_urls)
         
-        if not all_content:
+        if not processed_urls:
             raise HTTPException(
                 status_code=500,
                 detail="Failed to crawl any of the provided URLs. They may be inaccessible, require authentication, or timed out."
             )
         
-        # Extract modules per URL (separate extraction for each URL)
-        all_modules_by_url = []
-        
         print(f"\n=== Processing URLs Separately ===")
         print(f"Total URLs processed: {len(processed_urls)}")
         
-        for item in all_content:
-            url = item['url']
-            content = item['content']
+        # Small sites share a call (LLM_BATCH_TOKENS); results are still returned per URL
+        done = 0
+        for batch in extractor.plan_batches(all_content):
+            urls = [item['url'] for item in batch]
+            # Split the rest of the request deadline evenly over the remaining extractions
+            llm_deadline = deadline.share(len(batch) / (len(all_content) - done))
+            done += len(batch)
             
-            print(f"\nExtracting modules from: {url}")
-            print(f"Content length: {len(content)} characters")
+            print(f"\nExtracting modules from: {', '.join(urls)}")
+            print(f"Content length: {sum(len(item['content']) for item in batch)} characters")
             
-            # Extract modules for this specific URL
             try:
-                modules_for_url = await extractor.extract_modules([item])
-                
-                if modules_for_url:
-                    print(f"  ✓ Extracted {len(modules_for_url)} module(s) from {url}")
+                reports = [{} for _ in batch]
+                cost = extractor.estimate_tokens(batch, batch=len(batch) > 1)
+                async with scheduler.slot("llm", ticket, cost=cost, timeout=llm_deadline.remaining()):
+                    if len(batch) > 1:
+                        results = await extractor.extract_batch(batch, reports=reports, deadline=llm_deadline)
+                    else:
+                        results = [await extractor.extract_modules(batch, report=reports[0], deadline=llm_deadline)]
+                for item, modules_for_url, report in zip(batch, results, reports):
+                    await add_result(item, modules_for_url, report)
+            except QueueTimeout as e:
+                print(f"  ✗ Skipping extraction for {', '.join(urls)}: {str(e)}")
+                for url in urls:
+                    partial_urls.add(url)
                     all_modules_by_url.append({
                         "url": url,
-                        "modules": modules_for_url
+                        "modules": [],
+                        "partial": True
                     })
-                else:
-                    print(f"  ⚠ No modules extracted from {url}")
+            except Exception as e:
+                print(f"  ✗ Error extracting from {', '.join(urls)}: {str(e)}")
+                for url in urls:
                     all_modules_by_url.append({
                         "url": url,
                         "modules": []
                     })
-            except Exception as e:
-                print(f"  ✗ Error extracting from {url}: {str(e)}")
-                all_modules_by_url.append({
-                    "url": url,
-                    "modules": []
-                })
+        
+        for entry in all_modules_by_url:
+            entry["skipped_variants"] = skipped_variants.get(entry["url"])
         
         print(f"\n=== Summary ===")
         total_modules = sum(len(item['modules']) for item in all_modules_by_url)
@@ -148,19 +508,183 @@ async def extract_modules(request: ExtractRequest):
             print(f"  - {item['url']}: {len(item['modules'])} modules")
         print(f"================\n")
         
+        try:
+            # Tokenizing is CPU work; keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, get_search_index().index_results, all_modules_by_url
+            )
+        except Exception as e:
+            print(f"Search indexing failed: {str(e)}")
+        
+        merged = None
+        if request.merge:
+            merge_started = time.time()
+            merged = ModuleMerger().merge(all_modules_by_url)
+            print(f"Merged into {len(merged)} module(s) in {(time.time() - merge_started) * 1000:.1f}ms")
+        
         # Return modules with URL information
         # Format: [{"url": "...", "modules": [...]}, ...]
-        return ExtractResponse(modules=all_modules_by_url)
+        # Modules were validated by the extractor, so the payload is serialized as-is
+        if partial_urls:
+            print(f"Partial results for {len(partial_urls)} URL(s): deadline reached")
+        queue_wait = ticket.summary()
+        print(f"Queue wait ({ticket.priority}, client {ticket.client_id}): {queue_wait}")
+        result = {
+            "modules": all_modules_by_url,
+            "job_id": job_id,
+            "merged": merged,
+            "partial": bool(partial_urls),
+            "queue_wait": queue_wait
+        }
+        await _update_job(job_id, status="completed", stage="done", total_modules=total_modules, result=result)
+        return await json_response(http_request, result)
     
-    except HTTPException:
+    except HTTPException as e:
+        await _update_job(job_id, status="failed", error=e.detail)
         raise
     except Exception as e:
+        await _update_job(job_id, status="failed", error=str(e))
         raise HTTPException(
             status_code=500,
             detail=f"Error during extraction: {str(e)}"
         )
 
 
+@app.post("/extract/stream")
+async def extract_modules_stream(request: ExtractRequest, http_request: Request):
+    """
+    Streaming variant of /extract. Returns newline-delimited JSON events:
+    {"event": "module", "url": ..., "module": {...}} as soon as each module is
+    parsed from the LLM output, plus "url_start", "url_done", "error" and "done".
+    The request's deadline is split over its URLs as in /extract.
+    
+    With progressive extraction, each URL instead gets "preliminary" events
+    ({"modules": [...], "pages": ..., "calls": ..., "elapsed": ...}) while it
+    is still being crawled, and its final modules as "module" events at the end.
+    """
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="At least one URL is required")
+    if request.max_pages is not None and not request.large_site:
+        raise HTTPException(status_code=400, detail="max_pages is only accepted with large_site")
+    
+    try:
+        extractor = ModuleExtractor()
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    try:
+        # Held until the response has been sent (or the client went away)
+        release = await get_admission().acquire()
+    except Overloaded as e:
+        raise _overloaded(e)
+    deadline = Deadline(request.deadline_seconds or DEFAULT_DEADLINE_SECONDS)
+    scheduler = get_scheduler()
+    ticket = _ticket(request, http_request)
+    progressive = _progressive(request)
+    
+    async def crawl(crawler: DocumentationCrawler, url: str, crawl_deadline: Deadline) -> str:
+        # Waiting for a crawl slot counts against the crawl budget
+        async with scheduler.slot("crawl", ticket, timeout=crawl_deadline.remaining()):
+            try:
+                # The crawler stops itself at the deadline; this is only a safety net
+                return await asyncio.wait_for(
+                    crawler.crawl_documentation(url, crawl_deadline),
+                    timeout=crawl_deadline.remaining() + 5
+                )
+            except asyncio.TimeoutError:
+                print(f"Crawl of {url} cancelled at deadline")
+                return crawler.collected_content()
+    
+    async def events():
+        try:
+            with get_memory_profiler().request(uuid.uuid4().hex, " ".join(request.urls)):
+                started = time.time()
+                first_module_at = None
+                for index, url in enumerate(request.urls):
+                    yield dumps({"event": "url_start", "url": url}) + b"\n"
+                    crawler = _crawler(request)
+                    modules = []
+                    # Each remaining URL gets an equal share of what is left of the deadline
+                    url_deadline = deadline.share(1 / (len(request.urls) - index))
+                    crawl_deadline = url_deadline.share(CRAWL_DEADLINE_SHARE)
+                    if progressive:
+                        run = ProgressiveExtraction(crawler, extractor, llm_slot=lambda cost: scheduler.slot(
+                            "llm", ticket, cost=cost, timeout=url_deadline.remaining()
+                        ))
+                        error = None
+                        try:
+                            async for update in run.run(url, crawl(crawler, url, crawl_deadline), url_deadline):
+                                if first_module_at is None and update["modules"]:
+                                    first_module_at = time.time() - started
+                                    print(f"First module after {first_module_at:.1f}s")
+                                if not update["final"]:
+                                    yield dumps({"event": "preliminary", "url": url, **update}) + b"\n"
+                                    continue
+                                modules = update["modules"]
+                                for module in modules:
+                                    yield dumps({"event": "module", "url": url, "module": module}) + b"\n"
+                        except Exception as e:
+                            error = str(e)
+                            print(f"  ✗ Error extracting from {url}: {error}")
+                        content = run.content
+                        if not content:
+                            yield dumps({"event": "error", "url": url, "detail": "Failed to crawl URL"}) + b"\n"
+                            continue
+                        if error:
+                            yield dumps({"event": "error", "url": url, "detail": error}) + b"\n"
+                    else:
+                        try:
+                            content = await crawl(crawler, url, crawl_deadline)
+                        except Exception as e:
+                            content = ""
+                            print(f"Error crawling {url}: {str(e)}")
+                        if not content:
+                            yield dumps({"event": "error", "url": url, "detail": "Failed to crawl URL"}) + b"\n"
+                            continue
+                        
+                        item = {"url": url, "content": content}
+                        try:
+                            async with scheduler.slot(
+                                "llm", ticket, cost=extractor.estimate_tokens([item]), timeout=url_deadline.remaining()
+                            ):
+                                async for module in extractor.stream_modules([item], deadline=url_deadline):
+                                    if first_module_at is None:
+                                        first_module_at = time.time() - started
+                                        print(f"First module after {first_module_at:.1f}s")
+                                    modules.append(module)
+                                    yield dumps({"event": "module", "url": url, "module": module}) + b"\n"
+                        except Exception as e:
+                            print(f"  ✗ Error extracting from {url}: {str(e)}")
+                            yield dumps({"event": "error", "url": url, "detail": str(e)}) + b"\n"
+                    if modules:
+                        loop = asyncio.get_running_loop()
+                        try:
+                            await loop.run_in_executor(None, crawler.record_yield, url, crawler.page_log, content, modules)
+                        except Exception as e:
+                            print(f"Recording crawl yield failed: {str(e)}")
+                        try:
+                            await loop.run_in_executor(None, get_search_index().index_url, url, modules)
+                        except Exception as e:
+                            print(f"Search indexing failed: {str(e)}")
+                    yield dumps({
+                        "event": "url_done",
+                        "url": url,
+                        "modules": len(modules),
+                        "skipped_variants": crawler.skipped_variants()
+                    }) + b"\n"
+                
+                yield dumps({
+                    "event": "done",
+                    "elapsed": time.time() - started,
+                    "time_to_first_module": first_module_at,
+                    "queue_wait": ticket.summary()
+                }) + b"\n"
+        finally:
+            # Also when the stream fails or is closed early; the background task only runs after a clean finish
+            release()
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson", background=BackgroundTask(release))
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,148 @@
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from services.resilience import LatencyTracker
+
+
+class Overloaded(Exception):
+    """The worker is at capacity; the request was shed rather than queued."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounds the extractions a worker runs at once. Up to `max_active` run,
+    up to `max_queued` more wait (at most `queue_timeout` seconds) for one of
+    them to finish, and anything beyond that is rejected immediately with an
+    estimate of when capacity will be free, so overload turns into fast 503s
+    instead of requests that time out after minutes.
+    """
+
+    def __init__(self, max_active: int = 8, max_queued: int = 16, queue_timeout: float = 10):
+        self.max_active = max(1, max_active)
+        self.max_queued = max(0, max_queued)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiters: deque = deque()
+        self.latency = LatencyTracker(size=500)
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def saturated(self) -> bool:
+        """True when a new request would be rejected."""
+        return self.active >= self.max_active and len(self.waiters) >= self.max_queued
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: queue ahead times the median duration per slot."""
+        median = self.latency.percentile(50)
+        if median is None:
+            return 5
+        ahead = len(self.waiters) + 1
+        return min(300, max(1, math.ceil(median * ahead / self.max_active)))
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.rejected += 1
+        retry_after = self.retry_after()
+        return Overloaded(f"{reason}; retry in {retry_after}s", retry_after)
+
+    def _release(self):
+        # Hand the slot straight to the oldest waiter still waiting; one whose wait
+        # timed out or was cancelled can still be queued until its task runs again
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    async def acquire(self) -> Callable[[], None]:
+        """
+        Take one extraction slot and return the function that gives it back
+        (safe to call more than once).
+
+        Raises:
+            Overloaded: if the queue is full, or no slot freed up within queue_timeout
+        """
+        if self.active < self.max_active:
+            self.active += 1
+        elif len(self.waiters) >= self.max_queued:
+            raise self._reject(f"{self.active} extractions running and {len(self.waiters)} queued")
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, self.queue_timeout)
+            except BaseException as e:
+                if waiter in self.waiters:
+                    self.waiters.remove(waiter)
+                if waiter.done() and not waiter.cancelled():
+                    # Granted just as the wait was abandoned; pass the slot on
+                    self._release()
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timed_out += 1
+                    raise self._reject(f"no extraction slot within {self.queue_timeout:.0f}s")
+                raise
+
+        self.admitted += 1
+        started = time.monotonic()
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.latency.record(time.monotonic() - started)
+                self._release()
+        return release
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one extraction slot for the duration of the block (see acquire)."""
+        release = await self.acquire()
+        try:
+            yield
+        finally:
+            release()
+
+    def summary(self) -> Dict:
+        percentiles = {f"p{p}": self.latency.percentile(p) for p in (50, 95, 99)}
+        return {
+            "active": self.active,
+            "queued": len(self.waiters),
+            "max_active": self.max_active,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "latency": {
+                "samples": len(self.latency.samples),
+                **{name: round(value, 3) if value is not None else None for name, value in percentiles.items()},
+            },
+        }
+
+
+_admission: Optional[AdmissionController] = None
+
+
+def get_admission() -> AdmissionController:
+    """
+    Return the process-wide admission controller configured from the environment:
+    ADMISSION_MAX_ACTIVE, ADMISSION_MAX_QUEUED and ADMISSION_QUEUE_TIMEOUT.
+    """
+    global _admission
+    if _admission is None:
+        _admission = AdmissionController(
+            max_active=int(os.getenv("ADMISSION_MAX_ACTIVE", "8")),
+            max_queued=int(os.getenv("ADMISSION_MAX_QUEUED", "16")),
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+        )
+    return _admission
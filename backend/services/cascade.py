@@ -0,0 +1,91 @@
+import threading
+from typing import Any, Dict, Optional
+
+
+def validate_modules(modules: Any, min_submodule_coverage: float = 0.5) -> Optional[str]:
+    """
+    Check an extracted module list for structure and basic quality.
+    Returns the reason it was rejected, or None if it is acceptable.
+    """
+    if not isinstance(modules, list):
+        return "response is not a module list"
+    if not modules:
+        return "no modules extracted"
+
+    with_submodules = 0
+    for module in modules:
+        if not isinstance(module, dict):
+            return "module entry is not an object"
+        name = module.get('module')
+        if not isinstance(name, str) or not name.strip():
+            return "module without a name"
+        if not isinstance(module.get('description', ''), str):
+            return f"module '{name}' has a non-text description"
+        submodules = module.get('submodules', {})
+        if not isinstance(submodules, dict):
+            return f"module '{name}' has malformed submodules"
+        if any(not isinstance(desc, str) for desc in submodules.values()):
+            return f"module '{name}' has a non-text submodule description"
+        if submodules:
+            with_submodules += 1
+
+    coverage = with_submodules / len(modules)
+    if coverage < min_submodule_coverage:
+        return f"submodule coverage {coverage:.0%} below {min_submodule_coverage:.0%}"
+    return None
+
+
+class CascadeStats:
+    """Per-tier hit rates and latencies for the model cascade (per process)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.total_latency = 0.0
+        self.tiers: Dict[str, Dict[str, float]] = {}
+
+    def record_attempt(self, model: str, latency: float, accepted: bool):
+        with self._lock:
+            tier = self.tiers.setdefault(model, {"attempts": 0, "accepted": 0, "latency": 0.0})
+            tier["attempts"] += 1
+            tier["latency"] += latency
+            if accepted:
+                tier["accepted"] += 1
+
+    def record_request(self, latency: float):
+        with self._lock:
+            self.requests += 1
+            self.total_latency += latency
+
+    def summary(self) -> Dict:
+        """
+        Hit rate and mean latency per tier, plus the mean end-to-end cascade
+        latency compared with sending every request to the largest model.
+        """
+        with self._lock:
+            tiers = []
+            # Tier 0 is always tried first, so insertion order is cascade order
+            for model, tier in self.tiers.items():
+                attempts = tier["attempts"]
+                tiers.append({
+                    "model": model,
+                    "attempts": attempts,
+                    "accepted": tier["accepted"],
+                    "hit_rate": tier["accepted"] / self.requests if self.requests else 0.0,
+                    "avg_latency": tier["latency"] / attempts if attempts else None,
+                })
+            avg_latency = self.total_latency / self.requests if self.requests else None
+            top_latency = tiers[-1]["avg_latency"] if tiers else None
+            return {
+                "requests": self.requests,
+                "tiers": tiers,
+                "avg_latency": avg_latency,
+                "largest_model_avg_latency": top_latency,
+                "avg_latency_saved": (
+                    top_latency - avg_latency
+                    if avg_latency is not None and top_latency is not None else None
+                ),
+            }
+
+
+cascade_stats = CascadeStats()
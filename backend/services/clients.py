@@ -0,0 +1,109 @@
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+USER_AGENT = 'Mozilla/5.0 (compatible; ModuleExtractor/1.0)'
+
+_lock = threading.Lock()
+_http_session: Optional[requests.Session] = None
+_llm_client = None
+
+
+def create_http_session(pool_size: Optional[int] = None) -> requests.Session:
+    """
+    Session with a connection pool of `pool_size` connections per host
+    (HTTP_POOL_SIZE, default 16); concurrent crawls of one site share it.
+    """
+    pool_size = pool_size or int(os.getenv("HTTP_POOL_SIZE", "16"))
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT})
+    # Shared by every crawl, so it must not carry cookies from one site visit to the next
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide HTTP session, so crawls reuse pooled keep-alive connections."""
+    global _http_session
+    if _http_session is None:
+        with _lock:
+            if _http_session is None:
+                _http_session = create_http_session()
+    return _http_session
+
+
+def create_llm_client():
+    """
+    OpenAI-compatible client from OPENAI_API_KEY / OPENAI_API_BASE.
+    The openai package is imported here rather than at module load; it is
+    the slowest import in the backend.
+    """
+    import openai
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable is required")
+    return openai.OpenAI(
+        api_key=api_key,
+        base_url=os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+    )
+
+
+def get_llm_client():
+    """Process-wide LLM client; its connection pool is shared by all requests."""
+    global _llm_client
+    if _llm_client is None:
+        with _lock:
+            if _llm_client is None:
+                _llm_client = create_llm_client()
+    return _llm_client
+
+
+def warm_up(urls: List[str], timeout: float = 5):
+    """
+    Create the shared clients and open connections ahead of the first request:
+    one lightweight LLM API call and a HEAD request to each of `urls`.
+    Failures are logged and ignored.
+    """
+    session = get_http_session()
+
+    def warm_llm():
+        try:
+            client = get_llm_client()
+            client.with_options(timeout=timeout, max_retries=0).models.list()
+        except Exception as e:
+            print(f"LLM warm-up skipped: {str(e)}")
+
+    def warm_url(url: str):
+        try:
+            session.head(url, timeout=timeout, allow_redirects=True)
+        except requests.RequestException as e:
+            print(f"Warm-up of {url} failed: {str(e)}")
+
+    # Connection setup is mostly waiting, so do it all at once
+    threads = [threading.Thread(target=warm_llm)] + [
+        threading.Thread(target=warm_url, args=(url,)) for url in urls
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def close_clients():
+    global _http_session, _llm_client
+    with _lock:
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
+        if _llm_client is not None:
+            _llm_client.close()
+            _llm_client = None
@@ -0,0 +1,13 @@
+from pathlib import Path
+from dotenv import load_dotenv
+
+
+_loaded = False
+
+
+def load_env():
+    """Load the project-root .env once per process; later calls are no-ops."""
+    global _loaded
+    if not _loaded:
+        load_dotenv(dotenv_path=Path(__file__).parent.parent.parent / '.env')
+        _loaded = True
@@ -0,0 +1,250 @@
+import os
+import re
+import math
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from services.storage import StorageBackend, get_storage
+from services.url_variants import classify_segment
+
+
+# Latency samples kept per domain
+MAX_LATENCIES = 200
+# Crawls whose useful-page depth/rank are kept for budget tuning
+MAX_HISTORY = 10
+# Path prefixes tracked per domain; the least visited are dropped beyond this
+MAX_PREFIXES = 500
+
+_CONTENT_MARKER = re.compile(r"--- (?:Content from|Outline of) (\S+) ---")
+
+
+def path_prefix(url: str, depth: int = 2) -> str:
+    """
+    The first `depth` path segments of a URL, ignoring locale and version
+    segments, e.g. https://x.com/docs/en/v2/billing/invoices -> /docs/billing.
+    """
+    segments = [
+        segment.lower() for segment in urlparse(url).path.split('/')
+        if segment and not classify_segment(segment)
+    ]
+    return "/" + "/".join(segments[:depth])
+
+
+def _percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def new_profile(host: str) -> Dict:
+    return {
+        "host": host,
+        "crawls": 0,
+        "updated_at": None,
+        "latencies": [],
+        "fetches": 0,
+        "errors": 0,
+        "timeouts": 0,
+        # prefix -> {"pages", "chars", "useful", "errors"}
+        "prefixes": {},
+        # Deepest depth and latest crawl position of a page that contributed modules, per crawl
+        "useful_depths": [],
+        "useful_ranks": [],
+        # Deepest depth each of those crawls reached
+        "crawled_depths": [],
+    }
+
+
+class CrawlProfiles:
+    """
+    Per-domain crawl history kept in shared storage, and the settings it
+    implies for the next crawl of that domain.
+
+    The crawler records each fetch (latency, error, timeout) and each page
+    (path prefix, text yield). After extraction, record_yield() marks which
+    pages mentioned an extracted module or submodule. tune() then derives:
+
+    - page_timeout from the domain's p95 latency (3x, between 2s and twice the default)
+    - the politeness delay from its error rate and latency
+    - max_pages and max_depth from where useful pages were found in recent crawls
+      (down to just past the last useful page, or up to twice the default
+      pages and one level deeper when useful pages kept turning up at the end)
+    - a score bias per path prefix from its share of useful pages
+
+    Updates are read-modify-writes under a storage lease (StorageBackend.update),
+    so concurrent crawls of a domain from several workers all count.
+    """
+
+    def __init__(self, storage: Optional[StorageBackend] = None, ttl: float = 30 * 86400, min_fetches: int = 10):
+        self.storage = storage or get_storage()
+        self.ttl = ttl
+        self.min_fetches = min_fetches
+
+    def _key(self, host: str) -> str:
+        return f"crawl_profile:v1:{host}"
+
+    def load(self, host: str) -> Dict:
+        # Fields added since a profile was stored start out empty
+        return {**new_profile(host), **(self.storage.get(self._key(host)) or {})}
+
+    def _update(self, host: str, modify: Callable[[Dict], None]):
+        """Apply `modify` to the domain's stored profile atomically across workers."""
+        def apply(stored: Optional[Dict]) -> Dict:
+            profile = {**new_profile(host), **(stored or {})}
+            modify(profile)
+            profile["updated_at"] = time.time()
+            if len(profile["prefixes"]) > MAX_PREFIXES:
+                kept = sorted(profile["prefixes"].items(), key=lambda item: item[1]["pages"], reverse=True)
+                profile["prefixes"] = dict(kept[:MAX_PREFIXES])
+            return profile
+
+        self.storage.update(self._key(host), apply, ttl=self.ttl)
+
+    def tune(self, host: str, settings: Dict) -> Tuple[Dict, Dict[str, float], Dict]:
+        """
+        Settings for the next crawl of `host`, starting from `settings`
+        (max_pages, max_depth, page_timeout, politeness_delay).
+
+        Returns (tuned settings, path prefix -> score bias, summary of what changed).
+        """
+        profile = self.load(host)
+        tuned = dict(settings)
+        changes = {}
+
+        if profile["fetches"] >= self.min_fetches:
+            p95 = _percentile(profile["latencies"], 95)
+            if p95 is not None:
+                tuned["page_timeout"] = min(settings["page_timeout"] * 2, max(2, math.ceil(p95 * 3)))
+            failure_rate = (profile["errors"] + profile["timeouts"]) / profile["fetches"]
+            if failure_rate > 0.1:
+                # Struggling or throttling host: back off more than the default
+                tuned["politeness_delay"] = settings["politeness_delay"] * 2
+            elif failure_rate < 0.02 and p95 is not None and p95 < 1.0:
+                tuned["politeness_delay"] = 0.0
+
+        if len(profile["useful_ranks"]) >= 2:
+            # Stop a little after the last useful page of recent crawls. Always relative to the
+            # default, so a crawl whose last pages were still useful raises the budget again.
+            last_useful = max(profile["useful_ranks"])
+            tuned["max_pages"] = min(settings["max_pages"] * 2, max(5, math.ceil(last_useful * 1.5) + 2))
+            deepest = max(profile["useful_depths"])
+            # Newest first: profiles from before crawled_depths was kept have fewer of them
+            recent = zip(reversed(profile["useful_depths"]), reversed(profile["crawled_depths"]))
+            if any(useful >= crawled for useful, crawled in recent):
+                # Useful pages at the deepest level crawled: there may be more one level down
+                deepest += 1
+            tuned["max_depth"] = min(settings["max_depth"] + 1, max(1, deepest))
+
+        bias = {}
+        for prefix, stats in profile["prefixes"].items():
+            if stats["pages"] < 2:
+                continue
+            if not stats["chars"]:
+                bias[prefix] = -3.0
+            elif profile["useful_ranks"]:
+                # Only once module attribution exists: +2 for always useful, -1 for never
+                bias[prefix] = round(3.0 * stats["useful"] / stats["pages"] - 1.0, 2)
+
+        for name, value in tuned.items():
+            if value != settings[name]:
+                changes[name] = {"default": settings[name], "tuned": value}
+        if bias:
+            changes["path_bias"] = len(bias)
+        return tuned, bias, changes
+
+    def record_crawl(self, host: str, fetches: List[Dict], pages: List[Dict]):
+        """
+        Add one crawl's fetches ({"latency", "ok", "timeout"}) and pages
+        ({"url", "depth", "chars"}) to the domain's profile.
+        """
+        if not fetches and not pages:
+            return
+
+        def add(profile: Dict):
+            profile["crawls"] += 1
+            for fetch in fetches:
+                profile["fetches"] += 1
+                if fetch["timeout"]:
+                    profile["timeouts"] += 1
+                elif not fetch["ok"]:
+                    profile["errors"] += 1
+                if fetch["latency"] is not None:
+                    profile["latencies"].append(round(fetch["latency"], 3))
+            profile["latencies"] = profile["latencies"][-MAX_LATENCIES:]
+            for page in pages:
+                stats = profile["prefixes"].setdefault(
+                    path_prefix(page["url"]), {"pages": 0, "chars": 0, "useful": 0, "errors": 0}
+                )
+                stats["pages"] += 1
+                stats["chars"] += page["chars"]
+                if not page["chars"]:
+                    stats["errors"] += 1
+
+        self._update(host, add)
+
+    def record_yield(self, host: str, pages: List[Dict], content: str, modules: List[Dict]):
+        """
+        Mark the pages of a crawl whose text mentions an extracted module or
+        submodule name, and remember how deep and how late in the crawl the
+        last of them was found.
+        """
+        if not pages or not content:
+            return
+        names = set()
+        for module in modules:
+            names.add(module.get("module", "").strip().lower())
+            names.update(name.strip().lower() for name in (module.get("submodules") or {}))
+        names = {name for name in names if len(name) >= 3}
+
+        # The crawl's combined text is "--- Content from <url> ---" (or "Outline of") followed by that page's text
+        parts = _CONTENT_MARKER.split(content)
+        texts = {parts[i]: parts[i + 1].lower() for i in range(1, len(parts) - 1, 2)}
+
+        useful = [
+            (rank, page) for rank, page in enumerate(pages, start=1)
+            if texts.get(page["url"]) and any(name in texts[page["url"]] for name in names)
+        ]
+        crawled_depth = max(page["depth"] for page in pages)
+
+        def add(profile: Dict):
+            for _, page in useful:
+                stats = profile["prefixes"].get(path_prefix(page["url"]))
+                if stats is not None:
+                    stats["useful"] += 1
+            if useful:
+                useful_depth = max(page["depth"] for _, page in useful)
+                profile["useful_depths"] = (profile["useful_depths"] + [useful_depth])[-MAX_HISTORY:]
+                profile["useful_ranks"] = (profile["useful_ranks"] + [useful[-1][0]])[-MAX_HISTORY:]
+                profile["crawled_depths"] = (profile["crawled_depths"] + [crawled_depth])[-MAX_HISTORY:]
+
+        self._update(host, add)
+
+    def summary(self, host: str) -> Dict:
+        profile = self.load(host)
+        p50, p95 = _percentile(profile["latencies"], 50), _percentile(profile["latencies"], 95)
+        prefixes = sorted(profile["prefixes"].items(), key=lambda item: item[1]["pages"], reverse=True)
+        return {
+            "host": host,
+            "crawls": profile["crawls"],
+            "fetches": profile["fetches"],
+            "error_rate": round(profile["errors"] / profile["fetches"], 3) if profile["fetches"] else 0.0,
+            "timeout_rate": round(profile["timeouts"] / profile["fetches"], 3) if profile["fetches"] else 0.0,
+            "latency": {"p50": p50, "p95": p95},
+            "prefixes": dict(prefixes[:50]),
+            "useful_depths": profile["useful_depths"],
+            "useful_ranks": profile["useful_ranks"],
+            "updated_at": profile["updated_at"],
+        }
+
+
+_profiles: Optional[CrawlProfiles] = None
+
+
+def get_crawl_profiles() -> CrawlProfiles:
+    """Process-wide crawl profiles in the shared storage backend, kept CRAWL_PROFILE_TTL seconds."""
+    global _profiles
+    if _profiles is None:
+        _profiles = CrawlProfiles(ttl=float(os.getenv("CRAWL_PROFILE_TTL", str(30 * 86400))))
+    return _profiles
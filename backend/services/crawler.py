@@ -1,12 +1,42 @@
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString, Tag
 from urllib.parse import urljoin, urlparse
-from typing import List, Set
+from typing import Dict, List, Set, Optional
+from pathlib import Path
 import asyncio
-from collections import deque
+import hashlib
 import re
+import tempfile
+import threading
 import time
 
+from services.storage import StorageBackend, MemoryStorage, get_storage
+from services.frontier import MemoryFrontier, SQLiteFrontier, ContentSpool
+from services.deadline import Deadline
+from services.link_scorer import LinkScorer
+from services.clients import get_http_session
+from services.resilience import CircuitOpen, counts_as_failure, get_resilience
+from services.url_variants import UrlVariants
+from services.crawl_profile import CrawlProfiles, get_crawl_profiles
+from services.memory import get_memory_profiler
+from services.snapshot import RawResponse, SnapshotReader, SnapshotWriter, snapshot_path
+
+
+HEADINGS = ("h1", "h2", "h3", "h4")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+class FetchCancelled(Exception):
+    """Raised in a fetch thread when its request was cancelled by the crawl."""
+
+
+class DeadlineReached(Exception):
+    """Raised instead of starting a download when the crawl deadline leaves no time for it."""
+
+
+# Shortest timeout worth starting a download with (requests rejects a timeout of 0)
+MIN_FETCH_TIMEOUT = 0.05
+
 
 class DocumentationCrawler:
     """
@@ -20,20 +50,111 @@ class DocumentationCrawler:
         max_pages: int = 20,
         max_depth: int = 2,
         max_content_length: int = 40000,
+        max_page_chars: int = 5000,
         page_timeout: int = 8,
-        max_total_time: int = 60
+        max_total_time: int = 60,
+        storage: Optional[StorageBackend] = None,
+        cache_ttl: int = 3600,
+        links_per_page: int = 10,
+        large_site: bool = False,
+        state_dir: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        snapshot_dir: Optional[str] = None,
+        replay: Optional[SnapshotReader] = None,
+        collapse_variants: bool = True,
+        outline_mode: bool = False,
+        min_outline_headings: int = 3,
+        profiles: Optional[CrawlProfiles] = None,
+        use_profiles: bool = True,
+        path_bias: Optional[Dict[str, float]] = None
     ):
         self.max_pages = max_pages
         self.max_depth = max_depth
         self.max_content_length = max_content_length
+        self.max_page_chars = max_page_chars
         self.page_timeout = page_timeout
         self.max_total_time = max_total_time
+        self.links_per_page = links_per_page
         self.visited: Set[str] = set()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (compatible; ModuleExtractor/1.0)'
-        })
+        # Shared, pooled session by default so connections survive across crawls
+        self.session = session or get_http_session()
+        # Per-host circuit breakers and latency stats, shared by all crawls in the process
+        self.resilience = get_resilience()
+        self.memory = get_memory_profiler()
         self.start_time = None
+        self.deadline = Deadline(max_total_time)
+        # Set when the crawl stopped early because its deadline expired
+        self.partial = False
+        self._collected: List[str] = []
+        # Set whenever the crawl collects a page (progressive extraction waits on it)
+        self.page_added = asyncio.Event()
+        # Shared across worker processes so a page is fetched once per TTL
+        self.storage = storage or get_storage()
+        self.cache_ttl = cache_ttl
+        # Large-site mode: disk-backed frontier, Bloom visited set, text spooled to disk
+        self.large_site = large_site
+        self.state_dir = state_dir
+        self.spool_path: Optional[Path] = None
+        # An in-process page cache would grow with the site; only share through external stores
+        self.use_page_cache = not (large_site and isinstance(self.storage, MemoryStorage))
+        # Snapshots: record every downloaded response to a WARC file in snapshot_dir,
+        # or serve pages from a recorded snapshot instead of the network
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_file: Optional[Path] = None
+        self._snapshot: Optional[SnapshotWriter] = None
+        self.replay = replay
+        # Skip translations and other versions of the docs (see UrlVariants)
+        self.collapse_variants = collapse_variants
+        self.variants: Optional[UrlVariants] = None
+        # Outline-first: pages contribute their heading outline, and full text only
+        # when the outline has fewer than min_outline_headings headings
+        self.outline_mode = outline_mode
+        self.min_outline_headings = min_outline_headings
+        self.outline_stats = {"outlines": 0, "full_text": 0}
+        # Pause after every 3rd page
+        self.politeness_delay = 0.2
+        # Per-domain history tunes each crawl, starting from these settings (never for replays)
+        self.base_settings = {
+            "max_pages": max_pages,
+            "max_depth": max_depth,
+            "page_timeout": page_timeout,
+            "politeness_delay": self.politeness_delay,
+        }
+        self.profiles = (profiles or get_crawl_profiles()) if use_profiles and replay is None else None
+        # Score bias per path prefix: the given one, plus what the profile learned
+        self.base_path_bias = dict(path_bias or {})
+        self.path_bias: dict = dict(self.base_path_bias)
+        self.tuning: dict = {}
+        # This crawl's network fetches and crawled pages, recorded into the domain's profile
+        self.fetch_log: List[dict] = []
+        self.page_log: List[dict] = []
+        if snapshot_dir or replay is not None:
+            # A page cache hit would be missing from the snapshot, or not come from it
+            self.use_page_cache = False
+    
+    def options(self) -> dict:
+        """
+        Options that determine what a crawl collects, as tuned for the current
+        crawl; stored with snapshots so a replay follows the same frontier.
+        """
+        return {
+            "max_pages": self.max_pages,
+            "max_depth": self.max_depth,
+            "max_content_length": self.max_content_length,
+            "max_page_chars": self.max_page_chars,
+            "links_per_page": self.links_per_page,
+            "large_site": self.large_site,
+            "collapse_variants": self.collapse_variants,
+            "outline_mode": self.outline_mode,
+            "min_outline_headings": self.min_outline_headings,
+            "path_bias": self.path_bias,
+        }
+    
+    def skipped_variants(self) -> dict:
+        """Localized/versioned variants the last crawl skipped (count, values, URLs with reasons)."""
+        if self.variants is None:
+            return {"count": 0, "values": {}, "urls": []}
+        return self.variants.summary()
     
     def _is_valid_url(self, url: str, base_domain: str) -> bool:
         """Check if URL is valid and within the same domain."""
@@ -89,46 +210,153 @@ class DocumentationCrawler:
         
         return text.strip()
     
+    def _outline(self, soup: BeautifulSoup) -> str:
+        """
+        Compact outline of a cleaned page: one line per h1-h4 heading, indented
+        by level, with its anchor ID and the first sentence under it, e.g.
+        "  ## Invoices [#invoices]: Create and send invoices to customers."
+        """
+        lines = []
+        for heading in soup.find_all(HEADINGS):
+            title = re.sub(r'\s+', ' ', heading.get_text(' ', strip=True))[:120]
+            if not title:
+                continue
+            anchor = heading.get('id') or (heading.find(attrs={'id': True}) or {}).get('id')
+            # Text after the heading up to the next one; enough for a first sentence
+            parts, length = [], 0
+            for element in heading.next_elements:
+                if isinstance(element, Tag) and element.name in HEADINGS:
+                    break
+                if isinstance(element, NavigableString) and heading not in element.parents:
+                    parts.append(str(element))
+                    length += len(element)
+                    if length > 300:
+                        break
+            body = re.sub(r'\s+', ' ', ' '.join(parts)).strip()
+            sentence = _SENTENCE_END.split(body, 1)[0][:200] if body else ""
+            level = int(heading.name[1])
+            line = "  " * (level - 1) + "#" * level + " " + title
+            if anchor:
+                line += f" [#{anchor}]"
+            if sentence:
+                line += f": {sentence}"
+            lines.append(line)
+        return "\n".join(lines)
+    
+    def _page_section(self, url: str, text: str, outline: str) -> tuple[str, str]:
+        """
+        Header and body one page contributes to the crawl's content: its text,
+        or in outline mode its outline when that has enough headings.
+        """
+        if self.outline_mode:
+            if outline and outline.count("\n") + 1 >= self.min_outline_headings:
+                self.outline_stats["outlines"] += 1
+                return f"\n\n--- Outline of {url} ---\n\n", outline
+            self.outline_stats["full_text"] += 1
+        return f"\n\n--- Content from {url} ---\n\n", text
+    
     async def _fetch_page(self, url: str, retries: int = 2) -> tuple[str, str]:
         """Fetch a single page with retries and timeout."""
         url_result, content, _ = await self._fetch_page_with_soup(url, retries)
         return url_result, content
     
+    def _download(self, url: str, timeout: float, cancelled: threading.Event) -> RawResponse:
+        """Blocking GET that stops reading and closes the connection once cancelled."""
+        with self.session.get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            chunks = []
+            for chunk in response.iter_content(chunk_size=65536):
+                if cancelled.is_set():
+                    raise FetchCancelled(url)
+                chunks.append(chunk)
+            return RawResponse(url, response.status_code, response.reason or "", dict(response.headers), b"".join(chunks))
+    
+    def _parse_page(self, body: bytes) -> tuple[str, BeautifulSoup]:
+        """Parse and clean a downloaded page; the same for live crawls and snapshot replays."""
+        with self.memory.stage("parse"):
+            soup = BeautifulSoup(body, 'html.parser')
+        with self.memory.stage("clean"):
+            text = self._clean_text(soup)
+            
+            # Limit individual page content
+            if len(text) > self.max_page_chars:
+                text = text[:self.max_page_chars] + "... [truncated]"
+        return text, soup
+    
+    async def _download_attempt(self, url: str, host: str) -> RawResponse:
+        """One download in the thread pool, recorded against the host's circuit and latency."""
+        timeout = self.deadline.timeout(self.page_timeout)
+        if timeout <= MIN_FETCH_TIMEOUT:
+            # Not the host's fault, so nothing is recorded against its circuit
+            raise DeadlineReached(url)
+        cancelled = threading.Event()
+        loop = asyncio.get_event_loop()
+        started = time.monotonic()
+        try:
+            with self.memory.stage("fetch"):
+                body = await asyncio.wait_for(
+                    loop.run_in_executor(None, self._download, url, timeout, cancelled),
+                    timeout=timeout + 2
+                )
+        except asyncio.CancelledError:
+            # Lost a hedge race or the crawl was cancelled; tell the thread to stop downloading
+            cancelled.set()
+            raise
+        except Exception as e:
+            cancelled.set()
+            self.resilience.record(host, not counts_as_failure(e))
+            raise
+        self.resilience.record(host, True, time.monotonic() - started)
+        return body
+    
     async def _fetch_page_with_soup(self, url: str, retries: int = 2) -> tuple[str, str, BeautifulSoup]:
-        """Fetch a single page with retries and timeout, returning content and soup."""
+        """
+        Fetch a single page with retries and timeout, returning content and soup.
+        Downloads are hedged once they run past the host's usual latency, and
+        fail fast while the host's circuit is open.
+        """
+        if self.replay is not None:
+            response = self.replay.get(url)
+            if response is None:
+                return url, "", None
+            text, soup = self._parse_page(response.body)
+            return url, text, soup
+        
+        host = urlparse(url).netloc
         for attempt in range(retries + 1):
+            # Every attempt is bounded by the crawl deadline as well as page_timeout
+            if self.deadline.expired():
+                self.partial = True
+                return url, "", None
             try:
-                # Check overall timeout
-                if self.start_time and (time.time() - self.start_time) > self.max_total_time:
-                    return url, "", None
-                
-                # Run blocking request in thread pool with timeout
-                loop = asyncio.get_event_loop()
-                response = await asyncio.wait_for(
-                    loop.run_in_executor(
-                        None,
-                        lambda: self.session.get(url, timeout=self.page_timeout)
-                    ),
-                    timeout=self.page_timeout + 2
-                )
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                text = self._clean_text(soup)
-                
-                # Limit individual page content
-                if len(text) > 5000:
-                    text = text[:5000] + "... [truncated]"
-                
+                self.resilience.check(host)
+            except CircuitOpen as e:
+                print(f"Skipping {url}: {str(e)}")
+                return url, "", None
+            started = time.monotonic()
+            try:
+                response = await self.resilience.hedged(host, lambda: self._download_attempt(url, host))
+                self.fetch_log.append({"latency": time.monotonic() - started, "ok": True, "timeout": False})
+                if self._snapshot is not None:
+                    # gzip and file I/O; keep them off the event loop
+                    await asyncio.to_thread(self._snapshot.write_response, response)
+                text, soup = self._parse_page(response.body)
                 return url, text, soup
             except asyncio.TimeoutError:
-                if attempt < retries:
+                # The time spent counts as a latency sample, so slow hosts get longer timeouts
+                self.fetch_log.append({"latency": time.monotonic() - started, "ok": False, "timeout": True})
+                if attempt < retries and self.deadline.remaining() > 0.5:
                     await asyncio.sleep(0.5)
                     continue
                 print(f"Timeout fetching {url} (attempt {attempt + 1})")
                 return url, "", None
+            except DeadlineReached:
+                # Expired between the check above and the download (or a late hedge)
+                self.partial = True
+                return url, "", None
             except Exception as e:
-                if attempt < retries:
+                self.fetch_log.append({"latency": None, "ok": not counts_as_failure(e), "timeout": False})
+                if attempt < retries and self.deadline.remaining() > 0.5:
                     await asyncio.sleep(0.5)
                     continue
                 print(f"Error fetching {url}: {str(e)}")
@@ -136,6 +364,36 @@ class DocumentationCrawler:
         
         return url, "", None
     
+    async def _fetch_page_cached(self, url: str) -> tuple[str, str, List[List[str]], str]:
+        """
+        Fetch a page through the shared page cache.
+        Returns cleaned text, every [absolute link, anchor text] on the page
+        (callers filter links) and the page's heading outline.
+        """
+        async def compute():
+            _, text, soup = await self._fetch_page_with_soup(url)
+            if not text:
+                return None
+            links = [
+                [urljoin(url, tag['href']), tag.get_text(' ', strip=True)[:100]]
+                for tag in soup.find_all('a', href=True)
+            ] if soup else []
+            with self.memory.stage("clean"):
+                outline = self._outline(soup) if soup else ""
+            return {"text": text, "links": links, "outline": outline}
+        
+        if self.use_page_cache:
+            # Another crawl fetching the same page is waited for no longer than a fetch of our own
+            page = await self.storage.aget_or_compute(
+                f"page:v4:{self.max_page_chars}:{url}", compute, ttl=self.cache_ttl,
+                wait_timeout=self.deadline.timeout(self.page_timeout)
+            )
+        else:
+            page = await compute()
+        if not page:
+            return url, "", [], ""
+        return url, page["text"], page["links"], page["outline"]
+    
     def _extract_links(self, soup: BeautifulSoup, base_url: str, base_domain: str) -> List[str]:
         """Extract valid internal links from a page."""
         links = []
@@ -148,79 +406,257 @@ class DocumentationCrawler:
         
         return links
     
-    async def crawl_documentation(self, start_url: str) -> str:
+    def _open_frontier(self, start_url: str):
+        """In-memory frontier by default; disk-backed frontier and spool in large-site mode."""
+        if not self.large_site:
+            return MemoryFrontier(), None
+        state_dir = Path(self.state_dir or (
+            Path(__file__).parent.parent / ".cache" / "crawls"
+            / hashlib.sha1(start_url.encode()).hexdigest()[:16]
+        ))
+        self.spool_path = state_dir / "content.txt"
+        frontier = SQLiteFrontier(str(state_dir))
+        # Only an interrupted crawl's spooled text is kept
+        return frontier, ContentSpool(str(self.spool_path), resume=frontier.resumed)
+    
+    def collected_content(self) -> str:
+        """Text gathered so far by the current crawl, e.g. after it was cancelled."""
+        if self.large_site and self.spool_path is not None and self.spool_path.exists():
+            # What the finished crawl would return: the start of the spool
+            return ContentSpool.read_from(self.spool_path, self.max_content_length)
+        return "\n".join(self._collected)
+    
+    def collected_pages(self) -> List[str]:
+        """
+        Page sections gathered so far by the current crawl, in crawl order, up
+        to max_content_length characters; the list grows while the crawl runs.
+        In large-site mode, text spooled by an interrupted earlier run comes
+        first, as one section.
+        """
+        return self._collected
+    
+    async def crawl_documentation(self, start_url: str, deadline: Optional[Deadline] = None) -> str:
         """
         Crawl documentation starting from a URL.
         Returns concatenated clean text from all crawled pages.
         Optimized for speed with concurrent fetching and early stopping.
+        
+        The crawl stops at `deadline` (or after max_total_time), bounding every
+        fetch by the time left and returning what was gathered; self.partial
+        records whether the deadline cut it short.
+        
+        In large-site mode the frontier lives on disk, the visited set is a Bloom
+        filter and page text is spilled to self.spool_path, so memory stays flat
+        and an interrupted crawl resumes from the same state directory (one that
+        ran to completion starts over). The crawl then runs until max_pages, and
+        the first max_content_length characters of the spool are returned.
+        
+        With snapshot_dir set, every downloaded response is archived to a new
+        WARC file there (self.snapshot_file); with `replay` set, pages are read
+        from that snapshot and nothing is fetched.
+        
+        In outline mode each page contributes its heading outline (headings,
+        anchor IDs, first sentences) instead of its text, unless the outline is
+        too sparse, so the same max_content_length covers far more pages.
+        
+        Timeouts, budgets, pacing and path priorities are tuned from the domain's
+        crawl profile (self.tuning lists what changed), and this crawl's fetches
+        and pages are added to it.
         """
+        host = urlparse(start_url).netloc
+        # Profiles live in shared storage, which may block on disk or network I/O
+        await asyncio.to_thread(self._apply_profile, host)
+        self.fetch_log, self.page_log = [], []
+        if self.snapshot_dir:
+            self.snapshot_file = snapshot_path(self.snapshot_dir, start_url)
+            self._snapshot = await asyncio.to_thread(SnapshotWriter, self.snapshot_file, start_url, self.options())
+        try:
+            return await self._crawl(start_url, deadline)
+        finally:
+            # Also on cancellation: what was fetched before the deadline is still archived and learned from
+            if self._snapshot is not None:
+                self._snapshot.close()
+                print(f"Snapshot of {start_url}: {self._snapshot.records - 1} response(s) in {self.snapshot_file}")
+                self._snapshot = None
+            if self.profiles is not None:
+                try:
+                    await asyncio.to_thread(self.profiles.record_crawl, host, self.fetch_log, self.page_log)
+                except Exception as e:
+                    print(f"Could not update crawl profile for {host}: {str(e)}")
+    
+    def _apply_profile(self, host: str):
+        """Set this crawl's settings from the base settings and the domain's profile."""
+        settings, self.path_bias, self.tuning = dict(self.base_settings), dict(self.base_path_bias), {}
+        if self.profiles is not None:
+            try:
+                settings, bias, self.tuning = self.profiles.tune(host, self.base_settings)
+                self.path_bias = {**self.base_path_bias, **bias}
+            except Exception as e:
+                print(f"Could not load crawl profile for {host}: {str(e)}")
+            if self.large_site:
+                # A large-site crawl was asked for its page budget; useful ranks from normal crawls don't apply
+                settings["max_pages"] = self.base_settings["max_pages"]
+                self.tuning.pop("max_pages", None)
+        self.max_pages = settings["max_pages"]
+        self.max_depth = settings["max_depth"]
+        self.page_timeout = settings["page_timeout"]
+        self.politeness_delay = settings["politeness_delay"]
+        if self.tuning:
+            print(f"Crawl profile for {host}: {self.tuning}")
+    
+    def record_yield(self, start_url: str, pages: List[dict], content: str, modules: List[dict]):
+        """
+        Tell the domain's profile which pages of a crawl (its page_log) mentioned
+        the modules later extracted from its content.
+        """
+        if self.profiles is None:
+            return
+        try:
+            self.profiles.record_yield(urlparse(start_url).netloc, pages, content, modules)
+        except Exception as e:
+            print(f"Could not update crawl profile for {start_url}: {str(e)}")
+    
+    async def _crawl(self, start_url: str, deadline: Optional[Deadline]) -> str:
         self.start_time = time.time()
+        self.deadline = deadline.child(self.max_total_time) if deadline else Deadline(self.max_total_time)
+        self.partial = False
+        self.outline_stats = {"outlines": 0, "full_text": 0}
         parsed_start = urlparse(start_url)
         base_domain = f"{parsed_start.scheme}://{parsed_start.netloc}"
         
-        self.visited.clear()
-        queue = deque([(start_url, 0)])  # (url, depth)
-        all_content = []
+        frontier, spool = self._open_frontier(start_url)
+        self.visited = frontier.seen if self.large_site else set()
+        scorer = LinkScorer(start_url, path_bias=self.path_bias)
+        self.variants = variants = UrlVariants(start_url) if self.collapse_variants else None
+        frontier.push(start_url, 0)  # (url, depth)
+        pages_crawled = frontier.done_count()
+        if pages_crawled:
+            print(f"Resuming crawl of {start_url}: {pages_crawled} pages already done, {len(frontier)} queued")
+        all_content = self._collected = []
         total_length = 0
+        if spool is not None and spool.total_bytes:
+            all_content.append(ContentSpool.read_from(self.spool_path, self.max_content_length))
+            total_length = len(all_content[0])
+            self.page_added.set()
         
-        # Prioritize main page and immediate children
-        priority_urls = {start_url}
-        
-        while queue and len(self.visited) < self.max_pages and total_length < self.max_content_length:
-            # Check overall timeout
-            if (time.time() - self.start_time) > self.max_total_time:
-                print(f"Reached max time limit ({self.max_total_time}s), stopping crawl")
-                break
-            
-            current_url, depth = queue.popleft()
-            
-            if current_url in self.visited or depth > self.max_depth:
-                continue
-            
-            self.visited.add(current_url)
-            
-            # Fetch page and get both content and HTML for link extraction
-            url, content, soup = await self._fetch_page_with_soup(current_url)
-            
-            if content:
-                # Truncate if needed
-                remaining = self.max_content_length - total_length
-                if remaining <= 0:
+        try:
+            while (
+                len(frontier)
+                and pages_crawled < self.max_pages
+                and (spool is not None or total_length < self.max_content_length)
+            ):
+                # Check overall timeout
+                if self.deadline.expired():
+                    print(f"Reached crawl deadline after {time.time() - self.start_time:.1f}s, stopping crawl")
+                    self.partial = True
                     break
-                    
-                if len(content) > remaining:
-                    content = content[:remaining]
                 
-                all_content.append(f"\n\n--- Content from {url} ---\n\n{content}")
-                total_length += len(content)
+                current_url, depth = frontier.pop()
                 
-                # Extract links from the soup we already have (no double fetch)
-                if soup and depth < self.max_depth and len(self.visited) < self.max_pages:
-                    try:
-                        links = self._extract_links(soup, current_url, base_domain)
+                if depth > self.max_depth:
+                    frontier.mark_done(current_url)
+                    continue
+                # Queued before its locale/version slot was learned
+                if variants is not None and variants.skip(current_url):
+                    frontier.mark_done(current_url)
+                    continue
+                
+                if spool is None:
+                    self.visited.add(current_url)
+                pages_crawled += 1
+                
+                # Fetch page (or reuse another worker's copy) with its outgoing links
+                url, content, page_links, outline = await self._fetch_page_cached(current_url)
+                self.page_log.append({"url": current_url, "depth": depth, "chars": len(content)})
+                
+                if content:
+                    header, content = self._page_section(url, content, outline)
+                    if spool is not None:
+                        spool.append(header + content)
+                    if total_length < self.max_content_length:
+                        # Truncate if needed; a large-site crawl goes on, but keeps no more than this in memory
+                        remaining = self.max_content_length - total_length
+                        if len(content) > remaining:
+                            content = content[:remaining]
                         
-                        # Limit number of links to avoid explosion
-                        links = links[:10]  # Max 10 links per page
+                        all_content.append(header + content)
+                        total_length += len(content)
+                        self.page_added.set()
+                    
+                    # Links come from the same fetch (no double fetch)
+                    try:
+                        links = [
+                            (link, anchor) for link, anchor in page_links
+                            if self._is_valid_url(link, base_domain)
+                        ]
+                        for link, anchor in links:
+                            scorer.record_link(link, anchor)
+                        if variants is not None:
+                            # Learn variant slots from every link before deciding which to skip
+                            for link, _ in links:
+                                variants.observe(link)
+                            links = [(link, anchor) for link, anchor in links if not variants.skip(link)]
                         
-                        for link in links:
-                            if link not in self.visited and link not in [q[0] for q in queue]:
-                                # Prioritize links from main page
-                                if link in priority_urls or depth == 0:
-                                    queue.appendleft((link, depth + 1))
-                                else:
-                                    queue.append((link, depth + 1))
+                        if depth < self.max_depth and pages_crawled < self.max_pages:
+                            # Best-first: keep only the most promising links from each page
+                            scored = sorted(
+                                ((scorer.score(link, anchor, depth + 1), link) for link, anchor in links),
+                                key=lambda item: item[0],
+                                reverse=True
+                            )[:self.links_per_page]
+                            for score, link in scored:
+                                if not frontier.push(link, depth + 1, score):
+                                    # Already queued: a new in-link may raise its rank
+                                    frontier.update(link, score)
                     except:
                         pass
-            
-            # Reduced delay for faster crawling
-            if len(self.visited) % 3 == 0:  # Only delay every 3rd page
-                await asyncio.sleep(0.2)
+                
+                frontier.mark_done(current_url)
+                
+                # Reduced delay for faster crawling (none when replaying a snapshot)
+                if self.politeness_delay and pages_crawled % 3 == 0 and self.replay is None:  # Only delay every 3rd page
+                    await asyncio.sleep(self.politeness_delay)
+            if not self.partial:
+                # Cut short by the deadline (or an error), the crawl stays resumable
+                frontier.finish()
+        finally:
+            frontier.close()
+            if spool is not None:
+                spool.close()
+        
+        if variants is not None and variants.summary()["count"]:
+            summary = variants.summary()
+            found = "; ".join(f"{kind}: {', '.join(values)}" for kind, values in summary["values"].items())
+            print(f"Skipped {summary['count']} localized/versioned variant URL(s) of {start_url} ({found})")
         
-        if not all_content:
+        if self.outline_mode:
+            print(f"Outline crawl of {start_url}: {self.outline_stats['outlines']} page outline(s), "
+                  f"{self.outline_stats['full_text']} sparse page(s) as full text")
+        
+        if spool is not None:
+            print(f"Large-site crawl: {pages_crawled} pages, {spool.total_bytes} bytes spooled to {self.spool_path}")
+            return ContentSpool.read_from(self.spool_path, self.max_content_length)
+        
+        if not all_content and not self.deadline.expired():
             # If we got nothing, try just the main page
-            url, content, _ = await self._fetch_page_with_soup(start_url)
+            url, content, _, _ = await self._fetch_page_cached(start_url)
             if content:
                 all_content.append(f"Content from {start_url}:\n{content}")
         
         return "\n".join(all_content) if all_content else ""
 
+
+def replay_snapshot(path: str) -> dict:
+    """
+    Re-run a recorded crawl from its snapshot, with the options it was recorded
+    with and no network access. A plain function so batch replays can fan out
+    over a process pool.
+    """
+    reader = SnapshotReader(path)
+    with tempfile.TemporaryDirectory() as state_dir:
+        # A fresh state directory, so a large-site replay never resumes a live crawl
+        crawler = DocumentationCrawler(
+            storage=MemoryStorage(), replay=reader, state_dir=state_dir, **reader.crawler_options
+        )
+        content = asyncio.run(crawler.crawl_documentation(reader.start_url))
+    return {"url": reader.start_url, "content": content, "pages": len(reader), "snapshot": str(path)}
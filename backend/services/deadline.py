@@ -0,0 +1,34 @@
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    A point in time by which work must finish. Stages take slices of the
+    remaining time and pass them down so every fetch and LLM call is bounded
+    by the request's overall budget.
+    """
+
+    def __init__(self, seconds: float, parent: Optional["Deadline"] = None):
+        expires_at = time.monotonic() + max(0.0, seconds)
+        if parent is not None:
+            expires_at = min(expires_at, parent.expires_at)
+        self.expires_at = expires_at
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float) -> float:
+        """Timeout for one operation: its own cap, but never past the deadline."""
+        return min(cap, self.remaining())
+
+    def child(self, seconds: float) -> "Deadline":
+        """A sub-deadline of at most `seconds` that never outlives this one."""
+        return Deadline(seconds, parent=self)
+
+    def share(self, fraction: float) -> "Deadline":
+        """A sub-deadline covering `fraction` of the remaining time."""
+        return Deadline(self.remaining() * fraction, parent=self)
@@ -1,13 +1,35 @@
 import os
 import json
-from pathlib import Path
-from typing import List, Dict
-import openai
-from dotenv import load_dotenv
+import re
+import asyncio
+import hashlib
+import threading
+import time
+from typing import AsyncIterator, List, Dict, Optional
+from urllib.parse import urlparse
 
-# Load .env from project root (two levels up from services/)
-env_path = Path(__file__).parent.parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
+from services.storage import StorageBackend, get_storage
+from services.cascade import validate_modules, cascade_stats
+from services.json_stream import ModuleStreamParser
+from services.prompts import PromptTemplate
+from services.deadline import Deadline
+from services.schema import normalize_modules
+from services.clients import get_llm_client
+from services.resilience import counts_as_failure, get_resilience
+from services.memory import get_memory_profiler
+
+
+_FINISHED = object()
+
+
+class _CompletionStream:
+    """One in-flight streaming completion: deltas arrive on `queue` until _FINISHED or an exception."""
+    
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.stop = threading.Event()
+        self.state: Dict = {}
+        self.worker = None
 
 
 class ModuleExtractor:
@@ -15,163 +37,570 @@ class ModuleExtractor:
     Uses LLM to extract product modules and submodules from documentation content.
     """
     
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        api_base = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
-        
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is required")
-        
-        self.client = openai.OpenAI(
-            api_key=api_key,
-            base_url=api_base
-        )
+    def __init__(self, storage: Optional[StorageBackend] = None, client=None):
+        # Shared client by default; raises ValueError if OPENAI_API_KEY is not set
+        self.client = client or get_llm_client()
         
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         self.temperature = float(os.getenv("LLM_TEMPERATURE", "0.3"))
         self.max_tokens = int(os.getenv("MAX_TOKENS", "2000"))
+        # Optional cascade, smallest model first, e.g. "llama-3.1-8b-instant,llama-3.3-70b-versatile".
+        # Larger models are only called when the smaller one's output fails validation.
+        self.cascade_models = [
+            m.strip() for m in os.getenv("OPENAI_CASCADE_MODELS", "").split(",") if m.strip()
+        ]
+        self.min_submodule_coverage = float(os.getenv("CASCADE_MIN_SUBMODULE_COVERAGE", "0.5"))
+        self.template = PromptTemplate()
+        # LLM results are shared across workers; identical prompts are answered once
+        self.storage = storage or get_storage()
+        self.cache_ttl = int(os.getenv("LLM_CACHE_TTL", "86400"))
+        # Per-endpoint circuit breakers; LLM calls are hedged on time to first token
+        self.resilience = get_resilience()
+        self.memory = get_memory_profiler()
+        self.hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", str(self.resilience.hedge_percentile)))
+        # Small sources are packed into one call of up to this many prompt tokens (0 = one call per source)
+        self.batch_tokens = int(os.getenv("LLM_BATCH_TOKENS", "6000"))
+        self.batch_max_sources = int(os.getenv("LLM_BATCH_MAX_SOURCES", "4"))
+        # Output budget of a batched call: MAX_TOKENS per source, capped at the model's completion limit
+        self.batch_max_tokens = int(os.getenv("LLM_BATCH_MAX_TOKENS", "8192"))
+    
+    def _endpoint(self, model: str) -> str:
+        """Circuit breaker / latency key for one model on the configured API."""
+        host = urlparse(str(getattr(self.client, "base_url", ""))).netloc or "default"
+        return f"llm:{host}/{model}"
+    
+    def _start_stream(
+        self,
+        prompt: str,
+        model: str,
+        timeout: Optional[float],
+        endpoint: str,
+        max_tokens: Optional[int] = None
+    ) -> "_CompletionStream":
+        """
+        Start one streaming completion, consumed in an executor thread and handed
+        to the event loop chunk by chunk. Time to the first chunk (or the error
+        before it) is recorded against the endpoint.
+        """
+        loop = asyncio.get_event_loop()
+        stream = _CompletionStream()
+        
+        def consume():
+            started = time.monotonic()
+            first = True
+            try:
+                # Without a deadline keep the client's own default timeout: None would disable it
+                options = {"timeout": timeout} if timeout is not None else {}
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=self.template.messages(prompt),
+                    temperature=self.temperature,
+                    max_tokens=max_tokens or self.max_tokens,
+                    response_format={"type": "json_object"},
+                    stream=True,
+                    **options
+                )
+                for chunk in response:
+                    if first:
+                        self.resilience.record(endpoint, True, time.monotonic() - started)
+                        first = False
+                    if stream.stop.is_set():
+                        break
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    if choice.delta and choice.delta.content:
+                        loop.call_soon_threadsafe(stream.queue.put_nowait, choice.delta.content)
+                    if choice.finish_reason:
+                        stream.state["finish_reason"] = choice.finish_reason
+                if first:
+                    self.resilience.record(endpoint, True, time.monotonic() - started)
+                loop.call_soon_threadsafe(stream.queue.put_nowait, _FINISHED)
+            except Exception as e:
+                if first:
+                    self.resilience.record(endpoint, not counts_as_failure(e))
+                loop.call_soon_threadsafe(stream.queue.put_nowait, e)
+        
+        stream.worker = loop.run_in_executor(None, consume)
+        return stream
     
-    def _truncate_content(self, content: str, max_chars: int = 60000) -> str:
-        """Truncate content to fit within token limits."""
-        if len(content) <= max_chars:
-            return content
-        # Truncate but keep the beginning (usually most important)
-        return content[:max_chars] + "\n\n[Content truncated to fit token limits...]"
-    
-    def _build_prompt(self, content: List[Dict[str, str]]) -> str:
-        """Build the LLM prompt for module extraction."""
-        content_text = "\n\n".join([
-            f"Documentation from {item['url']}:\n{item['content']}"
-            for item in content
-        ])
-        
-        content_text = self._truncate_content(content_text)
-        
-        num_urls = len(content)
-        url_list = ", ".join([item['url'] for item in content])
-        
-        # Create a clear separator between different URL sources
-        content_sections = []
-        for idx, item in enumerate(content, 1):
-            content_sections.append(
-                f"\n{'='*80}\n"
-                f"SOURCE {idx} of {num_urls}: {item['url']}\n"
-                f"{'='*80}\n"
-                f"{item['content']}\n"
+    async def _stream_text(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        state: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream completion text deltas (up to max_tokens, default MAX_TOKENS).
+        state["finish_reason"] is set once the stream ends.
+        
+        Fails fast with CircuitOpen while the endpoint's circuit is open. A call
+        whose first token is slower than the endpoint's usual time to first
+        token is hedged with a second identical call; the first to start
+        streaming is used and the other is stopped.
+        """
+        state = {} if state is None else state
+        model = model or self.model
+        endpoint = self._endpoint(model)
+        self.resilience.check(endpoint)
+        
+        async def attempt():
+            stream = self._start_stream(prompt, model, timeout, endpoint, max_tokens)
+            try:
+                item = await stream.queue.get()
+            except asyncio.CancelledError:
+                stream.stop.set()
+                raise
+            if isinstance(item, Exception):
+                raise item
+            return stream, item
+        
+        with self.memory.stage("llm"):
+            stream, item = await self.resilience.hedged(
+                endpoint, attempt,
+                percentile=self.hedge_percentile,
+                discard=lambda result: result[0].stop.set()
             )
-        content_text = "\n".join(content_sections)
-        content_text = self._truncate_content(content_text)
+            try:
+                while item is not _FINISHED:
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+                    item = await stream.queue.get()
+            finally:
+                # Stop reading if the consumer went away early
+                stream.stop.set()
+                state.update(stream.state)
+            await stream.worker
+    
+    async def _stream_completion(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        state: Optional[Dict] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Yield module dicts as soon as each one is complete in the streamed output.
+        Complete modules survive a response truncated at max_tokens, or cut off
+        at the deadline (state["partial"] is then set).
+        """
+        parser = ModuleStreamParser()
+        state = {} if state is None else state
+        if deadline is not None and deadline.expired():
+            state["partial"] = True
+            return
+        deltas = self._stream_text(prompt, model, state, deadline.remaining() if deadline else None)
+        try:
+            while True:
+                if deadline is None:
+                    delta = await deltas.__anext__()
+                else:
+                    delta = await asyncio.wait_for(deltas.__anext__(), timeout=deadline.remaining())
+                for module in parser.feed(delta):
+                    yield module
+        except StopAsyncIteration:
+            pass
+        except asyncio.TimeoutError:
+            state["partial"] = True
+            await deltas.aclose()
+            print(f"LLM deadline reached; kept {len(parser.modules)} complete module(s)")
+            return
         
-        prompt = f"""You are a Product Management AI assistant. Analyze the following product documentation from {num_urls} source{'s' if num_urls > 1 else ''} and extract the product modules and submodules.
-
-CRITICAL: You MUST analyze documentation from ALL {num_urls} URL{'s' if num_urls > 1 else ''} provided:
-{url_list}
-
-Your task is to:
-1. Analyze ALL the documentation provided from ALL {num_urls} source{'s' if num_urls > 1 else ''} - DO NOT skip any source
-2. Extract modules from EACH source - make sure you've reviewed content from all {num_urls} source{'s' if num_urls > 1 else ''}
-3. Identify distinct product modules (high-level feature areas) across ALL sources
-4. For each module, identify submodules (specific features or capabilities) from ALL sources
-5. Combine and merge related modules/submodules from different sources into unified entries
-6. If a module appears in multiple sources, merge them and include submodules from all sources
-7. Provide clear, concise descriptions suitable for Product Managers
-8. Base your analysis strictly on the provided documentation - do not hallucinate features
-
-Documentation Content from {num_urls} source{'s' if num_urls > 1 else ''}:
-{content_text}
-
-Return a JSON object with a "modules" key containing an array with the following structure:
-{{
-  "modules": [
-    {{
-      "module": "Module Name",
-      "description": "High-level description of the module from a product perspective",
-      "submodules": {{
-        "Submodule Name": "Concise description of the submodule functionality"
-      }}
-    }}
-  ]
-}}
-
-Guidelines:
-- Analyze and extract modules from ALL {num_urls} documentation source{'s' if num_urls > 1 else ''} provided
-- If the same module appears in multiple sources, merge them into one entry
-- Modules should represent major functional areas of the product
-- Submodules should be specific features or capabilities within each module
-- Descriptions should be clear, professional, and PM-friendly
-- Only include modules/submodules that are clearly mentioned or implied in the documentation
-- Group related features logically across all sources
-- Use consistent naming conventions
-- If no clear modules can be identified, return {{"modules": []}}
-
-Return ONLY valid JSON, no additional text or explanation."""
+        if state.get("finish_reason") == "length":
+            print(f"LLM output truncated at max_tokens; kept {len(parser.modules)} complete module(s)")
+        if not parser.modules:
+            # Nothing parsed incrementally (e.g. JSON inside a markdown block)
+            for module in self._parse_response(parser.text.strip()):
+                yield module
+    
+    async def _complete(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        state: Optional[Dict] = None
+    ) -> List[Dict]:
+        """Run one chat completion for the prompt and parse the module list."""
+        return [module async for module in self._stream_completion(prompt, model, deadline, state)]
+    
+    def _parse_response(self, response_text: str) -> List[Dict]:
+        """Parse a complete LLM response into a module list."""
+        # Handle both JSON object and array responses
+        try:
+            parsed = json.loads(response_text)
+            
+            # Extract array from response
+            if isinstance(parsed, dict):
+                # Look for common keys that might contain the array
+                for key in ['modules', 'data', 'result']:
+                    if key in parsed and isinstance(parsed[key], list):
+                        return parsed[key]
+                # If no array found, return empty
+                return []
+            elif isinstance(parsed, list):
+                # Direct array response (fallback)
+                return parsed
+            else:
+                return []
+        except json.JSONDecodeError:
+            # Try to extract JSON from markdown code blocks
+            json_match = re.search(r'```(?:json)?\s*(\[.*?\])\s*```', response_text, re.DOTALL)
+            if json_match:
+                return json.loads(json_match.group(1))
+            
+            # Last resort: try to find JSON array in the text
+            array_match = re.search(r'(\[.*?\])', response_text, re.DOTALL)
+            if array_match:
+                return json.loads(array_match.group(1))
+            
+            raise ValueError("Could not parse JSON from LLM response")
+    
+    async def _complete_cascade(
+        self,
+        prompt: str,
+        report: Dict,
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict]:
+        """
+        Try each cascade model in order, escalating when the output fails
+        validation or the call errors. The last tier's answer is always returned.
+        """
+        started = time.time()
+        for tier, model in enumerate(self.cascade_models):
+            is_last = tier == len(self.cascade_models) - 1
+            attempt_started = time.time()
+            try:
+                modules = await self._complete(prompt, model, deadline, report)
+                reason = validate_modules(modules, self.min_submodule_coverage)
+                if report.get("partial"):
+                    # No time left to escalate; keep what this tier produced
+                    is_last = True
+            except Exception as e:
+                if is_last:
+                    cascade_stats.record_attempt(model, time.time() - attempt_started, False)
+                    raise
+                modules, reason = [], f"call failed: {str(e)}"
+            
+            accepted = reason is None or is_last
+            cascade_stats.record_attempt(model, time.time() - attempt_started, accepted)
+            if accepted:
+                cascade_stats.record_request(time.time() - started)
+                report.update(model=model, tier=tier)
+                return modules
+            print(f"Cascade: {model} rejected ({reason}), escalating")
+    
+    def estimate_tokens(self, content: List[Dict[str, str]], batch: bool = False) -> int:
+        """Approximate prompt plus completion tokens for one extraction call (or one batched call)."""
+        _, prompt_stats = self.template.build(content, batch=batch)
+        if batch:
+            return prompt_stats["approx_tokens"] + self._batch_output_tokens(len(content))
+        return prompt_stats["approx_tokens"] + self.max_tokens
+    
+    def _cache_key(self, prompt: str, models: str) -> str:
+        return "llm:" + hashlib.sha256(
+            f"{models}|{self.temperature}|{self.max_tokens}|{self.template.system}|{prompt}".encode()
+        ).hexdigest()
+    
+    async def stream_modules(
+        self,
+        content: List[Dict[str, str]],
+        deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Yield modules one by one as the LLM produces them.
+        Always uses OPENAI_MODEL: the cascade needs the full output to validate.
+        Output cut off at the deadline or truncated at max_tokens is not cached.
+        """
+        prompt, _ = self.template.build(content)
+        cache_key = self._cache_key(prompt, self.model)
+        
+        cached = await self.storage.aget(cache_key)
+        if cached is not None:
+            for module in cached:
+                yield module
+            return
+        
+        modules = []
+        state = {}
+        async for raw in self._stream_completion(prompt, deadline=deadline, state=state):
+            for module in normalize_modules([raw]):
+                modules.append(module)
+                yield module
+        if not state.get("partial") and state.get("finish_reason") != "length":
+            await self.storage.aset(cache_key, modules, ttl=self.cache_ttl)
+    
+    async def refine_modules(
+        self,
+        url: str,
+        known: List[Dict],
+        content: str,
+        report: Optional[Dict] = None,
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict]:
+        """
+        Modules documented in `content`, pages of `url` crawled after `known`
+        was extracted, named consistently with `known` (see
+        PromptTemplate.build_refinement). Only new and extended modules are
+        returned; fold them into the tree with services.progressive.fold_modules.
+        
+        Always uses OPENAI_MODEL: an empty answer is valid here, so the cascade's
+        validation does not apply. Answers are cached like extract_modules.
+        """
+        prompt, prompt_stats = self.template.build_refinement(url, known, content)
+        cache_key = self._cache_key(prompt, self.model)
+        report = {} if report is None else report
+        report["prompt"] = prompt_stats
+        partial_modules = []
+        
+        async def compute():
+            started = time.time()
+            modules = normalize_modules(await self._complete(prompt, deadline=deadline, state=report))
+            report.update(model=self.model, tier=0, latency=time.time() - started)
+            if report.get("partial") or report.get("finish_reason") == "length":
+                partial_modules.extend(modules)
+                return None
+            return modules
         
-        return prompt
+        modules = await self.storage.aget_or_compute(
+            cache_key, compute, ttl=self.cache_ttl, wait_timeout=deadline.remaining() if deadline else None
+        )
+        report.setdefault("cached", "latency" not in report)
+        return partial_modules if modules is None else modules
     
-    async def extract_modules(self, content: List[Dict[str, str]]) -> List[Dict]:
+    def plan_batches(self, content: List[Dict[str, str]]) -> List[List[Dict[str, str]]]:
+        """
+        Group consecutive sources into batches whose combined prompt stays
+        within LLM_BATCH_TOKENS, at most LLM_BATCH_MAX_SOURCES each. Sources too
+        large to share a call get a batch of their own.
+        """
+        batches: List[List[Dict[str, str]]] = []
+        current: List[Dict[str, str]] = []
+        for item in content:
+            if (
+                current
+                and len(current) < self.batch_max_sources
+                and self.template.build(current + [item], batch=True)[1]["approx_tokens"] <= self.batch_tokens
+            ):
+                current.append(item)
+                continue
+            if current:
+                batches.append(current)
+            current = [item]
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _batch_output_tokens(self, sources: int) -> int:
+        # Each source may need as much output as a call of its own, up to LLM_BATCH_MAX_TOKENS
+        return min(self.max_tokens * sources, self.batch_max_tokens)
+    
+    def _parse_batch(self, text: str) -> Optional[Dict]:
+        """The JSON object of a batched response, also inside a markdown block or other text (as in _parse_response)."""
+        candidates = [text]
+        json_match = re.search(r'```(?:json)?\s*(\{.*\})\s*```', text, re.DOTALL)
+        if json_match:
+            candidates.append(json_match.group(1))
+        start, end = text.find("{"), text.rfind("}")
+        if 0 <= start < end:
+            candidates.append(text[start:end + 1])
+        for candidate in candidates:
+            try:
+                parsed = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(parsed, dict):
+                return parsed
+        return None
+    
+    def _split_batch(
+        self,
+        text: str,
+        sources: int,
+        min_submodule_coverage: float = 0
+    ) -> List[Optional[List[Dict]]]:
+        """
+        Per-source module lists from a batched response, in source order. A
+        source that is missing, listed twice or fails validation is None.
+        """
+        results: List[Optional[List[Dict]]] = [None] * sources
+        parsed = self._parse_batch(text)
+        entries = parsed.get("sources") if isinstance(parsed, dict) else None
+        if not isinstance(entries, list):
+            return results
+        seen = set()
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            index = entry.get("source")
+            if isinstance(index, str) and index.strip().isdigit():
+                index = int(index)
+            if not isinstance(index, int) or not 1 <= index <= sources or index in seen:
+                continue
+            seen.add(index)
+            modules = entry.get("modules")
+            if validate_modules(modules, min_submodule_coverage) is None:
+                results[index - 1] = modules
+        return results
+    
+    async def _complete_batch(
+        self,
+        prompt: str,
+        sources: int,
+        model: str,
+        deadline: Optional[Deadline] = None,
+        min_submodule_coverage: float = 0
+    ) -> List[Optional[List[Dict]]]:
+        """One completion for a batched prompt, split per source (see _split_batch)."""
+        state: Dict = {}
+        chunks: List[str] = []
+        
+        async def collect():
+            timeout = deadline.remaining() if deadline else None
+            async for delta in self._stream_text(prompt, model, state, timeout, self._batch_output_tokens(sources)):
+                chunks.append(delta)
+        
+        if deadline is None:
+            await collect()
+        else:
+            await asyncio.wait_for(collect(), timeout=deadline.remaining())
+        if state.get("finish_reason") == "length":
+            print("Batched LLM output truncated at max_tokens")
+        return self._split_batch("".join(chunks).strip(), sources, min_submodule_coverage)
+    
+    async def extract_batch(
+        self,
+        content: List[Dict[str, str]],
+        reports: Optional[List[Dict]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> List[List[Dict]]:
+        """
+        Extract modules for each source separately, like one extract_modules()
+        call per source, but with the uncached sources sent to the LLM together
+        in a single call (see plan_batches). The model answers per source.
+        The call uses the cheapest cascade tier, and each source's answer must
+        pass the same validation a single-source call of that tier would.
+        Sources whose part of the answer is missing or rejected, and all of
+        them if the call fails, are then extracted with calls of their own,
+        escalating through the cascade.
+        
+        Args:
+            content: Sources (dicts with 'url' and 'content'), small enough to share a call
+            reports: Optional per-source dicts, filled as by extract_modules; batched
+                sources also get batched=<sources in the call>
+            deadline: Optional deadline for the whole batch, fallbacks included
+            
+        Returns:
+            One module list per source, in order
+        """
+        reports = reports if reports is not None else [{} for _ in content]
+        models_key = ",".join(self.cascade_models) or self.model
+        results: List[Optional[List[Dict]]] = [None] * len(content)
+        keys = []
+        pending = []
+        for index, item in enumerate(content):
+            prompt, prompt_stats = self.template.build([item])
+            reports[index]["prompt"] = prompt_stats
+            keys.append(self._cache_key(prompt, models_key))
+            cached = await self.storage.aget(keys[index])
+            if cached is not None:
+                results[index] = cached
+                reports[index]["cached"] = True
+            else:
+                pending.append(index)
+        
+        if len(pending) > 1:
+            # Cheapest cascade tier first: a rejected source escalates through its own call.
+            # Accepted answers are cached under the cascade's key, so they must meet its bar.
+            model = (self.cascade_models or [self.model])[0]
+            coverage = self.min_submodule_coverage if len(self.cascade_models) > 1 else 0
+            prompt, batch_stats = self.template.build([content[index] for index in pending], batch=True)
+            started = time.time()
+            try:
+                per_source = await self._complete_batch(prompt, len(pending), model, deadline, coverage)
+            except Exception as e:
+                print(f"Batched extraction of {len(pending)} sources failed: {str(e)}")
+                per_source = [None] * len(pending)
+            latency = time.time() - started
+            for index, modules in zip(pending, per_source):
+                if modules is None:
+                    continue
+                modules = normalize_modules(modules)
+                results[index] = modules
+                reports[index].update(
+                    model=model, tier=0, latency=latency, cached=False,
+                    batched=len(pending), batch_prompt=batch_stats
+                )
+                # Later single-source requests for the same content reuse the answer
+                await self.storage.aset(keys[index], modules, ttl=self.cache_ttl)
+            fallbacks = sum(1 for result in results if result is None)
+            print(f"Batched {len(pending)} sources in one call ({batch_stats['approx_tokens']} tokens, "
+                  f"{latency:.1f}s); {fallbacks} fall back to individual calls")
+        
+        for index, item in enumerate(content):
+            if results[index] is not None:
+                continue
+            try:
+                results[index] = await self.extract_modules([item], report=reports[index], deadline=deadline)
+            except Exception as e:
+                # As with separate requests, one failing source does not lose the others
+                print(f"Error extracting from {item['url']}: {str(e)}")
+                reports[index]["error"] = str(e)
+                results[index] = []
+        return results
+    
+    async def extract_modules(
+        self,
+        content: List[Dict[str, str]],
+        report: Optional[Dict] = None,
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict]:
         """
         Extract modules from documentation content using LLM.
         
         Args:
             content: List of dicts with 'url' and 'content' keys
+            report: Optional dict filled with call details (model, tier, latency, cached,
+                prompt size, and partial=True if the deadline cut the output short)
+            deadline: Optional deadline for the LLM call; modules completed by then are returned
             
         Returns:
             List of module dictionaries with module, description, and submodules
         """
-        prompt = self._build_prompt(content)
+        # Imported lazily (see services.clients); already loaded once a client exists
+        import openai
+        
+        prompt, prompt_stats = self.template.build(content)
+        cache_key = self._cache_key(prompt, ",".join(self.cascade_models) or self.model)
+        report = {} if report is None else report
+        report["prompt"] = prompt_stats
+        
+        partial_modules = []
+        
+        async def compute():
+            started = time.time()
+            if self.cascade_models:
+                modules = await self._complete_cascade(prompt, report, deadline)
+            else:
+                modules = await self._complete(prompt, deadline=deadline, state=report)
+                report.update(model=self.model, tier=0)
+            report["latency"] = time.time() - started
+            # Validated once here; cached and returned modules are already in canonical form
+            modules = normalize_modules(modules)
+            if report.get("partial") or report.get("finish_reason") == "length":
+                # Never cache output that was cut off by a deadline or max_tokens
+                partial_modules.extend(modules)
+                return None
+            return modules
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a Product Management AI assistant that extracts structured module information from product documentation. Always return valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                response_format={"type": "json_object"}
+            modules = await self.storage.aget_or_compute(
+                cache_key, compute, ttl=self.cache_ttl, wait_timeout=deadline.remaining() if deadline else None
             )
-            
-            # Parse response
-            response_text = response.choices[0].message.content.strip()
-            
-            # Handle both JSON object and array responses
-            try:
-                parsed = json.loads(response_text)
-                
-                # Extract array from response
-                if isinstance(parsed, dict):
-                    # Look for common keys that might contain the array
-                    for key in ['modules', 'data', 'result']:
-                        if key in parsed and isinstance(parsed[key], list):
-                            return parsed[key]
-                    # If no array found, return empty
-                    return []
-                elif isinstance(parsed, list):
-                    # Direct array response (fallback)
-                    return parsed
-                else:
-                    return []
-            except json.JSONDecodeError:
-                # Try to extract JSON from markdown code blocks
-                import re
-                json_match = re.search(r'```(?:json)?\s*(\[.*?\])\s*```', response_text, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group(1))
-                
-                # Last resort: try to find JSON array in the text
-                array_match = re.search(r'(\[.*?\])', response_text, re.DOTALL)
-                if array_match:
-                    return json.loads(array_match.group(1))
-                
-                raise ValueError("Could not parse JSON from LLM response")
-        
+            report.setdefault("cached", "latency" not in report)
+            return partial_modules if modules is None else modules
         except openai.RateLimitError as e:
             error_msg = "OpenAI API rate limit exceeded or quota exhausted. Please check your billing and usage at https://platform.openai.com/usage"
             print(f"Rate limit error: {str(e)}")
@@ -0,0 +1,212 @@
+import math
+import heapq
+import sqlite3
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic URL set. Memory does not grow with the number of
+    URLs added; membership tests may rarely report a URL that was never added.
+    """
+
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.001):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
+
+
+class MemoryFrontier:
+    """
+    In-memory best-first crawl queue: pops the highest-priority URL first
+    (FIFO among equals) and ignores URLs it has already seen.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._queued: Dict[str, Tuple[float, int]] = {}
+        self._seen: Set[str] = set()
+        self._seq = 0
+
+    def push(self, url: str, depth: int, priority: float = 0.0) -> bool:
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        self._queued[url] = (priority, depth)
+        self._seq += 1
+        heapq.heappush(self._heap, (-priority, self._seq, url))
+        return True
+
+    def update(self, url: str, priority: float):
+        """
+        Raise the priority of a URL that is still queued (a lower one is
+        ignored); stale heap entries are skipped on pop.
+        """
+        entry = self._queued.get(url)
+        if entry is None or priority <= entry[0]:
+            return
+        self._queued[url] = (priority, entry[1])
+        self._seq += 1
+        heapq.heappush(self._heap, (-priority, self._seq, url))
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        while self._heap:
+            neg_priority, _, url = heapq.heappop(self._heap)
+            entry = self._queued.get(url)
+            if entry is None or entry[0] != -neg_priority:
+                continue
+            del self._queued[url]
+            return url, entry[1]
+        return None
+
+    def mark_done(self, url: str):
+        pass
+
+    def done_count(self) -> int:
+        return 0
+
+    def finish(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+
+class SQLiteFrontier:
+    """
+    Disk-backed best-first crawl queue for very large sites. Queued URLs live in
+    SQLite and duplicates are filtered with a Bloom filter, so memory stays flat.
+    State survives a crash: reopening the same directory resumes the crawl,
+    unless the crawl was marked finished, in which case it starts over.
+    """
+
+    def __init__(self, state_dir: str, capacity: int = 1000000):
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.seen = BloomFilter(capacity)
+
+        self._conn = sqlite3.connect(str(self.state_dir / "frontier.db"), isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # rank is the negated priority so one ascending index serves pop()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, depth INTEGER NOT NULL, "
+            "rank REAL NOT NULL DEFAULT 0, state TEXT NOT NULL DEFAULT 'queued')"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS frontier_next ON frontier(state, rank, seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS frontier_url ON frontier(url)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'finished'").fetchone():
+            # A finished crawl is not resumed: a new crawl of the site starts from scratch
+            self._conn.execute("DELETE FROM frontier")
+            self._conn.execute("DELETE FROM meta")
+        # Pages in flight when a previous run died go back on the queue
+        self._conn.execute("UPDATE frontier SET state = 'queued' WHERE state = 'taken'")
+        # The table is the source of truth; rebuild the filter from it when resuming
+        for (url,) in self._conn.execute("SELECT url FROM frontier"):
+            self.seen.add(url)
+        self._queued = self._conn.execute(
+            "SELECT COUNT(*) FROM frontier WHERE state = 'queued'"
+        ).fetchone()[0]
+        # True when an interrupted crawl left state behind
+        self.resumed = len(self.seen) > 0
+
+    def push(self, url: str, depth: int, priority: float = 0.0) -> bool:
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        self._conn.execute(
+            "INSERT INTO frontier (url, depth, rank) VALUES (?, ?, ?)",
+            (url, depth, -priority)
+        )
+        self._queued += 1
+        return True
+
+    def update(self, url: str, priority: float):
+        """Raise the priority of a URL that is still queued (a lower one is ignored)."""
+        self._conn.execute(
+            "UPDATE frontier SET rank = ? WHERE url = ? AND state = 'queued' AND rank > ?",
+            (-priority, url, -priority)
+        )
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        row = self._conn.execute(
+            "SELECT seq, url, depth FROM frontier WHERE state = 'queued' "
+            "ORDER BY rank, seq LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE frontier SET state = 'taken' WHERE seq = ?", (row[0],))
+        self._queued -= 1
+        return row[1], row[2]
+
+    def mark_done(self, url: str):
+        self._conn.execute(
+            "UPDATE frontier SET state = 'done' WHERE url = ? AND state = 'taken'", (url,)
+        )
+
+    def done_count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM frontier WHERE state = 'done'").fetchone()[0]
+
+    def finish(self):
+        """Mark the crawl complete, so the next one in this directory starts fresh."""
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('finished', '1')")
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._queued
+
+
+class ContentSpool:
+    """Appends crawled page text to a file instead of holding it in memory."""
+
+    def __init__(self, path: str, resume: bool = True):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Without resume, text from an earlier crawl is discarded
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        self.total_bytes = self.path.stat().st_size
+
+    def append(self, text: str):
+        self._file.write(text)
+        self._file.flush()
+        self.total_bytes += len(text.encode('utf-8'))
+
+    @staticmethod
+    def read_from(path: Path, max_chars: int) -> str:
+        """Return the first max_chars characters of a spool file."""
+        with open(path, encoding='utf-8') as f:
+            return f.read(max_chars)
+
+    def close(self):
+        self._file.close()
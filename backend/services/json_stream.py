@@ -0,0 +1,91 @@
+import json
+from typing import Dict, List, Optional
+
+
+class ModuleStreamParser:
+    """
+    Incrementally parses a streamed LLM response and returns each module object
+    as soon as its closing brace arrives.
+
+    Accepts either {"modules": [...]} (also "data"/"result") or a bare top-level
+    array. Modules that were complete before a truncated response ends are kept.
+    """
+
+    ARRAY_KEYS = ("modules", "data", "result")
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._object_start: Optional[int] = None
+        self.modules: List[Dict] = []
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume the next chunk of text and return any newly completed modules."""
+        self.text += chunk
+        completed = []
+        text = self.text
+        while self._pos < len(text):
+            char = text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1 and self._stack[0] == '{':
+                        # Remember the latest top-level key to spot "modules": [
+                        self._last_key = text[self._string_start + 1:self._pos]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif char in '{[':
+                self._stack.append(char)
+                if self._array_depth is None and char == '[' and self._is_module_array():
+                    self._array_depth = len(self._stack)
+                elif (
+                    char == '{'
+                    and self._array_depth is not None
+                    and len(self._stack) == self._array_depth + 1
+                ):
+                    self._object_start = self._pos
+            elif char in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if (
+                    char == '}'
+                    and self._object_start is not None
+                    and len(self._stack) == self._array_depth
+                ):
+                    module = self._decode(text[self._object_start:self._pos + 1])
+                    self._object_start = None
+                    if module is not None:
+                        self.modules.append(module)
+                        completed.append(module)
+                elif char == ']' and self._array_depth is not None and len(self._stack) < self._array_depth:
+                    self._array_depth = -1  # Array closed; ignore anything after it
+            self._pos += 1
+        return completed
+
+    def _is_module_array(self) -> bool:
+        if len(self._stack) == 1:
+            return True  # Bare top-level array
+        return (
+            len(self._stack) == 2
+            and self._stack[0] == '{'
+            and self._last_key in self.ARRAY_KEYS
+        )
+
+    @staticmethod
+    def _decode(raw: str) -> Optional[Dict]:
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        return value if isinstance(value, dict) else None
@@ -0,0 +1,109 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from services.crawl_profile import path_prefix
+
+
+# Anchor words that usually lead to product/feature documentation
+POSITIVE_ANCHOR_WORDS = {
+    "feature", "features", "overview", "guide", "guides", "module", "modules",
+    "product", "products", "reference", "concepts", "manage", "management",
+    "settings", "configure", "configuration", "integrations", "integration",
+    "admin", "administration", "workflow", "workflows", "reports", "reporting",
+    "analytics", "dashboard", "dashboards", "users", "permissions", "security",
+    "billing", "automation", "api", "how", "using", "use", "setup",
+}
+
+# Anchors that rarely describe product modules
+NEGATIVE_ANCHOR_PATTERNS = [
+    r"\b(log ?in|sign ?in|sign ?up|register|pricing|contact|careers|jobs|blog|press|status)\b",
+    r"\b(release notes|changelog|what'?s new|roadmap|legal|privacy|terms|cookie)\b",
+    r"\b(previous|next|back to top|edit (this page|on github)|print|share)\b",
+    r"^(english|deutsch|español|français|italiano|português|日本語|한국어|中文|русский)$",
+    r"^v?\d+(\.\d+)*( \(latest\))?$",
+    r"^(latest|stable|nightly|dev|beta)$",
+]
+
+# Path segments that usually hold low-value or duplicate pages
+NEGATIVE_PATH_PATTERNS = [
+    r"/(blog|news|press|careers|jobs|legal|privacy|terms|changelog|release-notes|releases)(/|$)",
+    r"/(tag|tags|category|author|search|archive)(/|$)",
+    r"/page/\d+",
+]
+
+
+class LinkScorer:
+    """
+    Scores candidate links for a best-first crawl. Higher is better.
+
+    Signals: anchor text keywords, URL path structure relative to the start
+    page, crawl depth, how many crawled pages link to the URL, and how often the
+    same anchor text was already seen (repeated nav entries score lower).
+    `path_bias` adds a learned score per path prefix (see CrawlProfiles).
+
+    In-link and anchor counts are kept for at most `max_tracked` URLs and
+    anchors each; beyond that only the most frequent half is kept, so memory
+    stays flat on large-site crawls.
+    """
+
+    def __init__(self, start_url: str, path_bias: Optional[Dict[str, float]] = None, max_tracked: int = 20000):
+        self.path_bias = path_bias or {}
+        self.max_tracked = max_tracked
+        parsed = urlparse(start_url)
+        self.start_path = parsed.path.rstrip('/')
+        self.inlinks: Counter = Counter()
+        self.anchor_counts: Counter = Counter()
+        self._negative_anchor = re.compile("|".join(NEGATIVE_ANCHOR_PATTERNS), re.IGNORECASE)
+        self._negative_path = re.compile("|".join(NEGATIVE_PATH_PATTERNS), re.IGNORECASE)
+
+    def record_link(self, url: str, anchor: str):
+        """Count a link seen on a crawled page (in-links and anchor repetition)."""
+        self.inlinks[url] += 1
+        self.anchor_counts[anchor.strip().lower()] += 1
+        for counts in (self.inlinks, self.anchor_counts):
+            if len(counts) > self.max_tracked:
+                _prune(counts, self.max_tracked // 2)
+
+    def score(self, url: str, anchor: str, depth: int) -> float:
+        anchor = anchor.strip().lower()
+        parsed = urlparse(url)
+        path = parsed.path.rstrip('/')
+        score = 0.0
+
+        # Anchor text
+        words = set(re.findall(r"[a-z]+", anchor))
+        score += 1.5 * min(len(words & POSITIVE_ANCHOR_WORDS), 2)
+        if self._negative_anchor.search(anchor):
+            score -= 4.0
+        if not anchor:
+            score -= 1.0
+        # The same anchor on every page is navigation chrome
+        score -= 0.5 * math.log1p(max(self.anchor_counts[anchor] - 1, 0))
+
+        # URL structure
+        if self.start_path and (path == self.start_path or path.startswith(self.start_path + '/')):
+            score += 2.0
+        if self._negative_path.search(path):
+            score -= 3.0
+        if parsed.query:
+            score -= 1.0
+        segments = [seg for seg in path.split('/') if seg]
+        score -= 0.3 * max(len(segments) - 3, 0)
+        if self.path_bias:
+            # What pages under this prefix yielded in earlier crawls of the domain
+            score += self.path_bias.get(path_prefix(url), 0.0)
+
+        # Depth and popularity among crawled pages
+        score -= 1.0 * depth
+        score += 1.0 * math.log1p(self.inlinks[url])
+        return score
+
+
+def _prune(counts: Counter, keep: int):
+    """Keep the `keep` most frequent entries; rarely seen links and anchors barely move a score."""
+    kept = counts.most_common(keep)
+    counts.clear()
+    counts.update(dict(kept))
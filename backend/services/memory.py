@@ -0,0 +1,289 @@
+import os
+import re
+import time
+import threading
+import tracemalloc
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+
+# Stage boundaries instrumented in the crawler and extractor, in pipeline order
+STAGES = ("fetch", "parse", "clean", "prompt", "llm")
+
+_BACKEND_DIR = str(Path(__file__).parent.parent)
+_STDLIB = re.compile(r"/lib/python\d+\.\d+/(.+)$")
+_NULL = nullcontext()
+_current: ContextVar[Optional["RequestMemory"]] = ContextVar("memory_request", default=None)
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size of this process, where /proc is available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _short(filename: str) -> str:
+    """Backend-relative path for our code, package-relative for libraries."""
+    if filename.startswith(_BACKEND_DIR):
+        return filename[len(_BACKEND_DIR):].lstrip("/")
+    for marker in ("site-packages/", "dist-packages/"):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    stdlib = _STDLIB.search(filename)
+    return stdlib.group(1) if stdlib else filename
+
+
+def _new_stage() -> Dict:
+    # net: bytes still allocated when the stage ended; peak: highest growth while it ran;
+    # unmeasured: calls that overlapped a sample, so their bytes are not counted
+    return {"calls": 0, "net_bytes": 0, "peak_bytes": 0, "unmeasured": 0, "seconds": 0.0}
+
+
+class RequestMemory:
+    """Memory used by one request: per-stage tracemalloc growth and RSS at its boundaries."""
+
+    def __init__(self, request_id: str, label: str):
+        self.request_id = request_id
+        self.label = label
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.rss_start = rss_bytes()
+        self.rss_peak = self.rss_start
+        self.rss_end: Optional[int] = None
+        self.stages: Dict[str, Dict] = {}
+
+    def record(self, stage: str, net: int, peak: int, seconds: float, measured: bool = True):
+        stats = self.stages.setdefault(stage, _new_stage())
+        stats["calls"] += 1
+        stats["unmeasured"] += not measured
+        stats["net_bytes"] += net
+        stats["peak_bytes"] = max(stats["peak_bytes"], peak)
+        stats["seconds"] += seconds
+        rss = rss_bytes()
+        if rss is not None and (self.rss_peak is None or rss > self.rss_peak):
+            self.rss_peak = rss
+
+    def finish(self):
+        self.finished = time.time()
+        self.rss_end = rss_bytes()
+        if self.rss_end is not None and (self.rss_peak is None or self.rss_end > self.rss_peak):
+            self.rss_peak = self.rss_end
+
+    def summary(self) -> Dict:
+        return {
+            "request_id": self.request_id,
+            "label": self.label,
+            "seconds": round((self.finished or time.time()) - self.started, 3),
+            "running": self.finished is None,
+            "rss": {"start": self.rss_start, "peak": self.rss_peak, "end": self.rss_end},
+            "stages": {
+                name: {**stats, "seconds": round(stats["seconds"], 3)}
+                for name, stats in sorted(self.stages.items(), key=lambda item: _stage_order(item[0]))
+            },
+        }
+
+
+def _stage_order(name: str) -> int:
+    return STAGES.index(name) if name in STAGES else len(STAGES)
+
+
+class MemoryProfiler:
+    """
+    Opt-in memory instrumentation based on tracemalloc.
+
+    Code marks stage boundaries with `with profiler.stage("parse"):`. Each
+    stage records how much traced memory grew by its end (net) and at most
+    while it ran (peak). Totals are kept per stage and per request (see
+    request()), and the current RSS is sampled at every boundary.
+
+    Every `snapshot_every`-th call of a stage is sampled for allocation
+    sites. Diffing two snapshots of the whole heap takes seconds once the
+    process has warmed up. So a sampled stage clears tracemalloc's traces
+    when it starts, and its closing snapshot holds only what was allocated
+    since then. Those traces are grouped by allocation site, each with the
+    nearest backend frame that led to it, in a background thread rather
+    than on the event loop. A stage that overlaps a sample loses its
+    baseline, so only its call and time are counted.
+
+    tracemalloc is process-wide, so with concurrent requests one stage's
+    numbers can include allocations made meanwhile by others. Its peak is then
+    the highest traced memory since the first of the overlapping stages began,
+    which may predate it. Treat both as an upper bound. Disabled, stage() is a
+    shared no-op context manager.
+    """
+
+    def __init__(self, enabled: bool = False, frames: int = 10, snapshot_every: int = 25,
+                 top: int = 10, history: int = 50):
+        self.enabled = enabled
+        self.snapshot_every = max(1, snapshot_every)
+        self.top = top
+        self.stages: Dict[str, Dict] = {}
+        self.sites: Dict[str, Counter] = {}
+        self.samples: Dict[str, int] = {}
+        self.active: Dict[str, RequestMemory] = {}
+        self.recent: deque = deque(maxlen=history)
+        self._lock = threading.Lock()
+        # Bumped whenever a sample clears the traces
+        self._generation = 0
+        # Stages currently running, in any request
+        self._open = 0
+        self._sampler = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-sampler")
+        self._filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ]
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stage(self, name: str):
+        """Context manager measuring one stage of the current request (a no-op when disabled)."""
+        return self._measure(name) if self.enabled else _NULL
+
+    @contextmanager
+    def _measure(self, name: str) -> Iterator[None]:
+        with self._lock:
+            stats = self.stages.setdefault(name, _new_stage())
+            sample = stats["calls"] % self.snapshot_every == 0
+            stats["calls"] += 1
+            if sample:
+                self._generation += 1
+                tracemalloc.clear_traces()
+            generation = self._generation
+            # The peak is process-wide: resetting it while another stage runs would cut
+            # that stage's peak short, so only the first of overlapping stages resets it
+            if not self._open:
+                tracemalloc.reset_peak()
+            self._open += 1
+            start, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            current, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                self._open -= 1
+                # Another stage's sample cleared the traces under this one
+                measured = generation == self._generation
+                net, peak = (max(0, current - start), max(0, peak - start)) if measured else (0, 0)
+                stats["net_bytes"] += net
+                stats["peak_bytes"] = max(stats["peak_bytes"], peak)
+                stats["seconds"] += seconds
+                stats["unmeasured"] += not measured
+            request = _current.get()
+            if request is not None:
+                request.record(name, net, peak, seconds, measured)
+            if sample and measured:
+                # Snapshot and grouping take a while; never on the event loop, one at a time
+                self._sampler.submit(self._record_sites, name, generation)
+
+    def _record_sites(self, name: str, generation: int):
+        with self._lock:
+            if generation != self._generation:
+                # Another sample cleared the traces since this stage ended
+                return
+            # The traces were cleared when the stage started: everything left was allocated
+            # during it (or in the moment since it ended)
+            snapshot = tracemalloc.take_snapshot()
+        snapshot = snapshot.filter_traces(self._filters)
+        grown: Counter = Counter()
+        for stat in snapshot.statistics("traceback"):
+            frames = list(stat.traceback)
+            site = frames[-1]
+            # The most recent frame in our own code explains why a library allocated
+            via = next((frame for frame in reversed(frames) if frame.filename.startswith(_BACKEND_DIR)), None)
+            key = f"{_short(site.filename)}:{site.lineno}"
+            if via is not None and via is not site:
+                key += f" via {_short(via.filename)}:{via.lineno}"
+            grown[key] += stat.size
+        with self._lock:
+            self.samples[name] = self.samples.get(name, 0) + 1
+            sites = self.sites.setdefault(name, Counter())
+            # Largest retained size seen in any sampled call, per site
+            for key, size in grown.most_common(self.top * 3):
+                sites[key] = max(sites[key], size)
+
+    @contextmanager
+    def request(self, request_id: str, label: str = "") -> Iterator[Optional[RequestMemory]]:
+        """Attribute the stages run inside the block (in this task) to one request."""
+        if not self.enabled:
+            yield None
+            return
+        record = RequestMemory(request_id, label)
+        token = _current.set(record)
+        with self._lock:
+            self.active[request_id] = record
+        try:
+            yield record
+        finally:
+            record.finish()
+            try:
+                _current.reset(token)
+            except ValueError:
+                # Closed from another context, e.g. a streaming response the client abandoned
+                pass
+            with self._lock:
+                self.active.pop(request_id, None)
+                self.recent.append(record)
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.sites.clear()
+            self.samples.clear()
+            self.recent.clear()
+
+    def summary(self, top: Optional[int] = None) -> Dict:
+        top = top or self.top
+        with self._lock:
+            stages = {
+                name: {
+                    **stats,
+                    "seconds": round(stats["seconds"], 3),
+                    "samples": self.samples.get(name, 0),
+                    "top_sites": [
+                        {"site": site, "bytes": size}
+                        for site, size in self.sites.get(name, Counter()).most_common(top)
+                    ],
+                }
+                for name, stats in sorted(self.stages.items(), key=lambda item: _stage_order(item[0]))
+            }
+            active = [record.summary() for record in self.active.values()]
+            recent = [record.summary() for record in reversed(self.recent)]
+        return {
+            "enabled": self.enabled,
+            "rss": rss_bytes(),
+            "snapshot_every": self.snapshot_every,
+            "stages": stages,
+            "active_requests": active,
+            "recent_requests": recent,
+        }
+
+
+_profiler: Optional[MemoryProfiler] = None
+
+
+def get_memory_profiler() -> MemoryProfiler:
+    """
+    Return the process-wide memory profiler configured from the environment:
+    MEMORY_PROFILING (off by default; tracing slows allocation-heavy code),
+    MEMORY_TRACE_FRAMES and MEMORY_SNAPSHOT_EVERY.
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = MemoryProfiler(
+            enabled=os.getenv("MEMORY_PROFILING", "false").lower() in ("1", "true", "yes"),
+            frames=int(os.getenv("MEMORY_TRACE_FRAMES", "10")),
+            snapshot_every=int(os.getenv("MEMORY_SNAPSHOT_EVERY", "25"))
+        )
+    return _profiler
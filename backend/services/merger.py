@@ -0,0 +1,166 @@
+import re
+import unicodedata
+from functools import lru_cache
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+
+STOPWORDS = {"the", "a", "an", "and", "of", "for", "to", "with", "in", "on"}
+
+
+def normalize_text(text: str) -> str:
+    """Case-, accent- and punctuation-insensitive form of a module name or any text."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    text = text.lower().replace("&", " and ")
+    words = re.findall(r"[a-z0-9]+", text)
+    # Light singularisation so "Reports" and "Report" collide
+    words = [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words]
+    return " ".join(w for w in words if w not in STOPWORDS)
+
+
+# Names repeat across URLs and submodules, so cache them (but not free text)
+normalize_name = lru_cache(maxsize=65536)(normalize_text)
+
+
+def _bigrams(key: str) -> Set[str]:
+    padded = f" {key} "
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+class NameIndex:
+    """
+    Maps names to group ids by exact normalized match, falling back to fuzzy
+    similarity (character-bigram Dice, or token overlap) among groups that share
+    a token. Token blocking and precomputed bigram sets keep lookups cheap even
+    with thousands of names.
+    """
+
+    def __init__(self, threshold: float = 0.85, max_candidates: int = 16):
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self._exact: Dict[str, int] = {}
+        self._tokens: Dict[str, Set[int]] = {}
+        self._keys: List[str] = []
+        self._token_sets: List[Set[str]] = []
+        self._bigram_sets: List[Set[str]] = []
+
+    def find(self, name: str, key: Optional[str] = None) -> Optional[int]:
+        key = normalize_name(name) if key is None else key
+        if key in self._exact:
+            return self._exact[key]
+        if not key:
+            return None
+
+        # Candidates are the groups sharing the most tokens with this name
+        key_tokens = set(key.split())
+        shared = Counter()
+        for token in key_tokens:
+            shared.update(self._tokens.get(token, ()))
+        if not shared:
+            return None
+
+        key_bigrams = _bigrams(key)
+        key_size = len(key_bigrams)
+        best_id, best_score = None, self.threshold
+        for group_id, _ in shared.most_common(self.max_candidates):
+            other_bigrams = self._bigram_sets[group_id]
+            other_size = len(other_bigrams)
+            # Dice can never reach the threshold if the lengths are too far apart
+            if 2 * min(key_size, other_size) / (key_size + other_size) < best_score:
+                other_tokens = self._token_sets[group_id]
+                score = len(key_tokens & other_tokens) / len(key_tokens | other_tokens)
+            else:
+                score = 2 * len(key_bigrams & other_bigrams) / (key_size + other_size)
+            if score >= best_score:
+                best_id, best_score = group_id, score
+        if best_id is not None:
+            self._exact[key] = best_id
+        return best_id
+
+    def add(self, name: str, key: Optional[str] = None) -> int:
+        key = normalize_name(name) if key is None else key
+        group_id = len(self._keys)
+        self._keys.append(key)
+        self._token_sets.append(set(key.split()))
+        self._bigram_sets.append(_bigrams(key))
+        self._exact[key] = group_id
+        for token in key.split():
+            self._tokens.setdefault(token, set()).add(group_id)
+        return group_id
+
+    def find_or_add(self, name: str) -> int:
+        key = normalize_name(name)
+        group_id = self.find(name, key)
+        return self.add(name, key) if group_id is None else group_id
+
+
+class ModuleMerger:
+    """
+    Deterministically merges per-URL module lists into one module tree,
+    keeping which URLs contributed each module and submodule.
+    """
+
+    def __init__(self, threshold: float = 0.85):
+        self.threshold = threshold
+
+    def merge(self, modules_by_url: List[Dict]) -> List[Dict]:
+        """
+        Args:
+            modules_by_url: [{"url": ..., "modules": [...]}, ...] as returned by /extract
+
+        Returns:
+            Merged modules with "sources", "aliases" and per-submodule "submodule_sources"
+        """
+        module_index = NameIndex(self.threshold)
+        merged: List[Dict] = []
+        submodule_indexes: List[NameIndex] = []
+        submodule_names: List[List[str]] = []
+
+        for entry in modules_by_url:
+            url = entry.get('url')
+            for module in entry.get('modules', []):
+                name = (module.get('module') or '').strip()
+                if not name:
+                    continue
+                group_id = module_index.find_or_add(name)
+                if group_id == len(merged):
+                    merged.append({
+                        "module": name,
+                        "description": "",
+                        "sources": [],
+                        "aliases": [],
+                        "submodules": {},
+                        "submodule_sources": {},
+                    })
+                    submodule_indexes.append(NameIndex(self.threshold))
+                    submodule_names.append([])
+                target = merged[group_id]
+
+                if name != target["module"] and name not in target["aliases"]:
+                    target["aliases"].append(name)
+                if url and url not in target["sources"]:
+                    target["sources"].append(url)
+                description = module.get('description') or ''
+                # Keep the most detailed description seen
+                if len(description) > len(target["description"]):
+                    target["description"] = description
+
+                sub_index = submodule_indexes[group_id]
+                sub_names = submodule_names[group_id]
+                for sub_name, sub_desc in (module.get('submodules') or {}).items():
+                    sub_name = sub_name.strip()
+                    if not sub_name:
+                        continue
+                    sub_id = sub_index.find_or_add(sub_name)
+                    if sub_id == len(sub_names):
+                        sub_names.append(sub_name)
+                        target["submodules"][sub_name] = ""
+                        target["submodule_sources"][sub_name] = []
+                    canonical = sub_names[sub_id]
+                    sub_desc = sub_desc if isinstance(sub_desc, str) else ""
+                    if len(sub_desc) > len(target["submodules"][canonical]):
+                        target["submodules"][canonical] = sub_desc
+                    if url and url not in target["submodule_sources"][canonical]:
+                        target["submodule_sources"][canonical].append(url)
+
+        return merged
@@ -0,0 +1,192 @@
+import os
+import time
+import asyncio
+from contextlib import nullcontext
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from services.deadline import Deadline
+from services.merger import ModuleMerger
+
+
+def fold_modules(modules: List[Dict], additions: List[Dict]) -> List[Dict]:
+    """
+    Fold modules extracted from later pages into the tree so far: a module
+    that matches an existing one by name (fuzzily, as in ModuleMerger) adds
+    its submodules to it, and new modules are appended.
+    """
+    merged = ModuleMerger().merge([{"modules": modules}, {"modules": additions}])
+    return [
+        {"module": module["module"], "description": module["description"], "submodules": module["submodules"]}
+        for module in merged
+    ]
+
+
+class ProgressiveExtraction:
+    """
+    Extracts one URL's modules while it is still being crawled, instead of
+    leaving the LLM idle until the crawl ends.
+
+    Once the crawl has collected `first_pages` pages (the start page and its
+    best links come first), they are extracted while crawling continues.
+    Pages collected after that are folded in by refinement calls
+    (ModuleExtractor.refine_modules). Each call sends only the new pages and
+    the module and submodule names known so far. A refinement runs as soon as
+    the previous call is done and `refine_chars` of new text are waiting; a
+    last one takes whatever the crawl collected after that. If the crawl
+    finishes before the first batch is ready, or the first call fails, its
+    content gets one ordinary extraction.
+
+    run() yields the module tree after every call, so callers can show a
+    preliminary tree early; the last update has final=True.
+    """
+
+    def __init__(
+        self,
+        crawler,
+        extractor,
+        first_pages: Optional[int] = None,
+        refine_chars: Optional[int] = None,
+        llm_slot: Optional[Callable[[int], object]] = None
+    ):
+        self.crawler = crawler
+        self.extractor = extractor
+        self.first_pages = first_pages or int(os.getenv("PROGRESSIVE_FIRST_PAGES", "4"))
+        self.refine_chars = refine_chars if refine_chars is not None else int(
+            os.getenv("PROGRESSIVE_REFINE_CHARS", "8000")
+        )
+        # Async context manager factory taking the call's token estimate, e.g. a scheduler slot
+        self.llm_slot = llm_slot or (lambda cost: nullcontext())
+        # Set by run(): the crawl's content, the folded modules and one report per LLM call
+        self.content = ""
+        self.modules: List[Dict] = []
+        self.reports: List[Dict] = []
+        self.partial = False
+
+    def _new_pages(self, used: int) -> List[str]:
+        return self.crawler.collected_pages()[used:]
+
+    async def _wait(self, crawl: asyncio.Future, ready: Callable[[], bool]):
+        """Wait until `ready()` or the crawl is over, waking on every collected page."""
+        while not crawl.done() and not ready():
+            self.crawler.page_added.clear()
+            waiter = asyncio.ensure_future(self.crawler.page_added.wait())
+            try:
+                await asyncio.wait({crawl, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+
+    async def _call(self, call: Callable[[Dict], Awaitable[List[Dict]]], tokens: int, pages: int) -> List[Dict]:
+        report = {"pages": pages}
+        self.reports.append(report)
+        async with self.llm_slot(tokens):
+            modules = await call(report)
+        if report.get("partial"):
+            self.partial = True
+        return modules
+
+    async def run(self, url: str, crawl: Awaitable[str], deadline: Optional[Deadline] = None) -> AsyncIterator[Dict]:
+        """
+        Run the crawl coroutine `crawl` for `url` and extract alongside it.
+
+        Yields:
+            {"modules": tree so far, "pages": pages extracted, "calls": LLM calls,
+             "elapsed": seconds, "final": True on the last update}
+        """
+        started = time.time()
+        extractor = self.extractor
+        task = asyncio.ensure_future(crawl)
+        used = 0
+        try:
+            await self._wait(task, lambda: len(self.crawler.collected_pages()) >= self.first_pages)
+            if task.done():
+                # Small site or too slow to get going: one ordinary extraction of the whole crawl
+                yield await self._extract_all(url, task, started, deadline)
+                return
+
+            pages = self._new_pages(0)
+            used = len(pages)
+            item = {"url": url, "content": "\n".join(pages)}
+            print(f"Progressive extraction of {url}: first {used} page(s) while the crawl continues")
+            try:
+                self.modules = await self._call(
+                    lambda report: extractor.extract_modules([item], report=report, deadline=deadline),
+                    extractor.estimate_tokens([item]), used
+                )
+            except Exception as e:
+                # Nothing to refine yet: let the crawl finish and extract it in one call instead
+                print(f"Early extraction of {url} failed: {str(e)}; extracting once the crawl is done")
+                self.reports[-1]["error"] = str(e)
+                yield await self._extract_all(url, task, started, deadline)
+                return
+            yield self._update(started, used, final=False)
+
+            while True:
+                if not task.done():
+                    await self._wait(task, lambda: sum(map(len, self._new_pages(used))) >= self.refine_chars)
+                crawl_done = task.done()
+                if crawl_done:
+                    self.content = await task
+                pages = self._new_pages(used)
+                if pages and (self.partial or (deadline is not None and deadline.expired())):
+                    # Out of time for more calls: the tree misses the remaining pages
+                    self.partial = True
+                    self.content = self.content or self.crawler.collected_content()
+                    yield self._update(started, used, final=True)
+                    return
+                if pages:
+                    known, text = self.modules, "\n".join(pages)
+                    try:
+                        additions = await self._call(
+                            lambda report: extractor.refine_modules(url, known, text, report=report, deadline=deadline),
+                            len(text) // 4 + extractor.max_tokens, used + len(pages)
+                        )
+                    except Exception as e:
+                        print(f"Refinement of {url} failed: {str(e)}")
+                        self.reports[-1]["error"] = str(e)
+                        if crawl_done:
+                            self.partial = True
+                            yield self._update(started, used, final=True)
+                            return
+                        # Keep the tree so far and retry these pages once the crawl is done
+                        await asyncio.wait({task})
+                        continue
+                    self.modules = fold_modules(self.modules, additions)
+                    used += len(pages)
+                if crawl_done:
+                    yield self._update(started, used, final=True)
+                    return
+                yield self._update(started, used, final=False)
+        finally:
+            if not task.done():
+                task.cancel()
+
+    async def _extract_all(self, url: str, crawl: asyncio.Future, started: float, deadline: Optional[Deadline]) -> Dict:
+        """Wait for the crawl, extract its whole content in one call and return the final update."""
+        extractor = self.extractor
+        self.content = await crawl
+        pages = len(self.crawler.collected_pages())
+        if self.content:
+            item = {"url": url, "content": self.content}
+            self.modules = await self._call(
+                lambda report: extractor.extract_modules([item], report=report, deadline=deadline),
+                extractor.estimate_tokens([item]), pages
+            )
+        return self._update(started, pages, final=True)
+
+    def _update(self, started: float, pages: int, final: bool) -> Dict:
+        return {
+            "modules": self.modules,
+            "pages": pages,
+            "calls": len(self.reports),
+            "elapsed": round(time.time() - started, 2),
+            "final": final,
+        }
+
+    def summary(self) -> Dict:
+        """Per-call accounting for the response's prompt stats."""
+        return {
+            "calls": len(self.reports),
+            "pages": [report.get("pages") for report in self.reports],
+            "prompt_tokens": sum(report.get("prompt", {}).get("approx_tokens", 0) for report in self.reports),
+            "cached": sum(1 for report in self.reports if report.get("cached")),
+        }
@@ -0,0 +1,245 @@
+from typing import Dict, List, Tuple
+
+from services.memory import get_memory_profiler
+
+
+SYSTEM_PROMPT = (
+    "You are a Product Management AI assistant that extracts structured module "
+    "information from product documentation. Always return valid JSON."
+)
+
+# Static instructions. Kept byte-identical across requests so the provider can
+# reuse its cached prefix; anything request-specific goes after it.
+EXTRACTION_INSTRUCTIONS = """You are a Product Management AI assistant. Analyze the product documentation provided at the end of this message and extract the product modules and submodules.
+
+Your task is to:
+1. Analyze ALL the documentation sources provided - DO NOT skip any source
+2. Extract modules from EACH source - make sure you've reviewed content from every source
+3. Identify distinct product modules (high-level feature areas) across ALL sources
+4. For each module, identify submodules (specific features or capabilities) from ALL sources
+5. Combine and merge related modules/submodules from different sources into unified entries
+6. If a module appears in multiple sources, merge them and include submodules from all sources
+7. Provide clear, concise descriptions suitable for Product Managers
+8. Base your analysis strictly on the provided documentation - do not hallucinate features
+
+Return a JSON object with a "modules" key containing an array with the following structure:
+{
+  "modules": [
+    {
+      "module": "Module Name",
+      "description": "High-level description of the module from a product perspective",
+      "submodules": {
+        "Submodule Name": "Concise description of the submodule functionality"
+      }
+    }
+  ]
+}
+
+Guidelines:
+- Analyze and extract modules from ALL documentation sources provided
+- If the same module appears in multiple sources, merge them into one entry
+- Modules should represent major functional areas of the product
+- Submodules should be specific features or capabilities within each module
+- Descriptions should be clear, professional, and PM-friendly
+- Only include modules/submodules that are clearly mentioned or implied in the documentation
+- Group related features logically across all sources
+- Use consistent naming conventions
+- If no clear modules can be identified, return {"modules": []}
+
+Return ONLY valid JSON, no additional text or explanation.
+"""
+
+# Several small sources in one call; results come back per source so they can be split by URL
+BATCH_INSTRUCTIONS = """You are a Product Management AI assistant. The documentation at the end of this message comes from several SEPARATE products or sites, numbered SOURCE 1, SOURCE 2 and so on. Extract the product modules and submodules of EACH source independently.
+
+Your task is to:
+1. Analyze every numbered source - DO NOT skip any source
+2. Treat each source on its own: never merge modules across sources or move features from one source to another
+3. Identify distinct product modules (high-level feature areas) in each source
+4. For each module, identify submodules (specific features or capabilities)
+5. Provide clear, concise descriptions suitable for Product Managers
+6. Base your analysis strictly on the provided documentation - do not hallucinate features
+
+Return a JSON object with a "sources" key containing one entry per source, in order, with the following structure:
+{
+  "sources": [
+    {
+      "source": 1,
+      "modules": [
+        {
+          "module": "Module Name",
+          "description": "High-level description of the module from a product perspective",
+          "submodules": {
+            "Submodule Name": "Concise description of the submodule functionality"
+          }
+        }
+      ]
+    }
+  ]
+}
+
+Guidelines:
+- Include an entry for every source number, even if it has no clear modules ("modules": [])
+- Modules should represent major functional areas of the product
+- Submodules should be specific features or capabilities within each module
+- Descriptions should be clear, professional, and PM-friendly
+- Only include modules/submodules that are clearly mentioned or implied in that source's documentation
+- Use consistent naming conventions
+
+Return ONLY valid JSON, no additional text or explanation.
+"""
+
+
+# Progressive extraction: later pages of a site, folded into modules already extracted from its first pages
+REFINE_INSTRUCTIONS = """You are a Product Management AI assistant. Product modules have already been extracted from the first pages of a documentation site; their names are listed under KNOWN MODULES below. The documentation at the end of this message comes from further pages of the same site. Extract the modules and submodules that these new pages document.
+
+Your task is to:
+1. Analyze ALL the new documentation provided
+2. When the new pages describe a known module or submodule, use exactly its known name
+3. Include a known module only if the new pages document it, with the submodules they add or describe
+4. Add modules and submodules that are not known yet
+5. Provide clear, concise descriptions suitable for Product Managers
+6. Base your analysis strictly on the new documentation - do not repeat known modules it does not mention, and do not hallucinate features
+
+Return a JSON object with a "modules" key containing an array with the following structure:
+{
+  "modules": [
+    {
+      "module": "Module Name",
+      "description": "High-level description of the module from a product perspective",
+      "submodules": {
+        "Submodule Name": "Concise description of the submodule functionality"
+      }
+    }
+  ]
+}
+
+Guidelines:
+- Modules should represent major functional areas of the product
+- Submodules should be specific features or capabilities within each module
+- Descriptions should be clear, professional, and PM-friendly
+- If the new pages add nothing to the module tree, return {"modules": []}
+
+Return ONLY valid JSON, no additional text or explanation.
+"""
+
+class PromptTemplate:
+    """
+    Versioned extraction prompt: a static instruction prefix followed by the
+    variable source list and documentation, built in a single pass.
+    """
+
+    version = "2"
+    truncation_marker = "\n\n[Content truncated to fit token limits...]"
+
+    def __init__(self, max_content_chars: int = 60000):
+        self.max_content_chars = max_content_chars
+        self.system = SYSTEM_PROMPT
+        self.prefix = EXTRACTION_INSTRUCTIONS
+        self.memory = get_memory_profiler()
+
+    def build(self, content: List[Dict[str, str]], batch: bool = False) -> Tuple[str, Dict]:
+        """
+        Build the user prompt for the given sources. With `batch`, the sources
+        are unrelated sites and the model is asked for modules per source
+        (see BATCH_INSTRUCTIONS) instead of one combined list.
+
+        Returns:
+            The prompt text and its size accounting (version, prefix/content/total
+            characters, approximate tokens, whether content was truncated)
+        """
+        with self.memory.stage("prompt"):
+            return self._build(content, batch)
+
+    def _build(self, content: List[Dict[str, str]], batch: bool) -> Tuple[str, Dict]:
+        num_urls = len(content)
+        prefix = BATCH_INSTRUCTIONS if batch else self.prefix
+        parts = [
+            prefix,
+            f"\nDocumentation Content from {num_urls} source{'s' if num_urls > 1 else ''}: "
+            + ", ".join(item['url'] for item in content)
+            + "\n",
+        ]
+
+        budget = self.max_content_chars
+        truncated = False
+        for idx, item in enumerate(content, 1):
+            section = (
+                f"\n{'=' * 80}\n"
+                f"SOURCE {idx} of {num_urls}: {item['url']}\n"
+                f"{'=' * 80}\n"
+                f"{item['content']}\n"
+            )
+            if len(section) > budget:
+                parts.append(section[:budget])
+                budget = 0
+                truncated = True
+                break
+            parts.append(section)
+            budget -= len(section)
+
+        if truncated:
+            parts.append(self.truncation_marker)
+        prompt = "".join(parts)
+
+        stats = {
+            "version": self.version,
+            "prefix_chars": len(self.system) + len(prefix),
+            "content_chars": self.max_content_chars - budget,
+            "prompt_chars": len(self.system) + len(prompt),
+            # Rough estimate; good enough for budgeting and dashboards
+            "approx_tokens": (len(self.system) + len(prompt)) // 4,
+            "truncated": truncated,
+        }
+        return prompt, stats
+
+    def build_refinement(self, url: str, known: List[Dict], content: str) -> Tuple[str, Dict]:
+        """
+        Build the prompt for pages crawled after `known` was extracted from the
+        same site (see REFINE_INSTRUCTIONS). Known modules are listed as their
+        name and submodule names, without descriptions, so the prompt grows
+        mostly with the new pages rather than the tree.
+
+        Returns:
+            The prompt text and its size accounting, as build() plus refine=True
+        """
+        with self.memory.stage("prompt"):
+            known_lines = [
+                f"- {module['module']}" + (
+                    f": {', '.join(module['submodules'])}" if module.get("submodules") else ""
+                )
+                for module in known
+            ]
+            parts = [
+                REFINE_INSTRUCTIONS,
+                f"\nKNOWN MODULES ({len(known)}, extracted from earlier pages of {url}):\n",
+                "\n".join(known_lines) or "(none)",
+                "\n",
+            ]
+            section = (
+                f"\n{'=' * 80}\n"
+                f"NEW PAGES from {url}\n"
+                f"{'=' * 80}\n"
+                f"{content}\n"
+            )
+            truncated = len(section) > self.max_content_chars
+            parts.append(section[:self.max_content_chars])
+            if truncated:
+                parts.append(self.truncation_marker)
+            prompt = "".join(parts)
+
+            return prompt, {
+                "version": self.version,
+                "prefix_chars": len(self.system) + len(REFINE_INSTRUCTIONS),
+                "content_chars": min(len(section), self.max_content_chars),
+                "prompt_chars": len(self.system) + len(prompt),
+                "approx_tokens": (len(self.system) + len(prompt)) // 4,
+                "truncated": truncated,
+                "refine": True,
+            }
+
+    def messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": prompt},
+        ]
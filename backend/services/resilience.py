@@ -0,0 +1,318 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """A host or endpoint is failing; the call was rejected without being made."""
+
+
+def counts_as_failure(error: BaseException) -> bool:
+    """
+    Whether an error says something about the health of the remote side.
+    Timeouts, connection errors, 5xx and 429 do; other 4xx (a missing page,
+    a bad request) mean the server answered fine.
+    """
+    status = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500 or status == 429
+    return True
+
+
+class CircuitBreaker:
+    """
+    Tracks recent outcomes for one host or endpoint. When at least
+    `min_requests` calls in the last `window` seconds failed at a rate of
+    `failure_rate` or more, the circuit opens and calls fail fast. After
+    `cooldown` seconds one probe call is let through (half-open): success
+    closes the circuit, failure opens it for another cooldown.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_requests: int = 5,
+        window: float = 60,
+        cooldown: float = 30
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_started: Optional[float] = None
+        self.rejected = 0
+        self._outcomes: deque = deque()
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def _transition(self, state: str, reason: str):
+        print(f"Circuit {self.name}: {self.state} -> {state} ({reason})")
+        self.state = state
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now. Counts rejections."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.cooldown:
+                self._transition(HALF_OPEN, "cooldown elapsed, probing")
+                self.probe_started = None
+            if self.state == HALF_OPEN:
+                # One probe at a time; a probe that never reported is replaced after a cooldown
+                if self.probe_started is None or now - self.probe_started >= self.cooldown:
+                    self.probe_started = now
+                    return True
+            elif self.state == CLOSED:
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe is allowed."""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def record(self, ok: bool):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                if ok:
+                    self._outcomes.clear()
+                    self._transition(CLOSED, "probe succeeded")
+                else:
+                    self.opened_at = now
+                    self._transition(OPEN, "probe failed")
+                self.probe_started = None
+                return
+            self._outcomes.append((now, ok))
+            self._prune(now)
+            if self.state != CLOSED or len(self._outcomes) < self.min_requests:
+                return
+            failures = sum(1 for _, outcome in self._outcomes if not outcome)
+            rate = failures / len(self._outcomes)
+            if rate >= self.failure_rate:
+                self.opened_at = now
+                self._transition(OPEN, f"{failures}/{len(self._outcomes)} calls failed in {self.window:.0f}s")
+
+    def summary(self) -> Dict:
+        with self._lock:
+            self._prune(time.monotonic())
+            calls = len(self._outcomes)
+            failures = sum(1 for _, outcome in self._outcomes if not outcome)
+            return {
+                "state": self.state,
+                "calls": calls,
+                "failure_rate": round(failures / calls, 3) if calls else 0.0,
+                "rejected": self.rejected,
+                "retry_after": round(self.retry_after(), 1),
+            }
+
+
+class LatencyTracker:
+    """Recent call latencies for one host or endpoint, and the hedging they imply."""
+
+    def __init__(self, size: int = 200):
+        self.samples: deque = deque(maxlen=size)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def summary(self) -> Dict:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "samples": len(self.samples),
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p95": round(p95, 3) if p95 is not None else None,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+class Resilience:
+    """
+    Circuit breakers and latency trackers keyed by host ("docs.example.com")
+    or LLM endpoint ("llm:api.openai.com/gpt-4o-mini"), plus hedged calls.
+
+    A call still running after the `hedge_percentile` latency of its key
+    (at least `hedge_min_delay`, once `hedge_min_samples` are known) gets a
+    duplicate; the first to succeed wins and the other is cancelled. Hedges are
+    capped at `hedge_max_ratio` of calls so a slow key is not hit twice as hard.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_requests: int = 5,
+        window: float = 60,
+        cooldown: float = 30,
+        hedge_percentile: float = 95,
+        hedge_min_samples: int = 20,
+        hedge_min_delay: float = 0.25,
+        hedge_max_ratio: float = 0.1
+    ):
+        self.breaker_config = dict(
+            failure_rate=failure_rate, min_requests=min_requests, window=window, cooldown=cooldown
+        )
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_ratio = hedge_max_ratio
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.trackers: Dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, key: str) -> CircuitBreaker:
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self.breakers.setdefault(key, CircuitBreaker(key, **self.breaker_config))
+        return breaker
+
+    def tracker(self, key: str) -> LatencyTracker:
+        tracker = self.trackers.get(key)
+        if tracker is None:
+            with self._lock:
+                tracker = self.trackers.setdefault(key, LatencyTracker())
+        return tracker
+
+    def check(self, key: str):
+        """
+        Raises:
+            CircuitOpen: if the key's circuit is open
+        """
+        breaker = self.breaker(key)
+        if not breaker.allow():
+            raise CircuitOpen(f"{key} is failing; circuit open, next probe in {breaker.retry_after():.0f}s")
+
+    def record(self, key: str, ok: bool, latency: Optional[float] = None):
+        self.breaker(key).record(ok)
+        if ok and latency is not None:
+            self.tracker(key).record(latency)
+
+    def hedge_delay(self, key: str, percentile: Optional[float] = None) -> Optional[float]:
+        """Seconds after which a call to `key` is hedged, or None to not hedge it."""
+        percentile = self.hedge_percentile if percentile is None else percentile
+        if not percentile:
+            return None
+        tracker = self.tracker(key)
+        if len(tracker.samples) < self.hedge_min_samples:
+            return None
+        if tracker.hedges >= max(1, tracker.calls * self.hedge_max_ratio):
+            return None
+        return max(self.hedge_min_delay, tracker.percentile(percentile))
+
+    async def hedged(
+        self,
+        key: str,
+        attempt: Callable[[], Awaitable[Any]],
+        percentile: Optional[float] = None,
+        discard: Optional[Callable[[Any], None]] = None
+    ) -> Any:
+        """
+        Await `attempt()`, starting a second `attempt()` if the first is slower
+        than the key's hedge delay. Returns the first successful result; the
+        other attempt is cancelled, and `discard` is called on its result if it
+        also finished. Raises the last error if every attempt failed.
+        """
+        tracker = self.tracker(key)
+        tracker.calls += 1
+        delay = self.hedge_delay(key, percentile)
+        tasks = [asyncio.ensure_future(attempt())]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self.breaker(key).state == CLOSED:
+                    tracker.hedges += 1
+                    tasks.append(asyncio.ensure_future(attempt()))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in tasks:
+                    if task not in done:
+                        continue
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if task is not tasks[0]:
+                        tracker.hedge_wins += 1
+                    for other in tasks:
+                        if other is not task and other.done() and not other.cancelled() \
+                                and other.exception() is None and discard is not None:
+                            discard(other.result())
+                    return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def summary(self) -> Dict:
+        keys = sorted(set(self.breakers) | set(self.trackers))
+        return {
+            "hedge_percentile": self.hedge_percentile,
+            "keys": {
+                key: {
+                    "circuit": self.breaker(key).summary(),
+                    "latency": self.tracker(key).summary(),
+                    "hedge_delay": self.hedge_delay(key),
+                }
+                for key in keys
+            },
+        }
+
+
+_resilience: Optional[Resilience] = None
+
+
+def get_resilience() -> Resilience:
+    """
+    Return the process-wide breakers and trackers configured from the environment:
+    BREAKER_FAILURE_RATE, BREAKER_MIN_REQUESTS, BREAKER_WINDOW_SECONDS,
+    BREAKER_COOLDOWN_SECONDS, HEDGE_PERCENTILE (0 = never hedge),
+    HEDGE_MIN_SAMPLES, HEDGE_MIN_DELAY and HEDGE_MAX_RATIO.
+    """
+    global _resilience
+    if _resilience is None:
+        _resilience = Resilience(
+            failure_rate=float(os.getenv("BREAKER_FAILURE_RATE", "0.5")),
+            min_requests=int(os.getenv("BREAKER_MIN_REQUESTS", "5")),
+            window=float(os.getenv("BREAKER_WINDOW_SECONDS", "60")),
+            cooldown=float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30")),
+            hedge_percentile=float(os.getenv("HEDGE_PERCENTILE", "95")),
+            hedge_min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+            hedge_min_delay=float(os.getenv("HEDGE_MIN_DELAY", "0.25")),
+            hedge_max_ratio=float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+        )
+    return _resilience
@@ -0,0 +1,106 @@
+import gzip
+import json
+import hashlib
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves
+MIN_COMPRESS_BYTES = 1024
+# Bodies at least this large are compressed in the thread pool instead of on the event loop
+THREADPOOL_COMPRESS_BYTES = 64 * 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+
+def dumps(payload: Any) -> bytes:
+    """Encode JSON to bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def compute_etag(body: bytes) -> str:
+    # Weak, because the same content may be sent with different Content-Encodings
+    return 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, preferring br when available."""
+    accepted = _accepted_encodings(accept_encoding or "")
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+async def json_response(request: Request, payload: Any, status_code: int = 200) -> Response:
+    """
+    Serialize a payload once and return it with an ETag, compressed to the
+    client's preferred encoding (in the thread pool for large bodies).
+    GET/HEAD requests whose If-None-Match matches get an empty 304.
+
+    Returning a Response directly also means FastAPI does not re-validate the
+    payload against the route's response_model.
+    """
+    body = dumps(payload)
+    etag = compute_etag(body)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+
+    if request.method in ("GET", "HEAD"):
+        if_none_match = request.headers.get("if-none-match", "")
+        # Weak comparison: W/"x" and "x" match
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag.removeprefix("W/") in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+
+    if len(body) >= MIN_COMPRESS_BYTES:
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        if encoding:
+            if len(body) >= THREADPOOL_COMPRESS_BYTES:
+                body = await run_in_threadpool(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,285 @@
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+
+class QueueTimeout(Exception):
+    """Capacity did not become available before the request's deadline."""
+
+
+class Ticket:
+    """One request's scheduling identity and the time it spent queued per resource."""
+
+    def __init__(self, client_id: str, priority: str = INTERACTIVE):
+        self.client_id = client_id
+        self.priority = priority
+        self.wait: Dict[str, float] = {}
+
+    def record_wait(self, resource: str, seconds: float):
+        self.wait[resource] = self.wait.get(resource, 0.0) + seconds
+
+    def summary(self) -> Dict[str, float]:
+        summary = {resource: round(seconds, 3) for resource, seconds in self.wait.items()}
+        summary["total"] = round(sum(self.wait.values()), 3)
+        return summary
+
+
+class TokenBucket:
+    """Refills `per_minute` tokens a minute, up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.rate = per_minute / 60
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost: float, now: float) -> float:
+        """Seconds until `cost` tokens are available (requests larger than the bucket wait for a full one)."""
+        self._refill(now)
+        missing = min(cost, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, cost: float, now: float):
+        self._refill(now)
+        self.tokens -= min(cost, self.capacity)
+
+
+class _Waiter:
+    __slots__ = ("ticket", "cost", "start", "finish", "seq", "future", "granted")
+
+    def __init__(self, ticket: Ticket, cost: float, start: float, finish: float, seq: int):
+        self.ticket = ticket
+        self.cost = cost
+        self.start = start
+        self.finish = finish
+        self.seq = seq
+        self.future = asyncio.get_running_loop().create_future()
+        self.granted = False
+
+
+class FairResource:
+    """
+    A pool of slots (concurrent crawls or LLM calls) shared by all clients.
+
+    Waiters are ordered by start-time fair queueing: each client's requests get
+    virtual finish tags spaced by cost / weight, so a client with a long queue
+    cannot starve one that just arrived. Interactive waiters are served before
+    batch ones, and `interactive_reserve` slots are never given to batch work.
+    Per-client limits (concurrent slots, tokens per minute) hold a waiter back
+    without blocking other clients behind it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        capacity: int,
+        client_limit: int = 0,
+        tokens_per_minute: float = 0,
+        interactive_reserve: int = 0,
+        weights: Optional[Dict[str, float]] = None
+    ):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.client_limit = client_limit
+        self.tokens_per_minute = tokens_per_minute
+        self.interactive_reserve = min(interactive_reserve, self.capacity - 1)
+        self.weights = weights or {}
+
+        self.in_use = 0
+        self.in_use_by_class: Dict[str, int] = {INTERACTIVE: 0, BATCH: 0}
+        self.in_use_by_client: Dict[str, int] = {}
+        self.waiting: List[_Waiter] = []
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+        self._seq = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _enqueue(self, ticket: Ticket, cost: float) -> _Waiter:
+        weight = self.weights.get(ticket.client_id, 1.0)
+        start = max(self.virtual_time, self.last_finish.get(ticket.client_id, 0.0))
+        finish = start + cost / weight
+        self.last_finish[ticket.client_id] = finish
+        self._seq += 1
+        waiter = _Waiter(ticket, cost, start, finish, self._seq)
+        self.waiting.append(waiter)
+        return waiter
+
+    def _bucket(self, client_id: str) -> Optional[TokenBucket]:
+        if not self.tokens_per_minute:
+            return None
+        bucket = self.buckets.get(client_id)
+        if bucket is None:
+            bucket = self.buckets[client_id] = TokenBucket(self.tokens_per_minute)
+        return bucket
+
+    def _dispatch(self):
+        """Grant free slots to the best eligible waiters."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.waiting = [w for w in self.waiting if not w.future.done()]
+        now = time.monotonic()
+        retry_in = None
+        for waiter in sorted(self.waiting, key=lambda w: (w.ticket.priority != INTERACTIVE, w.finish, w.seq)):
+            if self.in_use >= self.capacity:
+                break
+            ticket = waiter.ticket
+            if ticket.priority == BATCH and self.in_use_by_class[BATCH] >= self.capacity - self.interactive_reserve:
+                continue
+            if self.client_limit and self.in_use_by_client.get(ticket.client_id, 0) >= self.client_limit:
+                continue
+            bucket = self._bucket(ticket.client_id)
+            if bucket is not None:
+                delay = bucket.delay(waiter.cost, now)
+                if delay > 0:
+                    retry_in = delay if retry_in is None else min(retry_in, delay)
+                    continue
+                bucket.take(waiter.cost, now)
+
+            self.waiting.remove(waiter)
+            self.in_use += 1
+            self.in_use_by_class[ticket.priority] += 1
+            self.in_use_by_client[ticket.client_id] = self.in_use_by_client.get(ticket.client_id, 0) + 1
+            self.virtual_time = max(self.virtual_time, waiter.start)
+            waiter.granted = True
+            waiter.future.set_result(None)
+
+        # Waiters held back only by their token quota need a wake-up when it refills
+        if retry_in is not None and self.waiting:
+            self._timer = asyncio.get_running_loop().call_later(retry_in, self._dispatch)
+
+    def _release(self, waiter: _Waiter):
+        ticket = waiter.ticket
+        self.in_use -= 1
+        self.in_use_by_class[ticket.priority] -= 1
+        self.in_use_by_client[ticket.client_id] -= 1
+        if not self.in_use_by_client[ticket.client_id]:
+            del self.in_use_by_client[ticket.client_id]
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, ticket: Ticket, cost: float = 1.0, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold one slot for the duration of the block.
+
+        Raises:
+            QueueTimeout: if no slot was granted within `timeout` seconds
+        """
+        queued_at = time.monotonic()
+        waiter = self._enqueue(ticket, cost)
+        self._dispatch()
+        try:
+            if not waiter.granted:
+                await asyncio.wait_for(waiter.future, timeout)
+        except BaseException as e:
+            if waiter.granted:
+                # Granted just as the wait was abandoned; hand the slot on
+                self._release(waiter)
+            elif waiter in self.waiting:
+                self.waiting.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise QueueTimeout(f"no {self.name} capacity within {timeout:.1f}s")
+            raise
+        finally:
+            ticket.record_wait(self.name, time.monotonic() - queued_at)
+
+        try:
+            yield
+        finally:
+            self._release(waiter)
+
+    def summary(self) -> Dict:
+        queued = {INTERACTIVE: 0, BATCH: 0}
+        for waiter in self.waiting:
+            queued[waiter.ticket.priority] += 1
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "in_use_by_class": dict(self.in_use_by_class),
+            "queued": queued,
+            "in_use_by_client": dict(self.in_use_by_client),
+        }
+
+
+class FairScheduler:
+    """
+    Shares this worker's crawl and LLM capacity between clients and between
+    interactive and batch requests. See FairResource for the queueing policy.
+    """
+
+    def __init__(
+        self,
+        crawl_slots: int = 4,
+        llm_slots: int = 4,
+        client_max_crawls: int = 0,
+        client_llm_tokens_per_minute: float = 0,
+        interactive_reserve: int = 1,
+        weights: Optional[Dict[str, float]] = None
+    ):
+        self.resources = {
+            "crawl": FairResource(
+                "crawl", crawl_slots,
+                client_limit=client_max_crawls,
+                interactive_reserve=interactive_reserve,
+                weights=weights
+            ),
+            "llm": FairResource(
+                "llm", llm_slots,
+                tokens_per_minute=client_llm_tokens_per_minute,
+                interactive_reserve=interactive_reserve,
+                weights=weights
+            ),
+        }
+
+    def ticket(self, client_id: str, priority: str = INTERACTIVE) -> Ticket:
+        return Ticket(client_id, priority if priority in (INTERACTIVE, BATCH) else INTERACTIVE)
+
+    def slot(self, resource: str, ticket: Ticket, cost: float = 1.0, timeout: Optional[float] = None):
+        return self.resources[resource].slot(ticket, cost, timeout)
+
+    def summary(self) -> Dict:
+        return {name: resource.summary() for name, resource in self.resources.items()}
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse "client-a:2,client-b:0.5" into a weight map."""
+    weights = {}
+    for item in spec.split(","):
+        client_id, _, weight = item.strip().rpartition(":")
+        if client_id and weight:
+            weights[client_id] = float(weight)
+    return weights
+
+
+_scheduler: Optional[FairScheduler] = None
+
+
+def get_scheduler() -> FairScheduler:
+    """
+    Return the process-wide scheduler configured from the environment:
+    SCHEDULER_CRAWL_SLOTS, SCHEDULER_LLM_SLOTS, SCHEDULER_CLIENT_MAX_CRAWLS and
+    SCHEDULER_CLIENT_LLM_TOKENS_PER_MINUTE (0 = unlimited),
+    SCHEDULER_INTERACTIVE_RESERVE and SCHEDULER_CLIENT_WEIGHTS.
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FairScheduler(
+            crawl_slots=int(os.getenv("SCHEDULER_CRAWL_SLOTS", "4")),
+            llm_slots=int(os.getenv("SCHEDULER_LLM_SLOTS", "4")),
+            client_max_crawls=int(os.getenv("SCHEDULER_CLIENT_MAX_CRAWLS", "0")),
+            client_llm_tokens_per_minute=float(os.getenv("SCHEDULER_CLIENT_LLM_TOKENS_PER_MINUTE", "0")),
+            interactive_reserve=int(os.getenv("SCHEDULER_INTERACTIVE_RESERVE", "1")),
+            weights=parse_weights(os.getenv("SCHEDULER_CLIENT_WEIGHTS", ""))
+        )
+    return _scheduler
@@ -0,0 +1,71 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, TypeAdapter, field_validator
+
+
+class Module(BaseModel):
+    """One extracted product module and its submodules."""
+
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
+    module: str
+    description: str = ""
+    submodules: Dict[str, str] = {}
+
+    @field_validator("description", mode="before")
+    @classmethod
+    def _text_description(cls, value: Any) -> str:
+        return "" if value is None else str(value)
+
+    @field_validator("submodules", mode="before")
+    @classmethod
+    def _submodule_map(cls, value: Any) -> Dict[str, str]:
+        # LLMs sometimes return a list of names or null descriptions
+        if value is None:
+            return {}
+        if isinstance(value, list):
+            return {str(name): "" for name in value if name}
+        if isinstance(value, dict):
+            return {str(name): "" if desc is None else str(desc) for name, desc in value.items()}
+        return value
+
+
+class MergedModule(Module):
+    """A module merged across URLs by ModuleMerger."""
+
+    sources: List[str] = []
+    aliases: List[str] = []
+    submodule_sources: Dict[str, List[str]] = {}
+
+
+class UrlModules(BaseModel):
+    """Modules extracted from one documentation URL."""
+
+    url: str
+    modules: List[Module]
+    prompt: Optional[Dict[str, Any]] = None
+    partial: bool = False
+    # Localized/versioned URLs the crawl skipped: count, values per kind, URLs with reasons
+    skipped_variants: Optional[Dict[str, Any]] = None
+
+
+_module_list = TypeAdapter(List[Module])
+
+
+def normalize_modules(modules: List[Dict]) -> List[Dict]:
+    """
+    Validate raw LLM modules against the Module schema once and return plain
+    dicts in canonical form. Entries that cannot be coerced are dropped.
+    """
+    if not isinstance(modules, list):
+        return []
+    try:
+        return _module_list.dump_python(_module_list.validate_python(modules))
+    except ValueError:
+        pass
+    valid = []
+    for module in modules:
+        try:
+            valid.append(Module.model_validate(module).model_dump())
+        except ValueError:
+            print(f"Dropping malformed module entry: {str(module)[:100]}")
+    return valid
@@ -0,0 +1,400 @@
+import os
+import re
+import json
+import math
+import time
+import heapq
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.merger import normalize_name, normalize_text
+
+
+# Field boosts and the typical field length used for length normalization
+FIELDS = {
+    "module": (3.0, 3),
+    "submodules": (2.0, 20),
+    "description": (1.0, 30),
+    "submodule_descriptions": (0.5, 150),
+    "url": (1.0, 6),
+}
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Index terms: the same normalization the merger uses for module names."""
+    return normalize_text(text).split() if text else []
+
+
+def tokenize_name(name: str) -> List[str]:
+    return normalize_name(name).split() if name else []
+
+
+def _url_text(url: str) -> str:
+    return " ".join(re.split(r"[^A-Za-z0-9]+", re.sub(r"^https?://(www\.)?", "", url)))
+
+
+def term_weights(url: str, module: str, description: str, submodules: Dict[str, str]) -> Dict[str, float]:
+    """Per-term weight of one module document: boosted, saturated term frequency summed over fields."""
+    fields = {
+        "module": tokenize_name(module),
+        "submodules": [t for name in submodules for t in tokenize_name(name)],
+        "description": tokenize(description),
+        "submodule_descriptions": [t for desc in submodules.values() for t in tokenize(desc)],
+        "url": tokenize(_url_text(url)),
+    }
+    weights: Dict[str, float] = {}
+    for field, tokens in fields.items():
+        if not tokens:
+            continue
+        boost, typical_length = FIELDS[field]
+        norm = K1 * (1 - B + B * len(tokens) / typical_length)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            weights[token] = weights.get(token, 0.0) + boost * tf * (K1 + 1) / (tf + norm)
+    return weights
+
+
+class Postings:
+    """
+    Documents containing one term. Kept in doc-id order (ids only grow, so
+    adds are appends) for binary-search lookups, plus an impact order (highest
+    weight first) for early-terminating top-k. Recent additions are kept in a
+    small sorted tail that is merged lazily, and folded in once it grows.
+    """
+
+    __slots__ = ("docs", "weights", "_impact", "_tail")
+
+    def __init__(self):
+        self.docs = array("I")
+        self.weights = array("f")
+        self._impact = array("I")
+        self._tail: List[int] = []
+
+    def add(self, doc_id: int, weight: float):
+        self.docs.append(doc_id)
+        self.weights.append(weight)
+
+    def weight(self, doc_id: int) -> float:
+        pos = bisect_left(self.docs, doc_id)
+        if pos < len(self.docs) and self.docs[pos] == doc_id:
+            return self.weights[pos]
+        return 0.0
+
+    def _sort_tail(self):
+        ordered = len(self._impact) + len(self._tail)
+        if ordered < len(self.weights):
+            self._tail = sorted(
+                self._tail + list(range(ordered, len(self.weights))),
+                key=self.weights.__getitem__, reverse=True
+            )
+
+    def fold(self):
+        """Merge the tail into the main impact order."""
+        self._sort_tail()
+        if self._tail:
+            self._impact = array("I", heapq.merge(
+                self._impact, self._tail, key=self.weights.__getitem__, reverse=True
+            ))
+            self._tail = []
+
+    def maybe_fold(self):
+        """Fold once the unmerged additions outgrow a fraction of the list (amortized O(1) per add)."""
+        if len(self.weights) - len(self._impact) > max(256, len(self._impact) // 8):
+            self.fold()
+
+    def impact(self) -> Iterator[int]:
+        """Positions in descending weight order, produced lazily."""
+        self._sort_tail()
+        if not self._tail:
+            return iter(self._impact)
+        return heapq.merge(self._impact, self._tail, key=self.weights.__getitem__, reverse=True)
+
+    def compact(self, deleted: set):
+        keep = [i for i, doc_id in enumerate(self.docs) if doc_id not in deleted]
+        self.docs = array("I", (self.docs[i] for i in keep))
+        self.weights = array("f", (self.weights[i] for i in keep))
+        self._impact = array("I")
+        self._tail = []
+        self.fold()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+
+class ModuleSearchIndex:
+    """
+    Inverted index over every extracted module (name, submodule names,
+    descriptions and source URL), ranked BM25-style with field boosts.
+
+    Modules are stored in SQLite, which is the source of truth; postings are
+    held in memory as compact arrays and rebuilt from the table when the index
+    is opened. Re-indexing a URL replaces its previous modules. Other workers'
+    writes to the same file are picked up on the next search.
+
+    Queries use the threshold algorithm over impact-ordered postings, so the
+    top hits are found without scoring every document that contains a common term.
+    """
+
+    def __init__(self, path: str, compact_ratio: float = 0.2):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS modules ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, module TEXT NOT NULL, "
+            "description TEXT NOT NULL, submodules TEXT NOT NULL, terms TEXT NOT NULL, extracted_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS modules_url ON modules(url)")
+        # Removed module ids, so every worker can drop them from its postings
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS removed (seq INTEGER PRIMARY KEY AUTOINCREMENT, doc_id INTEGER NOT NULL)"
+        )
+
+        self.postings: Dict[str, Postings] = {}
+        self.doc_ids = array("I")
+        self.deleted: set = set()
+        self.num_docs = 0
+        self._last_doc = 0
+        # Rows still in the table are live, so earlier removals need not be replayed
+        self._last_removed = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM removed").fetchone()[0]
+        self._sync()
+        for postings in self.postings.values():
+            postings.fold()
+
+    def _index_rows(self, rows: Iterable[Tuple]):
+        touched = set()
+        for doc_id, terms in rows:
+            for term, weight in json.loads(terms).items():
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = self.postings[term] = Postings()
+                postings.add(doc_id, weight)
+                touched.add(term)
+            self.doc_ids.append(doc_id)
+            self.num_docs += 1
+            self._last_doc = doc_id
+        # Reorganize on the write path so searches only merge a short tail
+        for term in touched:
+            self.postings[term].maybe_fold()
+
+    def _is_indexed(self, doc_id: int) -> bool:
+        pos = bisect_left(self.doc_ids, doc_id)
+        return pos < len(self.doc_ids) and self.doc_ids[pos] == doc_id and doc_id not in self.deleted
+
+    def _sync(self):
+        """Apply rows added or removed since this process last looked (by this or another worker)."""
+        # One read transaction, so both queries see the same snapshot
+        self._conn.execute("BEGIN")
+        try:
+            self._index_rows(self._conn.execute(
+                "SELECT id, terms FROM modules WHERE id > ? ORDER BY id",
+                (self._last_doc,)
+            ))
+            for seq, doc_id in self._conn.execute(
+                "SELECT seq, doc_id FROM removed WHERE seq > ? ORDER BY seq", (self._last_removed,)
+            ):
+                # Rows added and removed between two syncs were never indexed here
+                if self._is_indexed(doc_id):
+                    self.deleted.add(doc_id)
+                    self.num_docs -= 1
+                self._last_removed = seq
+        finally:
+            self._conn.execute("COMMIT")
+        if self.deleted and len(self.deleted) > self.compact_ratio * max(self.num_docs, 1):
+            for postings in self.postings.values():
+                postings.compact(self.deleted)
+            self.postings = {term: p for term, p in self.postings.items() if len(p)}
+            self.doc_ids = array("I", (doc_id for doc_id in self.doc_ids if doc_id not in self.deleted))
+            self.deleted = set()
+
+    def index_url(self, url: str, modules: List[Dict]):
+        """Replace the indexed modules of one URL with a fresh extraction."""
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO removed (doc_id) SELECT id FROM modules WHERE url = ?", (url,)
+                )
+                self._conn.execute("DELETE FROM modules WHERE url = ?", (url,))
+                rows = []
+                for m in modules:
+                    if not m.get('module'):
+                        continue
+                    description = m.get('description') or ''
+                    submodules = m.get('submodules') or {}
+                    # Term weights are stored so reopening the index does not re-tokenize
+                    terms = term_weights(url, m['module'], description, submodules)
+                    rows.append((url, m['module'], description, json.dumps(submodules), json.dumps(terms), now))
+                self._conn.executemany(
+                    "INSERT INTO modules (url, module, description, submodules, terms, extracted_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._sync()
+
+    def index_results(self, modules_by_url: List[Dict]):
+        """Index the per-URL results of an extraction ([{"url": ..., "modules": [...]}, ...])."""
+        for entry in modules_by_url:
+            # Empty or partial results would wipe out a good earlier extraction
+            if entry.get('modules') and not entry.get('partial'):
+                self.index_url(entry['url'], entry['modules'])
+
+    def _idf(self, df: int) -> float:
+        return math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Return the top `limit` modules for a free-text query, best first."""
+        with self._lock:
+            self._sync()
+            # Queries are free text: the uncached normalizer, so they don't fill the name cache
+            terms = [t for t in dict.fromkeys(tokenize(query)) if t in self.postings]
+            if not terms or limit <= 0:
+                return []
+            lists = [(self.postings[t], self._idf(len(self.postings[t]))) for t in terms]
+            cursors = [(postings, idf, postings.impact()) for postings, idf in lists]
+
+            top: List[Tuple[float, int]] = []
+            seen = set()
+            while True:
+                threshold = 0.0
+                active = False
+                for postings, idf, cursor in cursors:
+                    pos = next(cursor, None)
+                    if pos is None:
+                        continue
+                    active = True
+                    weight = postings.weights[pos] * idf
+                    threshold += weight
+                    doc_id = postings.docs[pos]
+                    if doc_id in seen or doc_id in self.deleted:
+                        continue
+                    seen.add(doc_id)
+                    score = weight + sum(
+                        other.weight(doc_id) * other_idf for other, other_idf in lists if other is not postings
+                    )
+                    if len(top) < limit:
+                        heapq.heappush(top, (score, doc_id))
+                    elif score > top[0][0]:
+                        heapq.heapreplace(top, (score, doc_id))
+                # No unseen document can beat the current top-k
+                if not active or (len(top) == limit and top[0][0] >= threshold):
+                    break
+
+            ranked = sorted(top, reverse=True)
+            rows = {
+                row[0]: row for row in self._conn.execute(
+                    f"SELECT id, url, module, description, submodules, extracted_at FROM modules "
+                    f"WHERE id IN ({','.join('?' * len(ranked))})",
+                    [doc_id for _, doc_id in ranked]
+                )
+            }
+
+        query_terms = set(terms)
+        hits = []
+        for score, doc_id in ranked:
+            row = rows.get(doc_id)
+            if row is None:
+                continue
+            submodules = json.loads(row[4])
+            hits.append({
+                "url": row[1],
+                "module": row[2],
+                "description": row[3],
+                "submodules": submodules,
+                "matched_submodules": [
+                    name for name in submodules if query_terms & set(tokenize_name(name))
+                ],
+                "score": round(score, 4),
+                "extracted_at": row[5],
+            })
+        return hits
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._sync()
+            return {"modules": self.num_docs, "terms": len(self.postings), "path": str(self.path)}
+
+    def close(self):
+        self._conn.close()
+
+
+_index: Optional[ModuleSearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> ModuleSearchIndex:
+    """Return the process-wide search index stored at SEARCH_INDEX_PATH."""
+    global _index
+    if _index is None:
+        # Opening rebuilds postings, so it may run on a warm-up thread; open it once
+        with _index_lock:
+            if _index is None:
+                default_path = Path(__file__).parent.parent / ".cache" / "search.db"
+                _index = ModuleSearchIndex(os.getenv("SEARCH_INDEX_PATH", str(default_path)))
+    return _index
+
+
+if __name__ == "__main__":
+    import random
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Benchmark the module search index on synthetic modules")
+    parser.add_argument("--modules", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    common = (
+        "user account billing report dashboard role permission workflow automation integration "
+        "export import schedule alert notification audit security policy team project task sso"
+    ).split()
+    rare = [f"feature{i}" for i in range(20000)]
+
+    def phrase(n):
+        return " ".join(rng.choice(common) if rng.random() < 0.4 else rng.choice(rare) for _ in range(n))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ModuleSearchIndex(os.path.join(tmp, "search.db"))
+        started = time.time()
+        per_url = 50
+        for u in range(args.modules // per_url):
+            index.index_url(f"https://docs.product{u}.com/help", [
+                {"module": phrase(2), "description": phrase(20),
+                 "submodules": {phrase(2): phrase(10) for _ in range(5)}}
+                for _ in range(per_url)
+            ])
+        print(f"Indexed {index.num_docs} modules in {time.time() - started:.1f}s")
+
+        started = time.time()
+        reopened = ModuleSearchIndex(os.path.join(tmp, "search.db"))
+        print(f"Reopened (postings rebuilt) in {time.time() - started:.1f}s")
+
+        queries = [rng.choice(common) for _ in range(args.queries // 2)] + [
+            f"{rng.choice(common)} {rng.choice(common)}" for _ in range(args.queries // 4)
+        ] + [rng.choice(rare) for _ in range(args.queries // 4)]
+        reopened.search(queries[0])  # build impact orders for the first term
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            reopened.search(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        print(f"{len(queries)} queries: p50 {latencies[len(latencies) // 2]:.2f}ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)]:.2f}ms, max {latencies[-1]:.2f}ms")
@@ -0,0 +1,201 @@
+import gzip
+import json
+import os
+import re
+import hashlib
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+WARC_VERSION = b"WARC/1.1"
+SOFTWARE = "ModuleExtractor/1.0"
+# requests has already decoded these, so they no longer describe the stored body
+_DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+class RawResponse:
+    """A downloaded page before parsing: what a snapshot stores and replays."""
+
+    __slots__ = ("url", "status", "reason", "headers", "body")
+
+    def __init__(self, url: str, status: int, reason: str, headers: Dict[str, str], body: bytes):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+
+def _warc_date() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def snapshot_path(snapshot_dir: str, start_url: str) -> Path:
+    """<dir>/<host>-<url hash>-<UTC time>.warc.gz; newer snapshots of a URL sort last."""
+    host = re.sub(r"[^A-Za-z0-9.-]", "_", urlparse(start_url).netloc) or "site"
+    digest = hashlib.sha1(start_url.encode()).hexdigest()[:10]
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    return Path(snapshot_dir) / f"{host}-{digest}-{stamp}.warc.gz"
+
+
+class SnapshotWriter:
+    """
+    Writes one crawl as a gzipped WARC file: a `warcinfo` record naming the
+    start URL and crawler options, then a `response` record (status line,
+    headers, body) per downloaded page. Each record is its own gzip member, as
+    in standard .warc.gz files, so tools like warcio can read them too.
+
+    Records go to `<path>.part`, renamed to `path` on close, so a snapshot
+    directory only ever holds finished archives. Writes are thread-safe, so
+    the crawler compresses and writes records off the event loop.
+    """
+
+    def __init__(self, path: Path, start_url: str, crawler_options: Dict):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._part = self.path.with_name(self.path.name + ".part")
+        self._file = open(self._part, "wb")
+        self._lock = threading.Lock()
+        self.records = 0
+        fields = {
+            "software": SOFTWARE,
+            "format": "WARC File Format 1.1",
+            "start-url": start_url,
+            "crawler-options": json.dumps(crawler_options, sort_keys=True),
+        }
+        block = "".join(f"{name}: {value}\r\n" for name, value in fields.items()).encode("utf-8")
+        self._write("warcinfo", block, "application/warc-fields", {"WARC-Filename": self.path.name})
+
+    def _write(self, record_type: str, block: bytes, content_type: str, extra: Dict[str, str]):
+        headers = {
+            "WARC-Type": record_type,
+            "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+            "WARC-Date": _warc_date(),
+            **extra,
+            "Content-Type": content_type,
+            "Content-Length": str(len(block)),
+        }
+        head = WARC_VERSION + b"\r\n" + "".join(
+            f"{name}: {value}\r\n" for name, value in headers.items()
+        ).encode("utf-8") + b"\r\n"
+        # Low compression level: archiving must not slow the crawl down
+        member = gzip.compress(head + block + b"\r\n\r\n", compresslevel=3)
+        with self._lock:
+            # A write still running in a thread when its crawl was cancelled and closed
+            if self._file.closed:
+                return
+            self._file.write(member)
+            self.records += 1
+
+    def write_response(self, response: RawResponse):
+        status_line = f"HTTP/1.1 {response.status} {response.reason}\r\n"
+        headers = "".join(
+            f"{name}: {value}\r\n" for name, value in response.headers.items()
+            if name.lower() not in _DROPPED_HEADERS
+        )
+        headers += f"Content-Length: {len(response.body)}\r\n"
+        block = (status_line + headers + "\r\n").encode("latin-1", "replace") + response.body
+        extra = {"WARC-Target-URI": response.url}
+        self._write("response", block, "application/http;msgtype=response", extra)
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.close()
+        os.replace(self._part, self.path)
+
+
+def iter_records(path: str) -> Iterator[Tuple[Dict[str, str], bytes]]:
+    """Yield (WARC headers, block) for each record. A truncated tail is ignored."""
+    with gzip.open(path, "rb") as f:
+        while True:
+            try:
+                line = f.readline()
+                if not line:
+                    return
+                if line.strip() != WARC_VERSION:
+                    raise ValueError(f"{path}: not a WARC record: {line[:40]!r}")
+                headers = {}
+                for line in iter(f.readline, b"\r\n"):
+                    if not line:
+                        return
+                    name, _, value = line.decode("utf-8").partition(":")
+                    headers[name.strip()] = value.strip()
+                block = f.read(int(headers.get("Content-Length", "0")))
+                f.read(4)
+            except (EOFError, gzip.BadGzipFile):
+                return
+            yield headers, block
+
+
+def _parse_http_response(url: str, block: bytes) -> RawResponse:
+    head, _, body = block.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    _, status, reason = (lines[0].split(" ", 2) + [""])[:3]
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip()] = value.strip()
+    return RawResponse(url, int(status), reason, headers, body)
+
+
+class SnapshotReader:
+    """A snapshot loaded into memory: its start URL, crawler options and responses by URL."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.start_url = ""
+        self.crawler_options: Dict = {}
+        self.responses: Dict[str, RawResponse] = {}
+        for headers, block in iter_records(self.path):
+            record_type = headers.get("WARC-Type")
+            if record_type == "warcinfo" and not self.start_url:
+                self.start_url, self.crawler_options = _read_warcinfo(block)
+            elif record_type == "response":
+                url = headers.get("WARC-Target-URI", "")
+                self.responses[url] = _parse_http_response(url, block)
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+    def get(self, url: str) -> Optional[RawResponse]:
+        return self.responses.get(url)
+
+
+def _read_warcinfo(block: bytes) -> Tuple[str, Dict]:
+    fields = {}
+    for line in block.decode("utf-8").split("\r\n"):
+        name, _, value = line.partition(":")
+        fields[name.strip()] = value.strip()
+    return fields.get("start-url", ""), json.loads(fields.get("crawler-options") or "{}")
+
+
+def read_start_url(path: str) -> str:
+    """Start URL of a snapshot, from its warcinfo record only."""
+    for headers, block in iter_records(path):
+        if headers.get("WARC-Type") == "warcinfo":
+            return _read_warcinfo(block)[0]
+        break
+    return ""
+
+
+def latest_snapshots(paths: List[str]) -> Dict[str, str]:
+    """
+    Map start URL -> newest snapshot among `paths` (files or directories of
+    *.warc.gz). Snapshot names end in their UTC timestamp, so the newest sorts last.
+    """
+    files = []
+    for path in paths:
+        path = Path(path)
+        files.extend(sorted(path.glob("*.warc.gz")) if path.is_dir() else [path])
+    latest: Dict[str, str] = {}
+    for file in sorted(files, key=lambda f: f.name.rsplit("-", 1)[-1]):
+        start_url = read_start_url(str(file))
+        if start_url:
+            latest[start_url] = str(file)
+    return latest
@@ -0,0 +1,486 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Awaitable, Optional, Tuple
+
+
+class StorageBackend:
+    """
+    Shared key-value storage for caches and crawl/job state.
+
+    Values must be JSON-serializable. Every entry has an optional TTL and the
+    store is bounded to ``max_entries``. ``get_or_compute`` is atomic across
+    every process using the same backend: only one caller computes a missing
+    key while the others wait for its result.
+
+    Backends whose primitives block on disk or network I/O set ``blocking``;
+    the async helpers (``aget``, ``aset``, ``aupdate``, ``aget_or_compute``)
+    then run those primitives in a worker thread, off the event loop.
+    """
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 10000, default_ttl: Optional[float] = 3600):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+
+    # --- Primitives implemented by each backend ---
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def _claim(self, key: str, lease: float) -> Optional[str]:
+        """
+        Take the compute lease for a key. Returns the owner token needed to
+        release it, or None if someone else holds it.
+        """
+        raise NotImplementedError
+
+    def _release(self, key: str, owner: str) -> None:
+        """Give the lease back, unless it expired and has since been claimed by someone else."""
+        raise NotImplementedError
+
+    # --- Shared helpers ---
+
+    def _expiry(self, ttl: Optional[float]) -> Optional[float]:
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.time() + ttl if ttl else None
+
+    async def _off_loop(self, fn: Callable, *args) -> Any:
+        if self.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await self._off_loop(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self._off_loop(self.set, key, value, ttl)
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: Optional[float] = None,
+        lease: float = 120,
+        poll_interval: float = 0.05
+    ) -> Any:
+        """Return the cached value or compute it exactly once across all workers."""
+        while True:
+            value = self.get(key)
+            if value is not None:
+                return value
+            owner = self._claim(key, lease)
+            if owner is not None:
+                try:
+                    # The previous holder may have stored it between our get and claim
+                    value = self.get(key)
+                    if value is not None:
+                        return value
+                    value = compute()
+                    if value is not None:
+                        self.set(key, value, ttl)
+                    return value
+                finally:
+                    self._release(key, owner)
+            time.sleep(poll_interval)
+
+    def update(
+        self,
+        key: str,
+        modify: Callable[[Optional[Any]], Any],
+        ttl: Optional[float] = None,
+        lease: float = 30,
+        poll_interval: float = 0.05
+    ) -> Any:
+        """
+        Read-modify-write one key atomically across all workers: `modify`
+        gets the current value (None if missing) and returns the new one.
+        """
+        lease_key = f"update:{key}"
+        owner = self._claim(lease_key, lease)
+        while owner is None:
+            time.sleep(poll_interval)
+            owner = self._claim(lease_key, lease)
+        try:
+            value = modify(self.get(key))
+            self.set(key, value, ttl)
+            return value
+        finally:
+            self._release(lease_key, owner)
+
+    async def aupdate(
+        self,
+        key: str,
+        modify: Callable[[Optional[Any]], Any],
+        ttl: Optional[float] = None,
+        lease: float = 30
+    ) -> Any:
+        """Async variant of ``update``."""
+        return await self._off_loop(self.update, key, modify, ttl, lease)
+
+    async def aget_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        lease: float = 120,
+        poll_interval: float = 0.05,
+        wait_timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Async variant of ``get_or_compute`` for coroutine producers. A caller
+        that has waited `wait_timeout` seconds for another worker's result
+        (e.g. the rest of its request deadline) stops waiting and computes the
+        value itself, without the lease.
+        """
+        give_up = time.monotonic() + wait_timeout if wait_timeout is not None else None
+        while True:
+            value = await self._off_loop(self.get, key)
+            if value is not None:
+                return value
+            owner = await self._off_loop(self._claim, key, lease)
+            if owner is not None:
+                try:
+                    value = await self._off_loop(self.get, key)
+                    if value is not None:
+                        return value
+                    value = await compute()
+                    if value is not None:
+                        await self._off_loop(self.set, key, value, ttl)
+                    return value
+                finally:
+                    await self._off_loop(self._release, key, owner)
+            if give_up is not None and time.monotonic() >= give_up:
+                value = await compute()
+                if value is not None:
+                    await self._off_loop(self.set, key, value, ttl)
+                return value
+            await asyncio.sleep(poll_interval)
+
+
+class MemoryStorage(StorageBackend):
+    """In-process LRU store. Shared between threads, not between worker processes."""
+
+    def __init__(self, max_entries: int = 10000, default_ttl: Optional[float] = 3600):
+        super().__init__(max_entries, default_ttl)
+        self._data: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            raw, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raw = json.dumps(value)
+        with self._lock:
+            self._data[key] = (raw, self._expiry(ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _claim(self, key: str, lease: float, owner: Optional[str] = None) -> Optional[str]:
+        """Claiming again with the same `owner` succeeds, so a retried claim is not refused."""
+        owner = owner or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            held = self._leases.get(key)
+            if held is not None and held[1] > now and held[0] != owner:
+                return None
+            self._leases[key] = (owner, now + lease)
+            return owner
+
+    def _release(self, key: str, owner: str) -> None:
+        with self._lock:
+            held = self._leases.get(key)
+            # A lease that expired and was taken over belongs to someone else now
+            if held is not None and held[0] == owner:
+                del self._leases[key]
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    SQLite store in WAL mode, shared by every worker process on the host.
+    Eviction is oldest-written first so reads never need a write lock.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        default_ttl: Optional[float] = 3600
+    ):
+        super().__init__(max_entries, default_ttl)
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS kv_updated ON kv(updated_at)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, owner TEXT)"
+        )
+        if "owner" not in {row[1] for row in conn.execute("PRAGMA table_info(leases)")}:
+            # Created before leases had owners
+            conn.execute("ALTER TABLE leases ADD COLUMN owner TEXT")
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread: the crawler calls in from executor threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _rollback(conn: sqlite3.Connection):
+        # SQLite may have rolled back already (e.g. a failed COMMIT or a full disk);
+        # a second error from ROLLBACK must not replace the one being raised
+        if not conn.in_transaction:
+            return
+        try:
+            conn.execute("ROLLBACK")
+        except sqlite3.Error:
+            pass
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM kv WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        raw, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            self.delete(key)
+            return None
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raw = json.dumps(value)
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+                (key, raw, self._expiry(ttl), now)
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM kv").fetchone()
+            if count > self.max_entries:
+                conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+                (count,) = conn.execute("SELECT COUNT(*) FROM kv").fetchone()
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    conn.execute(
+                        "DELETE FROM kv WHERE key IN "
+                        "(SELECT key FROM kv ORDER BY updated_at LIMIT ?)",
+                        (overflow,)
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            self._rollback(conn)
+            raise
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def _claim(self, key: str, lease: float) -> Optional[str]:
+        conn = self._conn()
+        owner = uuid.uuid4().hex
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] > now:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (key, expires_at, owner) VALUES (?, ?, ?)",
+                (key, now + lease, owner)
+            )
+            conn.execute("COMMIT")
+            return owner
+        except Exception:
+            self._rollback(conn)
+            raise
+
+    def _release(self, key: str, owner: str) -> None:
+        self._conn().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+
+class KVServerStorage(StorageBackend):
+    """
+    Client for the local key-value server started with ``python -m services.storage``.
+    Every operation is a single newline-delimited JSON round trip and the server
+    applies them one at a time, so claims are atomic across workers.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 7379,
+        max_entries: int = 10000,
+        default_ttl: Optional[float] = 3600
+    ):
+        super().__init__(max_entries, default_ttl)
+        self.host = host
+        self.port = port
+        self._local = threading.local()
+
+    def _call(self, op: str, **kwargs) -> Any:
+        request = (json.dumps({"op": op, **kwargs}) + "\n").encode()
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            try:
+                if conn is None:
+                    sock = socket.create_connection((self.host, self.port), timeout=5)
+                    conn = (sock, sock.makefile("rb"))
+                    self._local.conn = conn
+                conn[0].sendall(request)
+                line = conn[1].readline()
+                if not line:
+                    raise ConnectionError("KV server closed the connection")
+                return json.loads(line)["result"]
+            except (OSError, ConnectionError):
+                self._local.conn = None
+                if attempt == 1:
+                    raise
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._call("get", key=key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._call("set", key=key, value=value, ttl=self.default_ttl if ttl is None else ttl)
+
+    def delete(self, key: str) -> None:
+        self._call("delete", key=key)
+
+    def _claim(self, key: str, lease: float) -> Optional[str]:
+        # A fresh owner per claim: if the reply is lost, _call's retry sends the same
+        # owner and gets the lease it already holds instead of waiting out the lease
+        owner = uuid.uuid4().hex
+        return owner if self._call("claim", key=key, lease=lease, owner=owner) else None
+
+    def _release(self, key: str, owner: str) -> None:
+        self._call("release", key=key, owner=owner)
+
+
+async def serve(host: str = "127.0.0.1", port: int = 7379, max_entries: int = 100000):
+    """Run the local key-value server backed by a ``MemoryStorage``."""
+    store = MemoryStorage(max_entries=max_entries, default_ttl=None)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                op = request["op"]
+                if op == "get":
+                    result = store.get(request["key"])
+                elif op == "set":
+                    store.set(request["key"], request["value"], request.get("ttl") or 0)
+                    result = None
+                elif op == "delete":
+                    store.delete(request["key"])
+                    result = None
+                elif op == "claim":
+                    result = store._claim(request["key"], request["lease"], request.get("owner")) is not None
+                elif op == "release":
+                    store._release(request["key"], request.get("owner"))
+                    result = None
+                else:
+                    result = None
+                writer.write((json.dumps({"result": result}) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, json.JSONDecodeError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"KV storage server listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """
+    Return the process-wide storage backend configured from the environment:
+    STORAGE_BACKEND (memory | sqlite | kv), STORAGE_SQLITE_PATH, STORAGE_KV_ADDRESS,
+    STORAGE_MAX_ENTRIES and STORAGE_DEFAULT_TTL.
+    """
+    global _storage
+    if _storage is None:
+        kind = os.getenv("STORAGE_BACKEND", "memory").lower()
+        max_entries = int(os.getenv("STORAGE_MAX_ENTRIES", "10000"))
+        default_ttl = float(os.getenv("STORAGE_DEFAULT_TTL", "3600"))
+        if kind == "sqlite":
+            default_path = Path(__file__).parent.parent / ".cache" / "storage.db"
+            _storage = SQLiteStorage(
+                os.getenv("STORAGE_SQLITE_PATH", str(default_path)),
+                max_entries=max_entries,
+                default_ttl=default_ttl
+            )
+        elif kind == "kv":
+            host, _, port = os.getenv("STORAGE_KV_ADDRESS", "127.0.0.1:7379").partition(":")
+            _storage = KVServerStorage(
+                host,
+                int(port or 7379),
+                max_entries=max_entries,
+                default_ttl=default_ttl
+            )
+        else:
+            _storage = MemoryStorage(max_entries=max_entries, default_ttl=default_ttl)
+    return _storage
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the shared KV storage server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7379)
+    parser.add_argument("--max-entries", type=int, default=100000)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.max_entries))
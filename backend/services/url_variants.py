@@ -0,0 +1,129 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+
+# ISO 639-1 codes common on documentation portals
+LOCALE_CODES = {
+    "ar", "bg", "bn", "ca", "cs", "da", "de", "el", "en", "es", "et", "fa", "fi", "fr",
+    "he", "hi", "hr", "hu", "id", "it", "ja", "ko", "lt", "lv", "ms", "nb", "nl", "no",
+    "pl", "pt", "ro", "ru", "sk", "sl", "sr", "sv", "th", "tr", "uk", "vi", "zh",
+}
+_LOCALE = re.compile(r"^([a-z]{2})(?:[-_]([a-z]{2}|hans|hant|\d{3}))?$", re.IGNORECASE)
+# v2, 2.1, v3.0.1, 4.x; a bare integer is more often a page number than a version
+_VERSION = re.compile(r"^(?:v\d+(?:\.\d+)*(?:\.x)?|\d+(?:\.\d+)*\.x|\d+(?:\.\d+)+)$", re.IGNORECASE)
+# Aliases of the newest release, best first
+VERSION_ALIASES = ["latest", "stable", "current"]
+# Pre-release channels: variants, but never preferred over a release
+PRERELEASE_ALIASES = {"next", "nightly", "dev", "main", "master", "beta", "preview", "canary", "unstable"}
+
+# At most this many skipped URLs are kept with their reasons for reporting
+MAX_REPORTED = 200
+
+
+def classify_segment(segment: str) -> Optional[str]:
+    """Classify one URL path segment as "locale", "version" or neither (None)."""
+    segment = segment.lower()
+    match = _LOCALE.match(segment)
+    if match and match.group(1) in LOCALE_CODES:
+        return "locale"
+    if _VERSION.match(segment) or segment in VERSION_ALIASES or segment in PRERELEASE_ALIASES:
+        return "version"
+    return None
+
+
+def _version_key(value: str) -> Tuple:
+    """Sort key for version values: aliases of the newest release, then releases by number."""
+    value = value.lower()
+    if value in VERSION_ALIASES:
+        return (2, -VERSION_ALIASES.index(value))
+    if value in PRERELEASE_ALIASES:
+        return (0,)
+    numbers = tuple(int(part) for part in re.findall(r"\d+", value))
+    return (1,) + numbers
+
+
+class UrlVariants:
+    """
+    Learns which URL path segments are locales (/en/, /de-de/) or versions
+    (/v2/, /3.1/, /latest/) from the links a crawl sees, and flags URLs that are
+    a non-preferred variant of the same page.
+
+    A path position only counts as a locale or version slot once two different
+    values have been seen there, so an ordinary segment that happens to look
+    like a language code ("/it/") is left alone. The preferred locale is the
+    start URL's (English if it has none); the preferred version is the newest
+    one seen, with "latest"/"stable"/"current" counting as newest.
+    """
+
+    def __init__(self, start_url: str):
+        self.start_url = start_url
+        self.start_segments = self._segments(start_url)
+        self.values: Dict[Tuple[str, int], Set[str]] = defaultdict(set)
+        self.skipped: Dict[str, Dict] = {}
+        self._skipped_urls: Set[str] = set()
+        self.observe(start_url)
+
+    @staticmethod
+    def _segments(url: str) -> List[str]:
+        return [segment.lower() for segment in urlparse(url).path.split('/') if segment]
+
+    def observe(self, url: str):
+        """Record the locale- and version-like segments of a link."""
+        for position, segment in enumerate(self._segments(url)):
+            kind = classify_segment(segment)
+            if kind:
+                self.values[(kind, position)].add(segment)
+
+    def _preferred(self, kind: str, position: int, value: str) -> Optional[str]:
+        """The preferred value for a confirmed slot if `value` is not it, else None."""
+        seen = self.values.get((kind, position), ())
+        if len(seen) < 2:
+            return None
+        if kind == "locale":
+            start = self.start_segments[position] if position < len(self.start_segments) else None
+            if start is not None and classify_segment(start) == "locale":
+                return start if value != start else None
+            # Start URL has no locale here (default language unprefixed): keep English
+            return "en" if not value.startswith("en") else None
+        newest = max(seen, key=_version_key)
+        if _version_key(value)[0] == 0 and _version_key(newest)[0] == 0:
+            # Only pre-release channels seen; nothing to prefer yet
+            return None
+        return newest if _version_key(value) < _version_key(newest) else None
+
+    def check(self, url: str) -> Optional[Dict]:
+        """Why `url` is a non-preferred variant, or None if it should be crawled."""
+        if url == self.start_url:
+            return None
+        for position, segment in enumerate(self._segments(url)):
+            kind = classify_segment(segment)
+            if not kind:
+                continue
+            preferred = self._preferred(kind, position, segment)
+            if preferred is not None:
+                return {"url": url, "kind": kind, "value": segment, "preferred": preferred}
+        return None
+
+    def skip(self, url: str) -> bool:
+        """check() and record the URL as skipped; True if it should not be fetched."""
+        reason = self.check(url)
+        if reason is None:
+            return False
+        if url not in self._skipped_urls:
+            self._skipped_urls.add(url)
+            if len(self.skipped) < MAX_REPORTED:
+                self.skipped[url] = reason
+        return True
+
+    def summary(self) -> Dict:
+        """Skipped variant count, the skipped values per kind, and the recorded URLs."""
+        values: Dict[str, Set[str]] = defaultdict(set)
+        for reason in self.skipped.values():
+            values[reason["kind"]].add(reason["value"])
+        return {
+            "count": len(self._skipped_urls),
+            "values": {kind: sorted(found) for kind, found in values.items()},
+            "urls": list(self.skipped.values()),
+        }
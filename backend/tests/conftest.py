@@ -0,0 +1,41 @@
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# Tests import the app's packages the way main.py does: run from backend/
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def kv_port():
+    """Port of a KV storage server (python -m services.storage) running for the test session."""
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "services.storage", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL
+    )
+    deadline = time.time() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if time.time() > deadline:
+                server.kill()
+                raise
+            time.sleep(0.05)
+    yield port
+    server.terminate()
+    server.wait()
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from services import admission
+from services.admission import AdmissionController, Overloaded
+
+
+def test_rejects_beyond_queue_and_release_is_idempotent():
+    async def scenario():
+        controller = AdmissionController(max_active=1, max_queued=0)
+        release = await controller.acquire()
+        with pytest.raises(Overloaded):
+            await controller.acquire()
+        assert controller.saturated()
+        release()
+        release()
+        assert controller.active == 0
+        # The slot is free again, exactly once
+        await controller.acquire()
+        assert controller.active == 1
+
+    asyncio.run(scenario())
+
+
+def test_release_skips_waiters_that_gave_up():
+    async def scenario():
+        controller = AdmissionController(max_active=1, max_queued=2)
+        release = await controller.acquire()
+        # A waiter cancelled before its task ran again is still at the head of the queue
+        abandoned = asyncio.get_running_loop().create_future()
+        abandoned.cancel()
+        controller.waiters.append(abandoned)
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        release()
+        second = await asyncio.wait_for(waiting, 1)
+        assert controller.active == 1 and not controller.waiters
+        second()
+        assert controller.active == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("STORAGE_BACKEND", "memory")
+    monkeypatch.setenv("SEARCH_INDEX_PATH", str(tmp_path / "search.db"))
+    from fastapi.testclient import TestClient
+    import main
+
+    controller = AdmissionController(max_active=1, max_queued=0)
+    monkeypatch.setattr(admission, "_admission", controller)
+    yield TestClient(main.app, raise_server_exceptions=False), main, controller
+
+
+def test_failed_stream_gives_its_slot_back(client, monkeypatch):
+    client, main, controller = client
+
+    def broken_crawler(request):
+        raise RuntimeError("crawler setup failed")
+
+    monkeypatch.setattr(main, "_crawler", broken_crawler)
+    for _ in range(3):
+        # Each failure must free the only slot, or the next request is shed with 503
+        response = client.post("/extract/stream", json={"urls": ["https://docs.example.test/"]})
+        assert response.status_code == 200
+        assert controller.active == 0
+    assert client.get("/ready").status_code == 200
@@ -0,0 +1,65 @@
+import asyncio
+import io
+import json
+
+import batch
+from batch import BatchRunner, Checkpoint
+
+
+class FakeExtractor:
+    def __init__(self, state):
+        self.state = state
+
+    async def extract_modules(self, content, **kwargs):
+        await asyncio.sleep(0.01)
+        self.state["in_flight"] -= 1
+        return [{"module": content[0]["url"], "description": "", "submodules": {}}]
+
+
+class FakeIndex:
+    def index_url(self, url, modules):
+        pass
+
+
+def test_urls_in_flight_are_bounded(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(batch, "get_search_index", FakeIndex)
+    output = io.StringIO()
+    runner = BatchRunner(output, Checkpoint(tmp_path / "run.checkpoint"), crawl_concurrency=4, llm_concurrency=2)
+    state = {"in_flight": 0, "peak": 0}
+
+    async def crawl(url):
+        # Crawls finish much faster than extractions, so crawled content would queue up for the LLM
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.001)
+        return f"content of {url}"
+
+    runner._crawl = crawl
+    runner.extractor = FakeExtractor(state)
+    urls = [f"https://docs{i}.test/" for i in range(40)]
+    asyncio.run(runner.run(urls))
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(result["url"] for result in results) == sorted(urls)
+    assert all(result["status"] == "ok" for result in results)
+    assert state["peak"] <= 6
+
+
+def test_checkpoint_spools_crawls_until_done(tmp_path):
+    path = tmp_path / "run.checkpoint"
+    checkpoint = Checkpoint(path)
+    checkpoint.record_crawled("https://a.test/", "text of a")
+    checkpoint.record_crawled("https://b.test/", "text of b")
+    checkpoint.record_done("https://a.test/", "ok")
+    checkpoint.record_done("https://b.test/", "failed")
+    checkpoint.close()
+
+    # Only content is spooled; the log holds file names
+    assert "text of" not in path.read_text()
+    resumed = Checkpoint(path)
+    assert resumed.crawled_content("https://a.test/") is None
+    assert resumed.crawled_content("https://b.test/") == "text of b"
+    assert resumed.done == {"https://a.test/": "ok", "https://b.test/": "failed"}
+    assert [p.name for p in resumed.content_dir.iterdir()] == [Checkpoint._content_name("https://b.test/")]
+    resumed.close()
@@ -0,0 +1,20 @@
+import asyncio
+
+from services.crawler import DocumentationCrawler
+from services.deadline import Deadline
+from services.storage import MemoryStorage
+
+
+def test_fetch_at_the_deadline_is_not_held_against_the_host():
+    crawler = DocumentationCrawler(storage=MemoryStorage(), use_profiles=False)
+    host = "deadline.example.test"
+    before = crawler.resilience.breaker(host).summary()
+    # Not yet expired, but too little time left to start a download
+    crawler.deadline = Deadline(0.01)
+
+    url, text, soup = asyncio.run(crawler._fetch_page_with_soup(f"https://{host}/docs/"))
+
+    assert (text, soup) == ("", None)
+    assert crawler.partial
+    assert crawler.fetch_log == []
+    assert crawler.resilience.breaker(host).summary() == before
@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+import pytest
+
+from services.extractor import ModuleExtractor
+from services.storage import MemoryStorage
+
+
+SOURCES = [
+    {"url": f"https://site{i}.test/docs/", "content": f"Site {i} documents its Billing and Reports features."}
+    for i in range(3)
+]
+
+
+def module(name, submodules=True):
+    return {"module": name, "description": "d", "submodules": {f"{name} Export": "e"} if submodules else {}}
+
+
+def source_modules(index, submodules=True):
+    return [module(f"Site{index} Billing", submodules), module(f"Site{index} Reports", submodules)]
+
+
+def make_extractor(monkeypatch, answer, cascade=""):
+    """An extractor whose LLM calls are answered by `answer(prompt, model)`; calls are recorded."""
+    monkeypatch.setenv("OPENAI_CASCADE_MODELS", cascade)
+    monkeypatch.setenv("OPENAI_MODEL", "solo")
+    extractor = ModuleExtractor(storage=MemoryStorage(), client=object())
+    extractor.calls = []
+
+    async def stream_text(prompt, model=None, state=None, timeout=None, max_tokens=None):
+        batched = "numbered SOURCE 1" in prompt
+        model = model or extractor.model
+        extractor.calls.append({"batched": batched, "model": model, "max_tokens": max_tokens})
+        text = answer(prompt, model, batched)
+        if isinstance(text, Exception):
+            raise text
+        if state is not None:
+            state["finish_reason"] = "stop"
+        yield text
+
+    extractor._stream_text = stream_text
+    return extractor
+
+
+def single_source_index(prompt):
+    return next(i for i, source in enumerate(SOURCES) if source["url"] in prompt)
+
+
+def batch_answer(modules_per_source):
+    return json.dumps({"sources": [
+        {"source": index + 1, "modules": modules} for index, modules in enumerate(modules_per_source)
+    ]})
+
+
+def run_batch(extractor, content=SOURCES):
+    reports = [{} for _ in content]
+    return asyncio.run(extractor.extract_batch(content, reports=reports)), reports
+
+
+def test_fenced_batch_answer_is_split(monkeypatch):
+    def answer(prompt, model, batched):
+        assert batched, "no source should fall back"
+        body = batch_answer([source_modules(i) for i in range(len(SOURCES))])
+        return f"Here are the modules:\n```json\n{body}\n```"
+
+    extractor = make_extractor(monkeypatch, answer)
+    results, reports = run_batch(extractor)
+
+    assert [[m["module"] for m in result] for result in results] == [
+        [f"Site{i} Billing", f"Site{i} Reports"] for i in range(len(SOURCES))
+    ]
+    assert len(extractor.calls) == 1
+    assert all(report["batched"] == len(SOURCES) for report in reports)
+
+
+def test_missing_source_falls_back_to_its_own_call(monkeypatch):
+    def answer(prompt, model, batched):
+        if batched:
+            # Source 2 is left out of the batched answer
+            return json.dumps({"sources": [
+                {"source": 1, "modules": source_modules(0)},
+                {"source": 3, "modules": source_modules(2)},
+            ]})
+        return json.dumps({"modules": source_modules(single_source_index(prompt))})
+
+    extractor = make_extractor(monkeypatch, answer)
+    results, reports = run_batch(extractor)
+
+    assert results[1][0]["module"] == "Site1 Billing"
+    assert [call["batched"] for call in extractor.calls] == [True, False]
+    assert "batched" not in reports[1]
+
+
+def test_failed_batch_call_falls_back_for_every_source(monkeypatch):
+    def answer(prompt, model, batched):
+        if batched:
+            return RuntimeError("provider rejected the request")
+        return json.dumps({"modules": source_modules(single_source_index(prompt))})
+
+    extractor = make_extractor(monkeypatch, answer)
+    results, _ = run_batch(extractor)
+
+    assert [result[0]["module"] for result in results] == [f"Site{i} Billing" for i in range(len(SOURCES))]
+    assert [call["batched"] for call in extractor.calls] == [True, False, False, False]
+
+
+def test_thin_batched_answer_escalates_and_is_not_cached(monkeypatch):
+    def answer(prompt, model, batched):
+        if batched:
+            # Source 1 comes back without any submodules from the cheap tier
+            return batch_answer([source_modules(0, submodules=False), source_modules(1), source_modules(2)])
+        index = single_source_index(prompt)
+        return json.dumps({"modules": source_modules(index, submodules=model == "large")})
+
+    extractor = make_extractor(monkeypatch, answer, cascade="small,large")
+    results, reports = run_batch(extractor)
+
+    assert results[0][0]["submodules"]
+    assert reports[0]["model"] == "large"
+    assert reports[1]["model"] == "small" and reports[1]["batched"] == len(SOURCES)
+    assert [(call["batched"], call["model"]) for call in extractor.calls] == [
+        (True, "small"), (False, "small"), (False, "large")
+    ]
+
+    # A later single-source request is answered from the cache with the escalated result
+    extractor.calls.clear()
+    report = {}
+    modules = asyncio.run(extractor.extract_modules([SOURCES[0]], report=report))
+    assert modules == results[0]
+    assert report["cached"] and not extractor.calls
+
+
+@pytest.mark.parametrize("max_tokens, expected", [("1000", 3000), ("4000", 8192)])
+def test_batch_output_budget_is_capped(monkeypatch, max_tokens, expected):
+    monkeypatch.setenv("MAX_TOKENS", max_tokens)
+    extractor = make_extractor(monkeypatch, lambda prompt, model, batched: batch_answer(
+        [source_modules(i) for i in range(len(SOURCES))]
+    ))
+    run_batch(extractor)
+    assert extractor.calls[0]["max_tokens"] == expected
@@ -0,0 +1,43 @@
+import asyncio
+
+from evaluation.fixtures import initech_site
+from services.crawler import DocumentationCrawler
+from services.snapshot import SnapshotReader
+from services.storage import MemoryStorage
+
+
+def large_site_crawler(tmp_path, max_content_length=40000):
+    site = initech_site()
+    reader = SnapshotReader(site.archive(str(tmp_path / "site")).snapshot)
+    crawler = DocumentationCrawler(
+        storage=MemoryStorage(), replay=reader, large_site=True, state_dir=str(tmp_path / "state"),
+        max_content_length=max_content_length
+    )
+    return site, crawler
+
+
+def test_content_is_available_while_a_large_site_crawl_runs(tmp_path):
+    site, crawler = large_site_crawler(tmp_path)
+
+    async def scenario():
+        task = asyncio.ensure_future(crawler.crawl_documentation(site.start_url))
+        await asyncio.wait_for(crawler.page_added.wait(), 10)
+        # What a deadline cancellation here would extract from
+        early = crawler.collected_content(), list(crawler.collected_pages())
+        return early, await task
+
+    (early_content, early_pages), content = asyncio.run(scenario())
+    assert early_pages and early_content
+    assert content.startswith(early_content)
+    assert crawler.collected_content() == content
+    assert len(crawler.collected_pages()) == len(crawler.page_log)
+
+
+def test_large_site_pages_in_memory_are_bounded(tmp_path):
+    site, crawler = large_site_crawler(tmp_path, max_content_length=500)
+    content = asyncio.run(crawler.crawl_documentation(site.start_url))
+
+    assert len(content) == 500
+    # The whole crawl is spooled, but only the first 500 characters of page text stay in memory
+    assert crawler.spool_path.stat().st_size > 500
+    assert len(crawler.collected_pages()) < len(crawler.page_log)
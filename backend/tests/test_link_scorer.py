@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+import services.crawler
+from evaluation.fixtures import FixtureSite
+from services.crawler import DocumentationCrawler
+from services.frontier import MemoryFrontier, SQLiteFrontier
+from services.link_scorer import LinkScorer
+from services.snapshot import SnapshotReader
+from services.storage import MemoryStorage
+
+
+MODULES = ["Billing", "Reporting", "Access Control", "Notifications", "Inventory", "Workflows"]
+
+# What a docs home page links before its content: version pickers, languages, account links
+CHROME = [
+    ("/docs/v1/", "v1.0"), ("/docs/v2/", "v2.0"), ("/docs/latest/", "latest"),
+    ("/docs/de/", "Deutsch"), ("/docs/fr/", "Français"), ("/docs/ja/", "日本語"),
+    ("/login/", "Log in"), ("/signup/", "Sign up"), ("/pricing/", "Pricing"),
+    ("/blog/", "Blog"), ("/changelog/", "Changelog"), ("/contact/", "Contact"),
+]
+
+
+def _page(title: str, links) -> str:
+    items = "".join(f'<li><a href="{href}">{text}</a></li>' for href, text in links)
+    return f"<html><body><main><h1>{title}</h1><p>{title} documentation.</p><ul>{items}</ul></main></body></html>"
+
+
+def chrome_first_site() -> FixtureSite:
+    """A site whose pages list twelve chrome links before the six module guides."""
+    base = "https://chrome.test"
+    module_links = [(f"/docs/{module.lower().replace(' ', '-')}/", f"{module} guide") for module in MODULES]
+    pages = {f"{base}/docs/": _page("Docs", CHROME + module_links)}
+    for href, text in CHROME:
+        pages[f"{base}{href}"] = _page(text, CHROME)
+    for (href, _), module in zip(module_links, MODULES):
+        pages[f"{base}{href}"] = _page(module, CHROME + module_links)
+    reference = [{"module": module, "description": "", "submodules": {}} for module in MODULES]
+    return FixtureSite("chrome", f"{base}/docs/", pages, reference)
+
+
+class DocumentOrderScorer(LinkScorer):
+    """The crawl order before best-first ranking: links in page order."""
+
+    def score(self, url: str, anchor: str, depth: int) -> float:
+        return 0.0
+
+
+def fetches_to_cover_modules(site: FixtureSite, tmp_path, max_pages: int = 20):
+    """Pages fetched until every module page was crawled, or None if the budget ran out first."""
+    reader = SnapshotReader(site.archive(str(tmp_path)).snapshot)
+    crawler = DocumentationCrawler(
+        storage=MemoryStorage(), replay=reader, max_pages=max_pages, collapse_variants=False
+    )
+    asyncio.run(crawler.crawl_documentation(site.start_url))
+    wanted = {url for url in site.pages if any(f"/docs/{m.lower().replace(' ', '-')}/" in url for m in MODULES)}
+    for fetched, page in enumerate(crawler.page_log, start=1):
+        wanted.discard(page["url"])
+        if not wanted:
+            return fetched
+    return None
+
+
+def test_best_first_covers_modules_in_fewer_fetches(tmp_path, monkeypatch):
+    site = chrome_first_site()
+    best_first = fetches_to_cover_modules(site, tmp_path / "best")
+    monkeypatch.setattr(services.crawler, "LinkScorer", DocumentOrderScorer)
+    document_order = fetches_to_cover_modules(site, tmp_path / "order")
+
+    # Start page plus one fetch per module page
+    assert best_first == 1 + len(MODULES)
+    # Page order spends the budget on chrome first (links_per_page keeps only the first ten)
+    assert document_order is None
+
+
+def test_scorer_prefers_module_links_over_chrome():
+    scorer = LinkScorer("https://x.test/docs/")
+    module = scorer.score("https://x.test/docs/billing/", "Billing guide", 1)
+    for href, text in CHROME:
+        assert scorer.score(f"https://x.test{href}", text, 1) < module
+
+
+def test_scorer_counts_stay_bounded():
+    scorer = LinkScorer("https://x.test/docs/", max_tracked=100)
+    for i in range(1000):
+        scorer.record_link("https://x.test/docs/popular/", "Popular")
+        scorer.record_link(f"https://x.test/docs/page-{i}/", f"Page {i}")
+    assert len(scorer.inlinks) <= 100
+    assert len(scorer.anchor_counts) <= 100
+    # Frequently linked URLs and repeated anchors survive pruning
+    assert scorer.inlinks["https://x.test/docs/popular/"] > 1
+    assert scorer.anchor_counts["popular"] > 1
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def frontier(request, tmp_path):
+    queue = MemoryFrontier() if request.param == "memory" else SQLiteFrontier(str(tmp_path))
+    yield queue
+    queue.close()
+
+
+def test_frontier_pops_best_first(frontier):
+    frontier.push("a", 1, 1.0)
+    frontier.push("b", 1, 3.0)
+    frontier.push("c", 1, 2.0)
+    assert [frontier.pop()[0] for _ in range(3)] == ["b", "c", "a"]
+    assert frontier.pop() is None
+
+
+def test_frontier_update_keeps_highest_priority(frontier):
+    frontier.push("a", 1, 5.0)
+    frontier.push("b", 1, 4.0)
+    # A later, weaker link to "a" must not demote it
+    frontier.update("a", 1.0)
+    frontier.update("b", 6.0)
+    assert frontier.pop()[0] == "b"
+    assert frontier.pop()[0] == "a"
@@ -0,0 +1,42 @@
+import tracemalloc
+
+import pytest
+
+from services.memory import MemoryProfiler
+
+
+@pytest.fixture
+def profiler():
+    was_tracing = tracemalloc.is_tracing()
+    profiler = MemoryProfiler(enabled=True, frames=1, snapshot_every=1000)
+    # Spend the first (sampled) call of each stage so no sample clears the traces mid-test
+    for name in ("outer", "inner"):
+        with profiler.stage(name):
+            pass
+    yield profiler
+    if not was_tracing:
+        tracemalloc.stop()
+
+
+def test_overlapping_stage_keeps_its_peak(profiler):
+    outer = profiler.stage("outer")
+    outer.__enter__()
+    spike = bytearray(8_000_000)
+    del spike
+    # A stage starting now (as in a concurrent request) must not wipe the spike above
+    with profiler.stage("inner"):
+        pass
+    outer.__exit__(None, None, None)
+
+    assert profiler.stages["outer"]["peak_bytes"] >= 8_000_000
+    assert profiler.stages["outer"]["unmeasured"] == 0
+
+
+def test_sequential_stage_peak_is_its_own(profiler):
+    with profiler.stage("outer"):
+        spike = bytearray(8_000_000)
+        del spike
+    with profiler.stage("inner"):
+        pass
+    # The earlier stage's spike is not charged to the next one
+    assert profiler.stages["inner"]["peak_bytes"] < 1_000_000
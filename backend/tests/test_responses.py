@@ -0,0 +1,41 @@
+import asyncio
+import gzip
+import json
+import threading
+
+from starlette.requests import Request
+
+from services import responses
+from services.responses import MIN_COMPRESS_BYTES, THREADPOOL_COMPRESS_BYTES, json_response
+
+
+def _request():
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/jobs/1",
+        "headers": [(b"accept-encoding", b"gzip")],
+    })
+
+
+def test_large_bodies_are_compressed_off_the_loop(monkeypatch):
+    threads = []
+    original = responses.compress
+
+    def compress(body, encoding):
+        threads.append(threading.get_ident())
+        return original(body, encoding)
+
+    monkeypatch.setattr(responses, "compress", compress)
+
+    async def scenario(size):
+        payload = {"text": "x" * size}
+        response = await json_response(_request(), payload)
+        assert response.headers["content-encoding"] == "gzip"
+        assert json.loads(gzip.decompress(response.body)) == payload
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario(MIN_COMPRESS_BYTES))
+    assert threads.pop() == loop_thread
+    loop_thread = asyncio.run(scenario(THREADPOOL_COMPRESS_BYTES))
+    assert threads.pop() != loop_thread
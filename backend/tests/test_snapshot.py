@@ -0,0 +1,14 @@
+from services.snapshot import RawResponse, SnapshotWriter, iter_records
+
+
+def test_write_after_close_is_dropped(tmp_path):
+    path = tmp_path / "site.warc.gz"
+    writer = SnapshotWriter(path, "https://docs.example.test/", {})
+    writer.write_response(RawResponse("https://docs.example.test/", 200, "OK", {}, b"<html></html>"))
+    writer.close()
+    # A page write that was still running in a thread when the crawl was cancelled
+    writer.write_response(RawResponse("https://docs.example.test/late", 200, "OK", {}, b"late"))
+
+    records = [headers["WARC-Type"] for headers, _ in iter_records(str(path))]
+    assert records == ["warcinfo", "response"]
+    assert writer.records == 2
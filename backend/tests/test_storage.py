@@ -0,0 +1,167 @@
+import asyncio
+import multiprocessing
+import time
+
+import pytest
+
+from services.storage import KVServerStorage, MemoryStorage, SQLiteStorage
+
+
+WORKERS = 4
+
+
+def open_storage(spec):
+    kind, target = spec
+    if kind == "sqlite":
+        return SQLiteStorage(target)
+    return KVServerStorage("127.0.0.1", target)
+
+
+def compute_once(spec, key, counter_path, barrier, results):
+    """Worker: race the others to compute `key`; each computation appends a line to counter_path."""
+    storage = open_storage(spec)
+
+    def compute():
+        with open(counter_path, "a") as f:
+            f.write("x\n")
+        # Long enough that every other worker arrives while the value is missing
+        time.sleep(0.5)
+        return {"computed_by": multiprocessing.current_process().name}
+
+    barrier.wait()
+    results.put(storage.get_or_compute(key, compute, poll_interval=0.01))
+
+
+def increment(spec, key, times, barrier, results):
+    """Worker: read-modify-write a shared counter."""
+    storage = open_storage(spec)
+    barrier.wait()
+    for _ in range(times):
+        storage.update(key, lambda value: (value or 0) + 1, poll_interval=0.001)
+    results.put(None)
+
+
+@pytest.fixture(params=["sqlite", "kv"])
+def spec(request, tmp_path):
+    if request.param == "sqlite":
+        return "sqlite", str(tmp_path / "storage.db")
+    return "kv", request.getfixturevalue("kv_port")
+
+
+def run_workers(target, *args):
+    """Run `target` in WORKERS fresh processes started together; returns what each put on its queue."""
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(WORKERS), context.Queue()
+    workers = [context.Process(target=target, args=(*args, barrier, results)) for _ in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    values = [results.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    return values
+
+
+def test_get_or_compute_runs_once_across_processes(spec, tmp_path):
+    key = f"shared:{time.time()}"
+    counter = tmp_path / "computations"
+    results = run_workers(compute_once, spec, key, str(counter))
+
+    assert counter.read_text().count("x") == 1
+    # Everyone got the one computed value
+    assert len({result["computed_by"] for result in results}) == 1
+
+
+def test_update_is_atomic_across_processes(spec):
+    key = f"counter:{time.time()}"
+    run_workers(increment, spec, key, 25)
+    assert open_storage(spec).get(key) == WORKERS * 25
+
+
+def test_async_helpers(spec):
+    storage = open_storage(spec)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return ["value"]
+
+    async def scenario():
+        key = f"async:{time.time()}"
+        first = await storage.aget_or_compute(key, compute)
+        second = await storage.aget_or_compute(key, compute)
+        await storage.aset(f"{key}:other", {"a": 1})
+        return first, second, await storage.aget(f"{key}:other")
+
+    assert asyncio.run(scenario()) == (["value"], ["value"], {"a": 1})
+    assert len(calls) == 1
+
+
+def test_waiter_gives_up_at_its_wait_timeout(spec):
+    storage = open_storage(spec)
+    key = f"slow:{time.time()}"
+    # Another worker is computing the key and will hold its lease for a minute
+    holder = storage._claim(key, 60)
+
+    async def compute():
+        return "local"
+
+    started = time.monotonic()
+    assert asyncio.run(storage.aget_or_compute(key, compute, wait_timeout=0.2)) == "local"
+    assert time.monotonic() - started < 2
+    storage._release(key, holder)
+
+
+def test_retried_kv_claim_keeps_its_lease(kv_port):
+    storage = KVServerStorage("127.0.0.1", kv_port)
+    key = f"lease:{time.time()}"
+    # The same claim sent twice, as when the first reply was lost and _call retried
+    assert storage._call("claim", key=key, lease=60, owner="a") is True
+    assert storage._call("claim", key=key, lease=60, owner="a") is True
+    assert storage._call("claim", key=key, lease=60, owner="b") is False
+    # Another owner's release does not free it; the holder's does
+    storage._call("release", key=key, owner="b")
+    assert storage._call("claim", key=key, lease=60, owner="b") is False
+    storage._call("release", key=key, owner="a")
+    assert storage._call("claim", key=key, lease=60, owner="b") is True
+
+
+def test_expired_holder_does_not_release_the_next_lease(spec):
+    storage = open_storage(spec)
+    key = f"takeover:{time.time()}"
+    slow = storage._claim(key, 0.05)
+    time.sleep(0.1)
+    # The slow holder's lease ran out and another worker took over
+    current = storage._claim(key, 60)
+    assert slow is not None and current is not None
+    storage._release(key, slow)
+    assert storage._claim(key, 60) is None
+    storage._release(key, current)
+    assert storage._claim(key, 60) is not None
+
+
+@pytest.mark.parametrize("make", [
+    lambda tmp_path: MemoryStorage(max_entries=5),
+    lambda tmp_path: SQLiteStorage(str(tmp_path / "bounded.db"), max_entries=5),
+], ids=["memory", "sqlite"])
+def test_bounded_size_and_ttl(make, tmp_path):
+    storage = make(tmp_path)
+    for i in range(10):
+        storage.set(f"k{i}", i)
+    assert storage.get("k0") is None
+    assert storage.get("k9") == 9
+
+    storage.set("short", "lived", ttl=0.05)
+    assert storage.get("short") == "lived"
+    time.sleep(0.1)
+    assert storage.get("short") is None
+
+
+def test_failed_sqlite_write_keeps_its_error(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "error.db"))
+    conn = storage._conn()
+    conn.execute("DROP TABLE kv")
+    # The statement error surfaces, not a follow-up error from ROLLBACK
+    with pytest.raises(Exception, match="no such table"):
+        storage.set("key", "value")
+    assert not conn.in_transaction
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from evaluation.fixtures import initech_site
+from services.crawler import DocumentationCrawler
+from services.snapshot import SnapshotReader
+from services.storage import MemoryStorage
+from services.url_variants import UrlVariants, classify_segment
+
+
+def crawl_fixture(tmp_path, collapse_variants: bool, max_pages: int = 20):
+    site = initech_site()
+    reader = SnapshotReader(site.archive(str(tmp_path)).snapshot)
+    crawler = DocumentationCrawler(
+        storage=MemoryStorage(), replay=reader, max_pages=max_pages, collapse_variants=collapse_variants
+    )
+    content = asyncio.run(crawler.crawl_documentation(site.start_url))
+    return site, crawler, content
+
+
+def crawled_modules(site, crawler):
+    """Reference modules whose page (in any variant) the crawl fetched."""
+    paths = {page["url"].rstrip("/").rsplit("/", 1)[-1] for page in crawler.page_log}
+    return {module["module"] for module in site.reference if module["module"].lower().replace(" ", "-") in paths}
+
+
+def test_fixture_crawl_stays_on_preferred_variant(tmp_path):
+    site, crawler, _ = crawl_fixture(tmp_path, collapse_variants=True)
+    crawled = [page["url"] for page in crawler.page_log]
+
+    # Only the start URL's locale and the newest version are fetched: the start page and six modules
+    assert all("/docs/en/v3/" in url for url in crawled)
+    assert len(crawled) == 7
+    assert crawled_modules(site, crawler) == {module["module"] for module in site.reference}
+
+    skipped = crawler.skipped_variants()
+    assert skipped["count"] > 0
+    assert skipped["values"] == {"locale": ["de", "fr"], "version": ["v2"]}
+    for reason in skipped["urls"]:
+        assert reason["preferred"] == ("en" if reason["kind"] == "locale" else "v3")
+
+
+def test_collapsing_variants_saves_fetches(tmp_path):
+    site, collapsed, _ = crawl_fixture(tmp_path / "collapsed", collapse_variants=True)
+    _, uncollapsed, _ = crawl_fixture(tmp_path / "all", collapse_variants=False)
+
+    # Same modules covered, but without collapsing the rest of the budget goes to translations and v2
+    assert crawled_modules(site, uncollapsed) == crawled_modules(site, collapsed)
+    assert len(uncollapsed.page_log) == 20
+    assert len(collapsed.page_log) == 7
+    assert uncollapsed.skipped_variants()["count"] == 0
+
+
+@pytest.mark.parametrize("segment, kind", [
+    ("en", "locale"), ("de-de", "locale"), ("zh_hans", "locale"), ("pt-br", "locale"),
+    ("v2", "version"), ("3.1", "version"), ("4.x", "version"), ("latest", "version"), ("nightly", "version"),
+    ("docs", None), ("2024", None), ("billing", None),
+])
+def test_classify_segment(segment, kind):
+    assert classify_segment(segment) == kind
+
+
+def test_single_value_slot_is_not_a_variant():
+    variants = UrlVariants("https://x.test/docs/")
+    variants.observe("https://x.test/it/overview/")
+    # "it" could be a language code, but no other value was seen in that position
+    assert variants.check("https://x.test/it/overview/") is None
+
+
+def test_prefers_start_locale_and_newest_version():
+    variants = UrlVariants("https://x.test/docs/fr/v2/")
+    for url in ("https://x.test/docs/de/v2/", "https://x.test/docs/fr/v1/", "https://x.test/docs/fr/latest/"):
+        variants.observe(url)
+
+    assert variants.check("https://x.test/docs/de/v2/page/")["preferred"] == "fr"
+    assert variants.check("https://x.test/docs/fr/v1/page/")["preferred"] == "latest"
+    assert variants.check("https://x.test/docs/fr/latest/page/") is None
+
+
+def test_unprefixed_start_url_prefers_english():
+    variants = UrlVariants("https://x.test/guide/")
+    variants.observe("https://x.test/de/guide/")
+    variants.observe("https://x.test/en/guide/")
+    assert variants.check("https://x.test/de/guide/")["preferred"] == "en"
+    assert variants.check("https://x.test/en/guide/") is None
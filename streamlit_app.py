@@ -1,8 +1,10 @@
 import streamlit as st
 import requests
 import json
+import threading
 import pandas as pd
 from typing import List
+from urllib.parse import urlparse, urlunparse
 
 # Page configuration
 st.set_page_config(
@@ -158,314 +160,242 @@ BACKEND_URL = st.sidebar.text_input(
     help="URL of the FastAPI backend server"
 )
 
-def extract_modules(urls: List[str]) -> dict:
-    """Call the backend API to extract modules."""
+PAGE_SIZES = [10, 25, 50, 100]
+
+# Set by the cached fetch when it actually runs, i.e. on a cache miss.
+# Each Streamlit session runs its script in its own thread.
+_fetch_marker = threading.local()
+
+
+def normalize_urls(urls: List[str]) -> tuple:
+    """Canonical, order-independent form of a URL set, used as the cache key."""
+    normalized = set()
+    for url in urls:
+        parsed = urlparse(url.strip())
+        path = parsed.path.rstrip('/') or '/'
+        normalized.add(urlunparse((
+            parsed.scheme.lower(), parsed.netloc.lower(), path, parsed.params, parsed.query, ''
+        )))
+    return tuple(sorted(normalized))
+
+
+class PartialResult(Exception):
+    """A result the backend's deadline cut short; raised so st.cache_data does not keep it."""
+
+    def __init__(self, result: dict):
+        super().__init__("partial result")
+        self.result = result
+
+
+@st.cache_data(ttl=3600, max_entries=50, show_spinner=False)
+def fetch_extraction(backend_url: str, url_key: tuple, _urls: tuple) -> dict:
+    """
+    POST the URLs as entered to the backend. Cached per backend URL and
+    normalized URL set (`url_key`); `_urls` is left out of the cache key by its
+    leading underscore. Errors and partial results are not cached.
+    """
+    _fetch_marker.miss = True
+    response = requests.post(
+        f"{backend_url}/extract",
+        json={"urls": list(_urls)},
+        timeout=300  # 5 minutes timeout
+    )
+    response.raise_for_status()
+    result = response.json()
+    if result.get("partial"):
+        raise PartialResult(result)
+    return result
+
+
+def extract_modules(urls: tuple) -> dict:
+    """Call the backend API to extract modules, reusing cached results on reruns."""
+    stats = st.session_state.setdefault("cache_stats", {"hits": 0, "misses": 0})
+    url_key = (BACKEND_URL, normalize_urls(urls))
+    partial = st.session_state.get("partial_result")
+    if partial is not None and partial[0] == url_key:
+        # Reruns of this session (paging, detail selection) reuse it; a new request fetches again
+        st.session_state["last_fetch_cached"] = False
+        return partial[1]
+    _fetch_marker.miss = False
     try:
-        response = requests.post(
-            f"{BACKEND_URL}/extract",
-            json={"urls": urls},
-            timeout=300  # 5 minutes timeout
-        )
-        response.raise_for_status()
-        return response.json()
+        result = fetch_extraction(BACKEND_URL, url_key[1], urls)
+    except PartialResult as e:
+        stats["misses"] += 1
+        st.session_state["partial_result"] = (url_key, e.result)
+        st.session_state["last_fetch_cached"] = False
+        return e.result
     except requests.exceptions.RequestException as e:
         st.error(f"Error calling backend API: {str(e)}")
+        # Don't retry the failed request on every rerun
+        st.session_state.pop("active_urls", None)
         return None
+    stats["misses" if _fetch_marker.miss else "hits"] += 1
+    st.session_state["last_fetch_cached"] = not _fetch_marker.miss
+    return result
+
+
+def stat_boxes(values: List[tuple]):
+    """Render a row of statistic boxes from (number, label) pairs."""
+    for col, (number, label) in zip(st.columns(len(values)), values):
+        with col:
+            st.markdown(f"""
+            <div class="stat-box">
+                <div class="stat-number">{number}</div>
+                <div class="stat-label">{label}</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+
+def paginate(items: List, key: str) -> tuple:
+    """Show page controls and return the current page's items and its start offset."""
+    if len(items) <= PAGE_SIZES[0]:
+        return items, 0
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size")
+    pages = max(1, -(-len(items) // page_size))
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    start = (page - 1) * page_size
+    with col3:
+        st.caption(f"Showing {start + 1}–{min(start + page_size, len(items))} of {len(items)} modules")
+    return items[start:start + page_size], start
+
+
+def module_rows(modules: List[dict], offset: int = 0) -> List[dict]:
+    """Summary table rows for a page of modules."""
+    rows = []
+    for idx, module in enumerate(modules, offset + 1):
+        submodules = module.get('submodules', {})
+        # Create submodule list with descriptions
+        submodule_details = [
+            f"{sub_name}: {sub_desc[:50]}..." for sub_name, sub_desc in list(submodules.items())[:5]
+        ]
+        submodule_list = " | ".join(submodule_details) if submodule_details else "No submodules"
+        if len(submodules) > 5:
+            submodule_list += f" | ... and {len(submodules) - 5} more"
+        rows.append({
+            "#": idx,
+            "Module Name": module.get('module', 'Unknown Module'),
+            "Description": module.get('description', ''),
+            "Submodules Count": len(submodules),
+            "Submodules": submodule_list
+        })
+    return rows
+
+
+MODULE_COLUMNS = {
+    "#": st.column_config.NumberColumn("#", width="small", format="%d"),
+    "Module Name": st.column_config.TextColumn(
+        "Module Name",
+        width="medium",
+        help="Name of the extracted module"
+    ),
+    "Description": st.column_config.TextColumn(
+        "Description",
+        width="large",
+        help="Description of the module"
+    ),
+    "Submodules Count": st.column_config.NumberColumn(
+        "Submodules",
+        width="small",
+        format="%d",
+        help="Number of submodules"
+    ),
+    "Submodules": st.column_config.TextColumn(
+        "Submodules List",
+        width="xlarge",
+        help="List of submodules with descriptions"
+    )
+}
+
+
+def display_module_page(modules: List[dict], key: str):
+    """
+    Render one page of a module list as a single table, with submodule details
+    loaded only for the module the user selects.
+    """
+    page, offset = paginate(modules, key)
+    st.dataframe(
+        pd.DataFrame(module_rows(page, offset)),
+        use_container_width=True,
+        hide_index=True,
+        column_config=MODULE_COLUMNS
+    )
+
+    with_submodules = [m for m in page if m.get('submodules')]
+    if not with_submodules:
+        return
+    names = ["—"] + [f"{m.get('module', 'Unknown Module')} ({len(m['submodules'])} submodules)" for m in with_submodules]
+    choice = st.selectbox("🔹 Show submodules for", range(len(names)), format_func=lambda i: names[i], key=f"{key}_detail")
+    if choice:
+        module = with_submodules[choice - 1]
+        if module.get('description'):
+            st.markdown(f"**Description:** {module['description']}")
+        st.dataframe(
+            pd.DataFrame(
+                [{"Submodule Name": name, "Submodule Description": desc} for name, desc in module['submodules'].items()]
+            ),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Submodule Name": st.column_config.TextColumn("Submodule Name", width="medium"),
+                "Submodule Description": st.column_config.TextColumn("Description", width="large")
+            }
+        )
+
 
 def display_modules_by_url(modules_by_url: List[dict]):
     """Display modules in separate tables for each URL."""
     if not modules_by_url or len(modules_by_url) == 0:
         st.info(" No modules found in the documentation.")
         return
-    
+
     # Calculate overall statistics
-    total_modules = 0
-    total_submodules = 0
-    for url_data in modules_by_url:
-        modules = url_data.get('modules', [])
-        total_modules += len(modules)
-        total_submodules += sum(len(m.get('submodules', {})) for m in modules)
-    
-    # Overall statistics
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown(f"""
-        <div class="stat-box">
-            <div class="stat-number">{len(modules_by_url)}</div>
-            <div class="stat-label">URLs Processed</div>
-        </div>
-        """, unsafe_allow_html=True)
-    with col2:
-        st.markdown(f"""
-        <div class="stat-box">
-            <div class="stat-number">{total_modules}</div>
-            <div class="stat-label">Total Modules</div>
-        </div>
-        """, unsafe_allow_html=True)
-    with col3:
-        st.markdown(f"""
-        <div class="stat-box">
-            <div class="stat-number">{total_submodules}</div>
-            <div class="stat-label">Total Submodules</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
+    total_modules = sum(len(url_data.get('modules', [])) for url_data in modules_by_url)
+    total_submodules = sum(
+        len(m.get('submodules', {})) for url_data in modules_by_url for m in url_data.get('modules', [])
+    )
+    stat_boxes([
+        (len(modules_by_url), "URLs Processed"),
+        (total_modules, "Total Modules"),
+        (total_submodules, "Total Submodules"),
+    ])
+
     st.markdown("---")
-    
+
     # Display separate table for each URL
     for url_idx, url_data in enumerate(modules_by_url, 1):
         url = url_data.get('url', 'Unknown URL')
         modules = url_data.get('modules', [])
-        
+
+        st.markdown(f"### 📄 URL {url_idx}: {url}")
         if not modules:
-            st.markdown(f"### 📄 URL {url_idx}: {url}")
             st.info(f"No modules found in this documentation URL.")
             st.markdown("---")
             continue
-        
-        # Header for this URL's table
-        st.markdown(f"### 📄 URL {url_idx}: {url}")
+
         st.markdown(f"**Extracted {len(modules)} module(s) from this documentation source**")
-        st.markdown("")
-        
-        # Prepare table data for this URL
-        table_data = []
-        for idx, module in enumerate(modules, 1):
-            module_name = module.get('module', 'Unknown Module')
-            description = module.get('description', '')
-            submodules = module.get('submodules', {})
-            submodule_count = len(submodules)
-            
-            # Create submodule list with descriptions
-            submodule_details = []
-            for sub_name, sub_desc in list(submodules.items())[:5]:  # First 5
-                submodule_details.append(f"{sub_name}: {sub_desc[:50]}...")
-            submodule_list = " | ".join(submodule_details) if submodule_details else "No submodules"
-            if len(submodules) > 5:
-                submodule_list += f" | ... and {len(submodules) - 5} more"
-            
-            table_data.append({
-                "#": idx,
-                "Module Name": module_name,
-                "Description": description,
-                "Submodules Count": submodule_count,
-                "Submodules": submodule_list
-            })
-        
-        # Display table for this URL
-        df = pd.DataFrame(table_data)
-        st.dataframe(
-            df,
-            use_container_width=True,
-            hide_index=True,
-            column_config={
-                "#": st.column_config.NumberColumn("#", width="small", format="%d"),
-                "Module Name": st.column_config.TextColumn(
-                    "Module Name", 
-                    width="medium",
-                    help="Name of the extracted module"
-                ),
-                "Description": st.column_config.TextColumn(
-                    "Description", 
-                    width="large",
-                    help="Description of the module"
-                ),
-                "Submodules Count": st.column_config.NumberColumn(
-                    "Submodules", 
-                    width="small",
-                    format="%d",
-                    help="Number of submodules"
-                ),
-                "Submodules": st.column_config.TextColumn(
-                    "Submodules List", 
-                    width="xlarge",
-                    help="List of submodules with descriptions"
-                )
-            }
-        )
-        
-        # Detailed submodules table for this URL
-        if any(len(m.get('submodules', {})) > 0 for m in modules):
-            with st.expander(f"🔹 View all submodules from URL {url_idx}", expanded=False):
-                submodules_table_data = []
-                for module in modules:
-                    module_name = module.get('module', 'Unknown')
-                    submodules = module.get('submodules', {})
-                    for sub_name, sub_desc in submodules.items():
-                        submodules_table_data.append({
-                            "Module": module_name,
-                            "Submodule Name": sub_name,
-                            "Submodule Description": sub_desc
-                        })
-                
-                if submodules_table_data:
-                    submodules_df = pd.DataFrame(submodules_table_data)
-                    st.dataframe(
-                        submodules_df,
-                        use_container_width=True,
-                        hide_index=True,
-                        column_config={
-                            "Module": st.column_config.TextColumn("Module", width="medium"),
-                            "Submodule Name": st.column_config.TextColumn("Submodule Name", width="medium"),
-                            "Submodule Description": st.column_config.TextColumn("Description", width="large")
-                        }
-                    )
-        
+        display_module_page(modules, key=f"url_{url_idx}")
         st.markdown("---")
 
+
 def display_modules(modules: List[dict], source_urls: List[str] = None):
-    """Display extracted modules in tabular and card format."""
+    """Display extracted modules in a paginated table with on-demand submodule details."""
     if not modules or len(modules) == 0:
         st.info(" No modules found in the documentation.")
         return
-    
-    # Statistics
-    total_submodules = sum(len(m.get('submodules', {})) for m in modules)
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown(f"""
-        <div class="stat-box">
-            <div class="stat-number">{len(modules)}</div>
-            <div class="stat-label">Modules</div>
-        </div>
-        """, unsafe_allow_html=True)
-    with col2:
-        st.markdown(f"""
-        <div class="stat-box">
-            <div class="stat-number">{total_submodules}</div>
-            <div class="stat-label">Submodules</div>
-        </div>
-        """, unsafe_allow_html=True)
-    with col3:
-        st.markdown(f"""
-        <div class="stat-box">
-            <div class="stat-number">{sum(1 for m in modules if m.get('submodules'))}</div>
-            <div class="stat-label">With Submodules</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
+
+    stat_boxes([
+        (len(modules), "Modules"),
+        (sum(len(m.get('submodules', {})) for m in modules), "Submodules"),
+        (sum(1 for m in modules if m.get('submodules')), "With Submodules"),
+    ])
+
     st.markdown("---")
-    
-    # Primary Tabular View - Main Display
     st.markdown("### 📊 Extracted Modules Table")
     st.markdown("**Structured data extracted from all documentation URLs:**")
-    
-    # Prepare comprehensive table data
-    table_data = []
-    for idx, module in enumerate(modules, 1):
-        module_name = module.get('module', 'Unknown Module')
-        description = module.get('description', '')
-        submodules = module.get('submodules', {})
-        submodule_count = len(submodules)
-        
-        # Create submodule list with descriptions
-        submodule_details = []
-        for sub_name, sub_desc in list(submodules.items())[:5]:  # First 5
-            submodule_details.append(f"{sub_name}: {sub_desc[:50]}...")
-        submodule_list = " | ".join(submodule_details) if submodule_details else "No submodules"
-        if len(submodules) > 5:
-            submodule_list += f" | ... and {len(submodules) - 5} more"
-        
-        table_data.append({
-            "#": idx,
-            "Module Name": module_name,
-            "Description": description,
-            "Submodules Count": submodule_count,
-            "Submodules": submodule_list
-        })
-    
-    # Display main table with better formatting
-    df = pd.DataFrame(table_data)
-    
-    # Use st.data_editor for better table display with sorting
-    st.dataframe(
-        df,
-        use_container_width=True,
-        hide_index=True,
-        column_config={
-            "#": st.column_config.NumberColumn("#", width="small", format="%d"),
-            "Module Name": st.column_config.TextColumn(
-                "Module Name", 
-                width="medium",
-                help="Name of the extracted module"
-            ),
-            "Description": st.column_config.TextColumn(
-                "Description", 
-                width="large",
-                help="Description of the module"
-            ),
-            "Submodules Count": st.column_config.NumberColumn(
-                "Submodules", 
-                width="small",
-                format="%d",
-                help="Number of submodules"
-            ),
-            "Submodules": st.column_config.TextColumn(
-                "Submodules List", 
-                width="xlarge",
-                help="List of submodules with descriptions"
-            )
-        }
-    )
-    
-    # Additional detailed submodules table
-    if any(len(m.get('submodules', {})) > 0 for m in modules):
-        st.markdown("---")
-        st.markdown("### 🔹 Detailed Submodules Table")
-        
-        # Flatten submodules into separate rows
-        submodules_table_data = []
-        for module in modules:
-            module_name = module.get('module', 'Unknown')
-            submodules = module.get('submodules', {})
-            for sub_name, sub_desc in submodules.items():
-                submodules_table_data.append({
-                    "Module": module_name,
-                    "Submodule Name": sub_name,
-                    "Submodule Description": sub_desc
-                })
-        
-        if submodules_table_data:
-            submodules_df = pd.DataFrame(submodules_table_data)
-            st.dataframe(
-                submodules_df,
-                use_container_width=True,
-                hide_index=True,
-                column_config={
-                    "Module": st.column_config.TextColumn("Module", width="medium"),
-                    "Submodule Name": st.column_config.TextColumn("Submodule Name", width="medium"),
-                    "Submodule Description": st.column_config.TextColumn("Description", width="large")
-                }
-            )
-    
-    st.markdown("---")
-    st.markdown("### 📋 Detailed View")
-    
-    # Detailed card view with expanders
-    for idx, module in enumerate(modules, 1):
-        module_name = module.get('module', 'Unknown Module')
-        description = module.get('description', '')
-        submodules = module.get('submodules', {})
-        
-        with st.expander(f"🔷 {module_name} ({len(submodules)} submodules)", expanded=False):
-            if description:
-                st.markdown(f"**Description:** {description}")
-                st.markdown("")
-            
-            if submodules:
-                st.markdown("**Submodules:**")
-                for sub_name, sub_desc in submodules.items():
-                    st.markdown(f"""
-                    <div class="submodule-item">
-                        <span class="submodule-name">• {sub_name}</span>
-                        <br>
-                        <span style="color: #666; font-size: 0.95rem;">{sub_desc}</span>
-                    </div>
-                    """, unsafe_allow_html=True)
-        
-        if idx < len(modules):
-            st.markdown("")
+    display_module_page(modules, key="merged")
 
 # Main UI
 st.markdown("""
@@ -524,73 +454,67 @@ if extract_button:
         if not valid_urls:
             st.error("❌ No valid URLs provided. Please enter at least one valid URL starting with http:// or https://")
         else:
-            # Progress tracking
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+            # Remember the request so reruns (paging, detail selection) re-render from cache
+            # As entered (minus duplicates): normalization is only for the cache key
+            st.session_state["active_urls"] = tuple(dict.fromkeys(valid_urls))
+            st.session_state.pop("partial_result", None)
+
+active_urls = st.session_state.get("active_urls")
+if active_urls:
+    with st.spinner(f"🔄 Processing {len(active_urls)} URL(s)... This may take 30-90 seconds."):
+        result = extract_modules(active_urls)
+    
+    if result:
+        modules_data = result.get('modules', [])
+        
+        # Check if modules_data is in new format (list of {url, modules}) or old format (list of modules)
+        if modules_data and isinstance(modules_data[0], dict) and 'url' in modules_data[0]:
+            # New format: separate tables per URL
+            st.markdown("---")
+            st.markdown("## 📊 Results: Structured Module Data by URL")
             
-            status_text.info(f"🔄 Processing {len(valid_urls)} URL(s)... This may take 30-90 seconds.")
-            progress_bar.progress(20)
+            total_modules = sum(len(item.get('modules', [])) for item in modules_data)
+            cached_note = " (cached)" if st.session_state.get("last_fetch_cached") else ""
+            st.success(f"✅ Successfully extracted and structured {total_modules} module(s) from {len(modules_data)} documentation URL(s){cached_note}")
+            if result.get('partial'):
+                st.warning("⏱️ The backend's deadline cut this extraction short, so it is not cached. "
+                           "Extract again to retry.")
+            st.markdown("")
             
-            result = extract_modules(valid_urls)
-            progress_bar.progress(80)
+            display_modules_by_url(modules_data)
             
-            if result:
-                progress_bar.progress(100)
-                status_text.empty()
-                progress_bar.empty()
-                
-                modules_data = result.get('modules', [])
-                
-                # Check if modules_data is in new format (list of {url, modules}) or old format (list of modules)
-                if modules_data and isinstance(modules_data[0], dict) and 'url' in modules_data[0]:
-                    # New format: separate tables per URL
-                    st.markdown("---")
-                    st.markdown("## 📊 Results: Structured Module Data by URL")
-                    
-                    total_modules = sum(len(item.get('modules', [])) for item in modules_data)
-                    st.success(f"✅ Successfully extracted and structured {total_modules} module(s) from {len(modules_data)} documentation URL(s)")
-                    st.markdown("")
-                    
-                    display_modules_by_url(modules_data)
-                    
-                    # Download JSON button
-                    json_str = json.dumps(modules_data, indent=2)
-                    col1, col2, col3 = st.columns([1, 1, 1])
-                    with col2:
-                        st.download_button(
-                            label="📥 Download JSON",
-                            data=json_str,
-                            file_name="extracted_modules_by_url.json",
-                            mime="application/json",
-                            use_container_width=True
-                        )
-                elif modules_data:
-                    # Old format: merged modules (fallback) - shouldn't happen with new backend
-                    st.markdown("---")
-                    st.markdown("## 📊 Results: Structured Module Data")
-                    st.warning("⚠️ Received merged format. Backend should return per-URL format.")
-                    st.markdown("")
-                    # Simple display for fallback
-                    st.dataframe(pd.DataFrame(modules_data), use_container_width=True)
-                    
-                    # Download JSON button
-                    json_str = json.dumps(modules_data, indent=2)
-                    col1, col2, col3 = st.columns([1, 1, 1])
-                    with col2:
-                        st.download_button(
-                            label="📥 Download JSON",
-                            data=json_str,
-                            file_name="extracted_modules.json",
-                            mime="application/json",
-                            use_container_width=True
-                        )
-                else:
-                    progress_bar.empty()
-                    status_text.empty()
-                    st.warning("⚠️ No modules found in the documentation. The URLs may not contain extractable module information.")
-            else:
-                progress_bar.empty()
-                status_text.empty()
+            # Download JSON button
+            json_str = json.dumps(modules_data, indent=2)
+            col1, col2, col3 = st.columns([1, 1, 1])
+            with col2:
+                st.download_button(
+                    label="📥 Download JSON",
+                    data=json_str,
+                    file_name="extracted_modules_by_url.json",
+                    mime="application/json",
+                    use_container_width=True
+                )
+        elif modules_data:
+            # Old format: merged modules (fallback) - shouldn't happen with new backend
+            st.markdown("---")
+            st.markdown("## 📊 Results: Structured Module Data")
+            st.warning("⚠️ Received merged format. Backend should return per-URL format.")
+            st.markdown("")
+            display_modules(modules_data)
+            
+            # Download JSON button
+            json_str = json.dumps(modules_data, indent=2)
+            col1, col2, col3 = st.columns([1, 1, 1])
+            with col2:
+                st.download_button(
+                    label="📥 Download JSON",
+                    data=json_str,
+                    file_name="extracted_modules.json",
+                    mime="application/json",
+                    use_container_width=True
+                )
+        else:
+            st.warning("⚠️ No modules found in the documentation. The URLs may not contain extractable module information.")
 
 # Sidebar info
 with st.sidebar:
@@ -631,6 +555,18 @@ with st.sidebar:
                 st.exception(e)
                 st.info("💡 Make sure the backend is running on the specified URL")
     
+    st.markdown("---")
+    st.markdown("### 🗄️ Result Cache")
+    cache_stats = st.session_state.get("cache_stats", {"hits": 0, "misses": 0})
+    st.markdown(f"**Hits:** {cache_stats['hits']} · **Misses:** {cache_stats['misses']}")
+    st.caption("Repeat requests for the same URLs are served from cache for 1 hour.")
+    if st.button("🧹 Clear cache", use_container_width=True):
+        fetch_extraction.clear()
+        st.session_state.pop("active_urls", None)
+        st.session_state.pop("partial_result", None)
+        st.session_state["cache_stats"] = {"hits": 0, "misses": 0}
+        st.rerun()
+    
     st.markdown("---")
     st.markdown("### 📚 Quick Tips")
     st.markdown("""